@@ -12,6 +12,7 @@ https://docs.djangoproject.com/en/3.0/ref/settings/
 """
 import sys
 from pathlib import Path
+from typing import Dict, List
 
 from django.contrib.messages import constants as message_constants
 from django.utils.translation import gettext_lazy as _
@@ -83,6 +84,27 @@ TEMPLATES = [
 
 DATABASES = {"default": env.dj_db_url("DATABASE_URL")}
 
+CACHES = {
+    "default": env.dj_cache_url("CACHE_URL", default="locmem://"),
+    # Shared between the workers, "python manage.py createcachetable" creates the tables
+    "probes": {
+        **env.dj_cache_url(
+            "PROBE_CACHE_URL", default="db://url_probe_cache?max_entries=10000"
+        ),
+        # Timeouts are passed explicitly, the breaker state in this cache must not expire
+        "TIMEOUT": None,
+    },
+    "shared": env.dj_cache_url(
+        "SHARED_CACHE_URL", default="db://shared_cache?max_entries=10000"
+    ),
+    # Stats counters and invalidation generations, which must never be culled
+    "counters": {
+        "BACKEND": "linkysets.common.cache.UnculledDatabaseCache",
+        "LOCATION": "cache_counters",
+        "TIMEOUT": None,
+    },
+}
+
 WSGI_APPLICATION = "config.wsgi.application"
 
 AUTH_USER_MODEL = "users.User"
@@ -159,6 +181,123 @@ AUTHENTICATION_FORM = "linkysets.users.forms.AuthenticationForm"
 
 DEFAULT_REQUESTS_TIMEOUT = 1.5
 
+URL_PROBE_DEADLINE = 3.0
+
+URL_PROBE_MAX_WORKERS = MAX_ENTRIES_PER_ENTRYSET
+
+URL_PROBE_POOL_CONNECTIONS = env.int("URL_PROBE_POOL_CONNECTIONS", default=50)
+
+URL_PROBE_POOL_MAXSIZE = env.int("URL_PROBE_POOL_MAXSIZE", default=URL_PROBE_MAX_WORKERS)
+
+URL_PROBE_MAX_RETRIES = env.int("URL_PROBE_MAX_RETRIES", default=1)
+
+URL_PROBE_RETRY_BACKOFF = 0.1
+
+# Per process limits of the probes in flight, probes over them wait until the deadline
+URL_PROBE_MAX_IN_FLIGHT = env.int("URL_PROBE_MAX_IN_FLIGHT", default=20)
+
+URL_PROBE_MAX_PER_HOST = env.int("URL_PROBE_MAX_PER_HOST", default=2)
+
+URL_PROBE_CACHE = "probes"
+
+URL_PROBE_STATS_CACHE = "counters"
+
+URL_PROBE_CACHE_TTL = env.int("URL_PROBE_CACHE_TTL", default=60 * 60 * 24)
+
+URL_PROBE_NEGATIVE_CACHE_TTL = env.int("URL_PROBE_NEGATIVE_CACHE_TTL", default=60)
+
+URL_PROBE_BREAKER_THRESHOLD = 5
+
+URL_PROBE_BREAKER_WINDOW = 5 * 60
+
+URL_PROBE_BREAKER_RESET_TIMEOUT = 30
+
+URL_PROBE_BREAKER_FALLBACK_TO_URL = env.bool(
+    "URL_PROBE_BREAKER_FALLBACK_TO_URL", default=False
+)
+
+# Entries urls with a known shape (file extensions, video hosts) are classified without
+# requesting them. The strict mode still probes them to check that they are reachable.
+URL_FAST_CLASSIFICATION = env.bool("URL_FAST_CLASSIFICATION", default=True)
+
+URL_FAST_CLASSIFICATION_STRICT = env.bool("URL_FAST_CLASSIFICATION_STRICT", default=False)
+
+# Overrides of the behaviors url extensions by behavior class name,
+# e.g. {"ImageTypeBehavior": [".jpg", ".png"]}
+URL_CLASSIFICATION_EXTENSIONS: Dict[str, List[str]] = {}
+
+# Entries are saved as urls right away and classified by the classify_entries worker
+DEFERRED_CLASSIFICATION = env.bool("DEFERRED_CLASSIFICATION", default=False)
+
+DEFERRED_CLASSIFICATION_BATCH_SIZE = 50
+
+DEFERRED_CLASSIFICATION_MAX_ATTEMPTS = 3
+
+DEFERRED_CLASSIFICATION_RETRY_DELAY = 60
+
+# Claimed jobs are probed without locks, they're left to other workers after this time
+DEFERRED_CLASSIFICATION_LEASE = 60
+
+ENTRY_RENDER_CACHE = "default"
+
+ENTRY_RENDER_CACHE_TTL = env.int("ENTRY_RENDER_CACHE_TTL", default=60 * 60 * 24)
+
+# Html may stay per process, the hit counters must be shared to add up across workers.
+# They're counted in the process and added to the shared ones once per interval.
+ENTRY_RENDER_STATS_CACHE = "counters"
+
+ENTRY_RENDER_STATS_FLUSH_INTERVAL = 60
+
+# The sqlite backend keeps an FTS5 index in a local file to move the search off the
+# database. The index of a newly chosen backend is filled by rebuild_search_index.
+ENTRY_SEARCH_BACKEND = env.str(
+    "ENTRY_SEARCH_BACKEND",
+    default="linkysets.entries.search_backends.PostgresSearchBackend",
+)
+
+ENTRY_SEARCH_SQLITE_PATH = env.path(
+    "ENTRY_SEARCH_SQLITE_PATH", default=str(BASE_DIR / "search_index.sqlite3")
+)
+
+# Best results cached per term, the pages past them are searched by the backend
+ENTRY_SEARCH_MAX_RESULTS = 500
+
+# Found sets ids are cached per term until any set or entry changes. The caches must be
+# shared between the workers, or they'd miss the invalidations of each other.
+ENTRY_SEARCH_CACHE = "shared"
+
+ENTRY_SEARCH_GENERATION_CACHE = "counters"
+
+ENTRY_SEARCH_CACHE_TTL = env.int("ENTRY_SEARCH_CACHE_TTL", default=60 * 10)
+
+SEARCH_SUGGESTIONS_LIMIT = 8
+
+SEARCH_SUGGESTIONS_MIN_LENGTH = 2
+
+# Paginated lists show "about N" over this count instead of counting the rows each time
+PAGINATION_APPROXIMATE_COUNT_THRESHOLD = 1000
+
+PAGINATION_COUNT_CACHE = "default"
+
+PAGINATION_COUNT_CACHE_TTL = env.int("PAGINATION_COUNT_CACHE_TTL", default=60 * 5)
+
+# Sidebar ratings are cached until a set is created, renamed or deleted. The cache is
+# shared, so the workers drop their ratings together.
+RATINGS_CACHE = "shared"
+
+RATINGS_CACHE_TTL = env.int("RATINGS_CACHE_TTL", default=60 * 60)
+
+# Detail pages show this many root replies with this many levels of each thread,
+# the rest are loaded on demand
+REPLY_THREAD_ROOTS = 20
+
+REPLY_THREAD_DEPTH = 5
+
+# Rendered first pages of threads are cached until the set replies change
+REPLY_THREAD_CACHE = "default"
+
+REPLY_THREAD_CACHE_TTL = env.int("REPLY_THREAD_CACHE_TTL", default=60 * 60 * 24)
+
 ANONYMOUS_USER_PROXY = "linkysets.users.models.AnonymousUserProxy"
 
 ANONYMOUS_USERNAME = _("Anonymous")
@@ -0,0 +1,132 @@
+import threading
+import time
+from collections import Counter
+from typing import Callable, ClassVar, Dict, Optional, Sequence, Union
+
+from django.core.cache import DEFAULT_CACHE_ALIAS, BaseCache, caches
+from django.core.cache.backends.db import DatabaseCache
+from django.db import connections, transaction
+
+
+def invalidate_on_commit(
+    invalidate: Callable[[], None], using: Optional[str] = None
+) -> None:
+    """
+    Invalidate right away for the reads of the current transaction, and again
+    once it commits, since other processes can cache the old data until then.
+    """
+    invalidate()
+    if transaction.get_connection(using).in_atomic_block:
+        transaction.on_commit(invalidate, using=using)
+
+
+class UnculledDatabaseCache(DatabaseCache):
+    """
+    Database cache that drops only the expired entries when it's over max_entries,
+    for the few keys that must not be lost, like counters.
+    """
+
+    def _cull(self, db, cursor, now):
+        connection = connections[db]
+        table = connection.ops.quote_name(self._table)
+        cursor.execute(
+            "DELETE FROM %s WHERE expires < %%s" % table,
+            [connection.ops.adapt_datetimefield_value(now)],
+        )
+
+
+class CacheCounters:
+    """
+    Counters stored in the cache itself to be shared between processes.
+    """
+
+    COUNTERS: ClassVar[Sequence[str]] = []
+
+    def __init__(self, name: str, cache_alias: str = DEFAULT_CACHE_ALIAS):
+        self.name = name
+        self.cache_alias = cache_alias
+
+    @property
+    def cache(self) -> BaseCache:
+        return caches[self.cache_alias]
+
+    def incr(self, counter: str, count: int = 1) -> None:
+        if count == 0:
+            return
+
+        key = self.make_key(counter)
+        self.cache.add(key, 0, timeout=None)
+        try:
+            self.cache.incr(key, count)
+        except ValueError:
+            # The counter got evicted right after it was added
+            self.cache.set(key, count, timeout=None)
+
+    def get(self) -> Dict[str, Union[int, float]]:
+        keys = {self.make_key(counter): counter for counter in self.COUNTERS}
+        values = self.cache.get_many(keys)
+        return {counter: values.get(key, 0) for key, counter in keys.items()}
+
+    def reset(self) -> None:
+        self.cache.delete_many([self.make_key(counter) for counter in self.COUNTERS])
+
+    def make_key(self, counter: str) -> str:
+        return f"stats:{self.name}:{counter}"
+
+
+class CacheStats(CacheCounters):
+    COUNTERS = ["hits", "misses"]
+
+    def hit(self, count: int = 1) -> None:
+        self.incr("hits", count)
+
+    def miss(self, count: int = 1) -> None:
+        self.incr("misses", count)
+
+    def get(self) -> Dict[str, Union[int, float]]:
+        stats = super().get()
+        lookups = stats["hits"] + stats["misses"]
+        stats["hit_ratio"] = stats["hits"] / lookups if lookups else 0.0
+        return stats
+
+
+class BufferedCacheStats(CacheStats):
+    """
+    Stats counted in the process and added to the shared counters at most once
+    per flush interval, so counting doesn't write to the cache on every lookup.
+    """
+
+    def __init__(
+        self, name: str, cache_alias: str = DEFAULT_CACHE_ALIAS, flush_interval: float = 60
+    ):
+        super().__init__(name, cache_alias)
+        self.flush_interval = flush_interval
+        self._pending: Counter = Counter()
+        self._lock = threading.Lock()
+        self._last_flush = time.monotonic()
+
+    def incr(self, counter: str, count: int = 1) -> None:
+        if count == 0:
+            return
+
+        with self._lock:
+            self._pending[counter] += count
+            if time.monotonic() - self._last_flush < self.flush_interval:
+                return
+        self.flush()
+
+    def flush(self) -> None:
+        with self._lock:
+            pending, self._pending = self._pending, Counter()
+            self._last_flush = time.monotonic()
+        for counter, count in pending.items():
+            super().incr(counter, count)
+
+    def get(self) -> Dict[str, Union[int, float]]:
+        self.flush()
+        return super().get()
+
+    def reset(self) -> None:
+        with self._lock:
+            self._pending.clear()
+        super().reset()
@@ -0,0 +1,329 @@
+from __future__ import annotations
+
+import base64
+import binascii
+import hashlib
+import json
+from collections.abc import Sequence
+from typing import Any, List, NamedTuple, Optional, Tuple
+
+from django.conf import settings
+from django.core.cache import caches
+from django.core.exceptions import ValidationError
+from django.core.paginator import InvalidPage
+from django.db import connections
+from django.db.models import FloatField, Model, Q, QuerySet
+from django.db.models.query import EmptyQuerySet
+from django.utils.functional import cached_property
+
+NEXT = "n"
+PREVIOUS = "p"
+
+
+class InvalidCursor(InvalidPage):
+    pass
+
+
+class RankedPksExhausted(Exception):
+    """
+    The page goes past the end of truncated ranked ids.
+    """
+
+
+class ObjectsCount(NamedTuple):
+    value: int
+    is_approximate: bool = False
+    # There are more objects than the value
+    is_lower_bound: bool = False
+
+
+def get_table_estimate(queryset: QuerySet) -> Optional[int]:
+    connection = connections[queryset.db]
+    if connection.vendor != "postgresql":
+        return None
+
+    with connection.cursor() as cursor:
+        cursor.execute(
+            "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+            [queryset.model._meta.db_table],
+        )
+        row = cursor.fetchone()
+    # Tables that were never analyzed have -1 or 0 tuples estimate
+    if row is None or row[0] <= 0:
+        return None
+    return int(row[0])
+
+
+def make_count_cache_key(queryset: QuerySet) -> str:
+    sql, params = queryset.query.sql_with_params()
+    digest = hashlib.sha1(f"{sql}:{params!r}".encode()).hexdigest()
+    return f"pagination-count:{digest}"
+
+
+def get_approximate_count(
+    queryset: QuerySet, threshold: Optional[int] = None
+) -> ObjectsCount:
+    """
+    Count that doesn't scan big tables on every request. Unfiltered querysets use
+    the table statistics estimate and filtered ones cache their count for a while.
+    Counts under the threshold are always exact.
+    """
+    if threshold is None:
+        threshold = settings.PAGINATION_APPROXIMATE_COUNT_THRESHOLD
+
+    if not queryset.query.has_filters():
+        estimate = get_table_estimate(queryset)
+        if estimate is not None and estimate >= threshold:
+            return ObjectsCount(estimate, is_approximate=True)
+        return ObjectsCount(queryset.count())
+
+    cache = caches[settings.PAGINATION_COUNT_CACHE]
+    key = make_count_cache_key(queryset)
+    count = cache.get(key)
+    if count is not None:
+        return ObjectsCount(count, is_approximate=True)
+
+    count = queryset.count()
+    if count >= threshold:
+        cache.set(key, count, timeout=settings.PAGINATION_COUNT_CACHE_TTL)
+    return ObjectsCount(count)
+
+
+class CursorPage(Sequence):
+    def __init__(
+        self,
+        object_list: List[Model],
+        paginator: CursorPaginator,
+        has_next: bool,
+        has_previous: bool,
+    ):
+        self.object_list = object_list
+        self.paginator = paginator
+        self._has_next = has_next
+        self._has_previous = has_previous
+
+    def __repr__(self) -> str:
+        return f"<Cursor page of {len(self)} objects>"
+
+    def __len__(self) -> int:
+        return len(self.object_list)
+
+    def __getitem__(self, index):
+        return self.object_list[index]
+
+    def has_next(self) -> bool:
+        return self._has_next
+
+    def has_previous(self) -> bool:
+        return self._has_previous
+
+    def has_other_pages(self) -> bool:
+        return self.has_next() or self.has_previous()
+
+    def next_cursor(self) -> Optional[str]:
+        if not self.has_next():
+            return None
+        return self.paginator.encode_cursor(NEXT, self.object_list[-1])
+
+    def previous_cursor(self) -> Optional[str]:
+        if not self.has_previous():
+            return None
+        return self.paginator.encode_cursor(PREVIOUS, self.object_list[0])
+
+
+class CursorPaginator:
+    """
+    Keyset paginator, pages are looked up by the ordering values of the objects
+    next to them instead of an offset. So every page costs the same and needs no
+    count query. Ordering must be unique, so it should end with the pk. It may use
+    annotations as well, e.g. a search rank.
+    """
+
+    def __init__(
+        self,
+        object_list: QuerySet,
+        per_page: int,
+        ordering: Tuple[str, ...] = ("-created", "-pk"),
+    ):
+        self.object_list = object_list
+        self.per_page = int(per_page)
+        self.ordering = ordering
+
+    @cached_property
+    def count(self) -> int:
+        return self.object_list.count()
+
+    @cached_property
+    def approximate_count(self) -> ObjectsCount:
+        return get_approximate_count(self.object_list)
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        if cursor:
+            direction, position = self.decode_cursor(cursor)
+        else:
+            direction, position = NEXT, None
+
+        if isinstance(self.object_list, EmptyQuerySet):
+            return CursorPage([], self, has_next=False, has_previous=False)
+
+        is_previous = direction == PREVIOUS
+        ordering = (
+            [self._reverse_order(field) for field in self.ordering]
+            if is_previous
+            else self.ordering
+        )
+        qs = self.object_list.order_by(*ordering)
+        if position is not None:
+            qs = qs.filter(self._get_position_filter(ordering, position))
+
+        object_list = list(qs[: self.per_page + 1])
+        has_more = len(object_list) > self.per_page
+        object_list = object_list[: self.per_page]
+        if is_previous:
+            object_list.reverse()
+            return CursorPage(object_list, self, has_next=True, has_previous=has_more)
+        return CursorPage(
+            object_list, self, has_next=has_more, has_previous=position is not None
+        )
+
+    def encode_cursor(self, direction: str, obj: Model) -> str:
+        position = [self._get_value(obj, field) for field in self.ordering]
+        data = json.dumps([direction, position], separators=(",", ":"))
+        return base64.urlsafe_b64encode(data.encode()).decode().rstrip("=")
+
+    def decode_cursor(self, cursor: str) -> Tuple[str, List[Any]]:
+        try:
+            padding = "=" * (-len(cursor) % 4)
+            direction, position = json.loads(base64.urlsafe_b64decode(cursor + padding))
+            if direction not in [NEXT, PREVIOUS] or len(position) != len(self.ordering):
+                raise ValueError
+            values = [
+                self._get_field(field).to_python(value)
+                for field, value in zip(self.ordering, position)
+            ]
+        except (binascii.Error, TypeError, ValueError, ValidationError):
+            raise InvalidCursor("That cursor is not valid.")
+
+        return direction, values
+
+    def _get_position_filter(self, ordering, position) -> Q:
+        # (a, b) > (x, y) is expanded to a > x OR (a = x AND b > y)
+        position_filter = Q()
+        equal_lookups = {}
+        for field, value in zip(ordering, position):
+            name = field.lstrip("-")
+            lookup = "lt" if field.startswith("-") else "gt"
+            position_filter |= Q(**equal_lookups, **{f"{name}__{lookup}": value})
+            equal_lookups[name] = value
+        # The OR can't bound an index scan, a >= x can, so pages start at the position
+        first_field, first_value = ordering[0], position[0]
+        bound_lookup = "lte" if first_field.startswith("-") else "gte"
+        bound = Q(**{f"{first_field.lstrip('-')}__{bound_lookup}": first_value})
+        return bound & position_filter
+
+    def _get_field(self, field: str):
+        name = field.lstrip("-")
+        annotations = self.object_list.query.annotations
+        if name in annotations:
+            return annotations[name].output_field
+
+        opts = self.object_list.model._meta
+        return opts.pk if name == "pk" else opts.get_field(name)
+
+    def _get_value(self, obj: Model, field: str) -> str:
+        name = field.lstrip("-")
+        if name in self.object_list.query.annotations:
+            return str(getattr(obj, name))
+        return self._get_field(field).value_to_string(obj)
+
+    @staticmethod
+    def _reverse_order(field: str) -> str:
+        return field[1:] if field.startswith("-") else f"-{field}"
+
+
+class RankedPaginator(CursorPaginator):
+    """
+    Cursor paginator over ids ranked in advance, e.g. cached search results, ordered
+    by the rank and the pk like the search. Pages are sliced from the ids, so only
+    the objects of the page are fetched, they are reordered and get their ranks.
+    Cursors are the same as of a search ordered by the annotated rank. Ids may be
+    truncated, pages past their end raise RankedPksExhausted.
+    """
+
+    rank_field = FloatField()
+
+    def __init__(
+        self,
+        object_list: QuerySet,
+        per_page: int,
+        ranked_pks: List[Tuple[int, float]],
+        is_truncated: bool = False,
+    ):
+        super().__init__(object_list, per_page, ordering=("-rank", "-pk"))
+        self.ranked_pks = ranked_pks
+        self.is_truncated = is_truncated
+
+    @cached_property
+    def count(self) -> int:
+        return len(self.ranked_pks)
+
+    @cached_property
+    def approximate_count(self) -> ObjectsCount:
+        return ObjectsCount(len(self.ranked_pks), is_lower_bound=self.is_truncated)
+
+    def page(self, cursor: Optional[str] = None) -> CursorPage:
+        if cursor:
+            direction, position = self.decode_cursor(cursor)
+        else:
+            direction, position = NEXT, None
+
+        if isinstance(self.object_list, EmptyQuerySet):
+            return CursorPage([], self, has_next=False, has_previous=False)
+
+        # Descending (rank, pk) positions, so the ones after a position are lower
+        positions = [(rank, pk) for pk, rank in self.ranked_pks]
+        position = tuple(position) if position is not None else None
+        if direction == PREVIOUS:
+            if self.is_truncated and (not positions or position < positions[-1]):
+                raise RankedPksExhausted
+            before = [values for values in positions if values > position]
+            page_positions = before[-self.per_page :]
+            return CursorPage(
+                self._get_objects(page_positions),
+                self,
+                has_next=True,
+                has_previous=len(before) > self.per_page,
+            )
+
+        after = [values for values in positions if position is None or values < position]
+        # Without the next one the page may continue past the end of the ids
+        if self.is_truncated and len(after) <= self.per_page:
+            raise RankedPksExhausted
+        return CursorPage(
+            self._get_objects(after[: self.per_page]),
+            self,
+            has_next=len(after) > self.per_page,
+            has_previous=position is not None,
+        )
+
+    def _get_objects(self, positions: List[Tuple[float, int]]) -> List[Model]:
+        objects = self.object_list.in_bulk([pk for _, pk in positions])
+        object_list = []
+        for rank, pk in positions:
+            # Deleted since the ids were ranked
+            if pk not in objects:
+                continue
+            obj = objects[pk]
+            obj.rank = rank
+            object_list.append(obj)
+        return object_list
+
+    def _get_field(self, field: str):
+        if field.lstrip("-") == "rank":
+            return self.rank_field
+        return super()._get_field(field)
+
+    def _get_value(self, obj: Model, field: str) -> str:
+        if field.lstrip("-") == "rank":
+            return str(obj.rank)
+        return super()._get_value(obj, field)
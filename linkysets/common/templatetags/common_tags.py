@@ -18,6 +18,9 @@ def transform_query(
     querydict = request.GET.copy()
     for key, value in query_transform.items():
         key_ = prefix_sep.join([prefix, key]) if prefix else key
-        querydict[key_] = value
+        if value is None:
+            querydict.pop(key_, None)
+        else:
+            querydict[key_] = value
 
     return querydict.urlencode(safe=safe)
@@ -0,0 +1,55 @@
+from django.db import connection
+from django.test import TestCase
+
+from ..cache import BufferedCacheStats, CacheStats, UnculledDatabaseCache
+
+
+class UnculledDatabaseCacheTests(TestCase):
+    def setUp(self):
+        self.cache = UnculledDatabaseCache(
+            "cache_counters", {"OPTIONS": {"MAX_ENTRIES": 2}}
+        )
+        self.cache.clear()
+
+    def test_keeps_entries_over_max_entries(self):
+        for i in range(5):
+            self.cache.set(f"counter-{i}", i, timeout=None)
+        self.assertEqual(len(self.cache.get_many(f"counter-{i}" for i in range(5))), 5)
+
+    def test_drops_expired_entries(self):
+        self.cache.set("expired", 1, timeout=-1)
+        for i in range(3):
+            self.cache.set(f"counter-{i}", i, timeout=None)
+        with connection.cursor() as cursor:
+            cursor.execute("SELECT cache_key FROM cache_counters")
+            keys = {key for key, in cursor.fetchall()}
+        self.assertEqual(keys, {self.cache.make_key(f"counter-{i}") for i in range(3)})
+
+
+class BufferedCacheStatsTests(TestCase):
+    def setUp(self):
+        self.stats = BufferedCacheStats("test", cache_alias="counters", flush_interval=60)
+        self.stats.reset()
+        self.shared_stats = CacheStats("test", cache_alias="counters")
+
+    def test_counts_without_cache_queries(self):
+        with self.assertNumQueries(0):
+            self.stats.hit()
+            self.stats.miss(2)
+        self.assertEqual(self.shared_stats.get()["hits"], 0)
+
+    def test_flushes_counts_to_shared_counters(self):
+        self.stats.hit()
+        self.stats.miss(2)
+        self.stats.flush()
+        stats = self.shared_stats.get()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 2))
+
+    def test_flushes_after_interval(self):
+        self.stats.flush_interval = 0
+        self.stats.hit()
+        self.assertEqual(self.shared_stats.get()["hits"], 1)
+
+    def test_get_includes_pending_counts(self):
+        self.stats.hit()
+        self.assertEqual(self.stats.get()["hit_ratio"], 1.0)
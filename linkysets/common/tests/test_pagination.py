@@ -0,0 +1,238 @@
+from datetime import timedelta
+from unittest.mock import patch
+
+from django.core.cache import cache
+from django.db import connection
+from django.db.models import Case, ExpressionWrapper, F, FloatField, Value, When
+from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
+from django.utils import timezone
+
+from linkysets.entries.models import EntrySet
+from linkysets.entries.tests.bakery_recipes import entryset_recipe
+
+from ..pagination import (
+    CursorPaginator,
+    InvalidCursor,
+    ObjectsCount,
+    RankedPaginator,
+    RankedPksExhausted,
+    get_approximate_count,
+    make_count_cache_key,
+)
+
+
+class CursorPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrysets = entryset_recipe.make(_quantity=5)
+        created = timezone.now()
+        # Two sets share a timestamp to check the pk tie breaker
+        for i, entryset in enumerate(cls.entrysets):
+            entryset.created = created - timedelta(minutes=min(i, 3))
+            entryset.save(update_fields=["created"])
+        cls.expected = sorted(
+            cls.entrysets, key=lambda es: (es.created, es.pk), reverse=True
+        )
+
+    def setUp(self):
+        self.paginator = CursorPaginator(EntrySet.objects.all(), 2)
+
+    def walk_forward(self):
+        page = self.paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = self.paginator.page(page.next_cursor())
+            pages.append(page)
+        return pages
+
+    def test_first_page(self):
+        page = self.paginator.page()
+        self.assertEqual(list(page), self.expected[:2])
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+        self.assertIsNone(page.previous_cursor())
+
+    def test_walks_all_objects_forward(self):
+        pages = self.walk_forward()
+        self.assertEqual([obj for page in pages for obj in page], self.expected)
+        self.assertFalse(pages[-1].has_next())
+        self.assertIsNone(pages[-1].next_cursor())
+
+    def test_walks_back_to_the_first_page(self):
+        pages = self.walk_forward()
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = self.paginator.page(page.previous_cursor())
+            self.assertEqual(list(page), list(expected_page))
+        self.assertFalse(page.has_previous())
+        self.assertTrue(page.has_next())
+
+    def test_ascending_ordering(self):
+        paginator = CursorPaginator(EntrySet.objects.all(), 2, ordering=("created", "pk"))
+        page = paginator.page()
+        objects = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor())
+            objects.extend(page)
+        self.assertEqual(objects, list(reversed(self.expected)))
+
+    def test_position_filter_bounds_index_scan(self):
+        cursor = self.paginator.page().next_cursor()
+        with CaptureQueriesContext(connection) as queries:
+            self.paginator.page(cursor)
+        sql = queries[0]["sql"]
+        self.assertRegex(sql, r'WHERE \("entries_entryset"\."created" <= \S+ AND \(')
+
+    def test_page_does_not_count_objects(self):
+        page = self.paginator.page()
+        with self.assertNumQueries(1):
+            self.paginator.page(page.next_cursor())
+
+    def test_raises_for_invalid_cursor(self):
+        for cursor in ["invalid", "W10", "WyJ4IixbXV0"]:
+            with self.subTest(cursor=cursor):
+                with self.assertRaises(InvalidCursor):
+                    self.paginator.page(cursor)
+
+
+class ApproximateCountTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrysets = entryset_recipe.make(_quantity=3)
+
+    def setUp(self):
+        self.addCleanup(cache.clear)
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=5000)
+    def test_uses_table_estimate_for_unfiltered_queryset(self, estimate_mock):
+        with self.assertNumQueries(0):
+            count = get_approximate_count(EntrySet.objects.all(), threshold=1000)
+        self.assertEqual(count, ObjectsCount(5000, is_approximate=True))
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=10)
+    def test_counts_exactly_under_threshold(self, estimate_mock):
+        count = get_approximate_count(EntrySet.objects.all(), threshold=1000)
+        self.assertEqual(count, ObjectsCount(len(self.entrysets)))
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=None)
+    def test_counts_exactly_without_estimate(self, estimate_mock):
+        count = get_approximate_count(EntrySet.objects.all(), threshold=1)
+        self.assertEqual(count, ObjectsCount(len(self.entrysets)))
+
+    def test_caches_filtered_count_over_threshold(self):
+        qs = EntrySet.objects.filter(pk__in=[es.pk for es in self.entrysets])
+        self.assertEqual(get_approximate_count(qs, threshold=1), ObjectsCount(3))
+        with self.assertNumQueries(0):
+            count = get_approximate_count(qs, threshold=1)
+        self.assertEqual(count, ObjectsCount(3, is_approximate=True))
+
+    def test_does_not_cache_filtered_count_under_threshold(self):
+        qs = EntrySet.objects.filter(pk__in=[es.pk for es in self.entrysets])
+        get_approximate_count(qs, threshold=1000)
+        self.assertIsNone(cache.get(make_count_cache_key(qs)))
+
+    def test_cache_key_depends_on_filter(self):
+        first_key = make_count_cache_key(EntrySet.objects.filter(name="a"))
+        second_key = make_count_cache_key(EntrySet.objects.filter(name="b"))
+        self.assertNotEqual(first_key, second_key)
+
+
+class AnnotationCursorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrysets = entryset_recipe.make(_quantity=4)
+
+    def test_walks_by_annotation(self):
+        rank = ExpressionWrapper(F("id") % 2 * 0.5, output_field=FloatField())
+        qs = EntrySet.objects.annotate(rank=rank)
+        paginator = CursorPaginator(qs, 1, ordering=("-rank", "-pk"))
+        page = paginator.page()
+        objects = list(page)
+        while page.has_next():
+            page = paginator.page(page.next_cursor())
+            objects.extend(page)
+        expected = sorted(self.entrysets, key=lambda es: (es.pk % 2, es.pk), reverse=True)
+        self.assertEqual(objects, expected)
+
+
+class RankedPaginatorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrysets = entryset_recipe.make(_quantity=5)
+        # Two sets share a rank to check the pk tie breaker
+        ranks = [0.9, 0.5, 0.5, 0.3, 0.1]
+        cls.ranked_pks = sorted(
+            [(es.pk, rank) for es, rank in zip(cls.entrysets, ranks)],
+            key=lambda item: (item[1], item[0]),
+            reverse=True,
+        )
+        cls.expected = [pk for pk, _ in cls.ranked_pks]
+
+    def walk_forward(self, paginator):
+        page = paginator.page()
+        pages = [page]
+        while page.has_next():
+            page = paginator.page(page.next_cursor())
+            pages.append(page)
+        return pages
+
+    def test_walks_all_ranked_objects(self):
+        paginator = RankedPaginator(EntrySet.objects.all(), 2, self.ranked_pks)
+        pages = self.walk_forward(paginator)
+        self.assertEqual([obj.pk for page in pages for obj in page], self.expected)
+        self.assertEqual(
+            [obj.rank for page in pages for obj in page],
+            [rank for _, rank in self.ranked_pks],
+        )
+
+    def test_walks_back_to_the_first_page(self):
+        paginator = RankedPaginator(EntrySet.objects.all(), 2, self.ranked_pks)
+        pages = self.walk_forward(paginator)
+        page = pages[-1]
+        for expected_page in reversed(pages[:-1]):
+            page = paginator.page(page.previous_cursor())
+            self.assertEqual(list(page), list(expected_page))
+        self.assertFalse(page.has_previous())
+
+    def test_page_fetches_only_its_objects(self):
+        paginator = RankedPaginator(EntrySet.objects.all(), 2, self.ranked_pks)
+        cursor = paginator.page().next_cursor()
+        with CaptureQueriesContext(connection) as queries:
+            page = paginator.page(cursor)
+        self.assertEqual(len(queries), 1)
+        self.assertNotIn("CASE", queries[0]["sql"])
+        self.assertEqual([obj.pk for obj in page], self.expected[2:4])
+
+    def test_cursors_match_annotated_rank_cursors(self):
+        rank = Case(
+            *[When(pk=pk, then=Value(rank)) for pk, rank in self.ranked_pks],
+            output_field=FloatField(),
+        )
+        qs = EntrySet.objects.annotate(rank=rank)
+        cursor = CursorPaginator(qs, 2, ordering=("-rank", "-pk")).page().next_cursor()
+        paginator = RankedPaginator(EntrySet.objects.all(), 2, self.ranked_pks)
+        self.assertEqual(paginator.page().next_cursor(), cursor)
+        self.assertEqual([obj.pk for obj in paginator.page(cursor)], self.expected[2:4])
+
+    def test_skips_deleted_objects(self):
+        EntrySet.objects.filter(pk=self.expected[0]).delete()
+        paginator = RankedPaginator(EntrySet.objects.all(), 2, self.ranked_pks)
+        self.assertEqual([obj.pk for obj in paginator.page()], self.expected[1:2])
+
+    def test_raises_past_truncated_ids(self):
+        paginator = RankedPaginator(
+            EntrySet.objects.all(), 2, self.ranked_pks, is_truncated=True
+        )
+        cursor = paginator.page().next_cursor()
+        self.assertEqual([obj.pk for obj in paginator.page(cursor)], self.expected[2:4])
+        with self.assertRaises(RankedPksExhausted):
+            paginator.page(paginator.page(cursor).next_cursor())
+
+    def test_counts_truncated_ids_as_lower_bound(self):
+        paginator = RankedPaginator(
+            EntrySet.objects.all(), 2, self.ranked_pks, is_truncated=True
+        )
+        with self.assertNumQueries(0):
+            count = paginator.approximate_count
+        self.assertEqual(count, ObjectsCount(5, is_lower_bound=True))
@@ -76,3 +76,12 @@ class TransformQueryTests(TestCase):
         ).render(Context({"request": self.request}, autoescape=False))
         # fmt: on
         self.assertEqual(out, f"{self.param_key}=/{self.param_value}/")
+
+    def test_removes_parameter_set_to_none(self):
+        # fmt: off
+        out = Template(
+            "{% load common_tags %}"
+            f"{{% transform_query {self.param_key}=None %}}"
+        ).render(Context({"request": self.request}, autoescape=False))
+        # fmt: on
+        self.assertEqual(out, "")
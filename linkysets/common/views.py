@@ -15,9 +15,11 @@ from typing import (
 from django.apps import apps
 from django.contrib.auth.mixins import PermissionRequiredMixin
 from django.core.exceptions import ObjectDoesNotExist
-from django.db.models import Model
+from django.db.models import Model, QuerySet
 from django.http import Http404, HttpRequest, HttpResponse
 
+from .pagination import CursorPage, CursorPaginator, InvalidCursor
+
 
 class QsObjectMeta(NamedTuple):
     name: str
@@ -30,6 +32,20 @@ QsObjectTuple = Tuple[Optional[Model], QsObjectMeta]
 FinalQsObjectTuple = Tuple[Model, QsObjectMeta]
 
 
+def get_cursor_page(
+    queryset: QuerySet, per_page: int, cursor: Optional[str], ordering: Sequence[str]
+) -> CursorPage:
+    paginator = CursorPaginator(queryset, per_page, ordering=ordering)
+    return get_paginator_page(paginator, cursor)
+
+
+def get_paginator_page(paginator: CursorPaginator, cursor: Optional[str]) -> CursorPage:
+    try:
+        return paginator.page(cursor)
+    except InvalidCursor as e:
+        raise Http404(str(e))
+
+
 class QuerystringObjectsMixin:
     request: HttpRequest
 
@@ -96,3 +112,17 @@ class ObjectPermissionRequiredMixin(PermissionRequiredMixin):
         perms = self.get_permission_required()
         obj = getattr(self, "object", self.get_object())  # type: ignore
         return self.request.user.has_perms(perms, obj)
+
+
+class CursorPaginationMixin:
+    request: HttpRequest
+
+    cursor_ordering: ClassVar[Tuple[str, ...]] = ("-created", "-pk")
+    cursor_kwarg: ClassVar[str] = "cursor"
+
+    def paginate_queryset(
+        self, queryset: QuerySet, page_size: int
+    ) -> Tuple[CursorPaginator, CursorPage, CursorPage, bool]:
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        page = get_cursor_page(queryset, page_size, cursor, self.cursor_ordering)
+        return page.paginator, page, page, page.has_other_pages()
@@ -1,5 +1,5 @@
 from django.apps import AppConfig
-from django.db.models import CharField
+from django.db.models import CharField, TextField
 from django.db.models.functions import Lower
 from django.utils.translation import ugettext_lazy as _
 
@@ -9,4 +9,10 @@ class EntriesConfig(AppConfig):
     verbose_name = _("Entries")
 
     def ready(self) -> None:
+        from linkysets.entries import signals  # noqa: F401
+        from linkysets.entries.behavior import warm_up_templates
+        from linkysets.entries.search import TrigramWordSimilar
+
         CharField.register_lookup(Lower)
+        TextField.register_lookup(TrigramWordSimilar)
+        warm_up_templates()
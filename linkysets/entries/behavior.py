@@ -1,11 +1,15 @@
 from __future__ import annotations
 
 import logging
-from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Sequence, cast
+from typing import TYPE_CHECKING, Any, ClassVar, Dict, Optional, Sequence, Type
 from urllib.parse import parse_qs, urlsplit
 
-from django.template import Context, Template
-from django.template.loader import render_to_string
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.dispatch import receiver
+from django.template import engines
+from django.template.backends.django import Template
+from django.template.loader import get_template
 from django.utils.functional import cached_property
 
 if TYPE_CHECKING:
@@ -13,9 +17,14 @@ if TYPE_CHECKING:
 
 logger = logging.getLogger(__name__)
 
+# Compiled templates of the behaviors classes
+_templates: Dict[Type[EntryTypeBehavior], Template] = {}
+
 
 class EntryTypeBehavior:
     mime_types: ClassVar[Optional[Sequence[str]]] = None
+    # Url path extensions that identify the type without requesting the url
+    url_extensions: ClassVar[Optional[Sequence[str]]] = None
     template_name: ClassVar[Optional[str]] = None
     template_string: ClassVar[Optional[str]] = None
 
@@ -30,17 +39,38 @@ class EntryTypeBehavior:
             return False
         return mime_type in cls.mime_types
 
-    def render(self) -> str:
-        if not self.template_string and not self.template_name:
+    @classmethod
+    def is_my_url(cls, entry: Entry, url: str, *args, **kwargs) -> bool:
+        extensions = settings.URL_CLASSIFICATION_EXTENSIONS.get(
+            cls.__name__, cls.url_extensions
+        )
+        if not extensions:
+            return False
+        path = urlsplit(url).path.lower()
+        return path.endswith(tuple(extensions))
+
+    @classmethod
+    def get_template(cls) -> Template:
+        try:
+            return _templates[cls]
+        except KeyError:
+            pass
+
+        if cls.template_name:
+            template = get_template(cls.template_name)
+            if settings.DEBUG:
+                # Template files changes are picked up while developing
+                return template
+        elif cls.template_string:
+            template = engines["django"].from_string(cls.template_string)
+        else:
             raise AttributeError('Either "template_string" or "template_name" is required.')
 
-        context_dict = self.get_render_context()
-        if self.template_name:
-            return render_to_string(self.template_name, context_dict)
+        _templates[cls] = template
+        return template
 
-        context = Context(context_dict)
-        template_string = cast(str, self.template_string)
-        return Template(template_string).render(context)
+    def render(self) -> str:
+        return self.get_template().render(self.get_render_context())
 
     def get_render_context(self) -> Dict[str, Any]:
         return {"entry": self.entry}
@@ -57,6 +87,11 @@ class UrlTypeBehavior(EntryTypeBehavior):
     def is_my_type(cls, *args, **kwargs) -> bool:
         return True
 
+    @classmethod
+    def is_my_url(cls, *args, **kwargs) -> bool:
+        # Any url could be of the other type, so it's never known beforehand
+        return False
+
 
 class ImageTypeBehavior(EntryTypeBehavior):
     template_string = """
@@ -68,6 +103,7 @@ class ImageTypeBehavior(EntryTypeBehavior):
         "image/gif",
         "image/webp",
     ]
+    url_extensions = [".jpg", ".jpeg", ".png", ".gif", ".webp"]
 
 
 class VideoTypeBehavior(EntryTypeBehavior):
@@ -76,6 +112,7 @@ class VideoTypeBehavior(EntryTypeBehavior):
         "video/webm",
         "video/ogg",
     ]
+    url_extensions = [".mp4", ".webm", ".ogv"]
     template_name = "entries/types/video.html"
 
 
@@ -90,6 +127,7 @@ class AudioBehavior(EntryTypeBehavior):
         "audio/webm",
         "audio/flac",
     ]
+    url_extensions = [".wav", ".mp3", ".m4a", ".aac", ".oga", ".opus", ".flac"]
     template_name = "entries/types/audio.html"
 
 
@@ -110,6 +148,16 @@ class YtVideoTypeBehavior(EntryTypeBehavior):
         is_my_mime_type = super().is_my_type(entry, url, mime_type, *args, **kwargs)
         return is_my_mime_type and netloc in cls.YT_NETLOC_VARIANTS
 
+    @classmethod
+    def is_my_url(cls, entry: Entry, url: str, *args, **kwargs) -> bool:
+        parsed_url = urlsplit(url)
+        if parsed_url.netloc not in cls.YT_NETLOC_VARIANTS:
+            return False
+
+        if parsed_url.netloc == "youtu.be":
+            return len(parsed_url.path.strip("/")) > 0
+        return parsed_url.path == "/watch" and "v" in parse_qs(parsed_url.query)
+
     def get_render_context(self):
         context = super().get_render_context()
         context = {
@@ -133,3 +181,22 @@ class YtVideoTypeBehavior(EntryTypeBehavior):
             video_id = parsed_url.path.split("/")[-1]
 
         return video_id
+
+
+def warm_up_templates() -> None:
+    behaviors = [EntryTypeBehavior]
+    while behaviors:
+        behavior_cls = behaviors.pop()
+        behaviors.extend(behavior_cls.__subclasses__())
+        if behavior_cls.template_name or behavior_cls.template_string:
+            behavior_cls.get_template()
+
+
+def clear_templates() -> None:
+    _templates.clear()
+
+
+@receiver(setting_changed)
+def clear_templates_on_setting_change(*, setting: str, **kwargs) -> None:
+    if setting in ["TEMPLATES", "DEBUG"]:
+        clear_templates()
@@ -0,0 +1,122 @@
+from __future__ import annotations
+
+import logging
+from datetime import timedelta
+from typing import Optional
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from . import probing
+from .models import ClassificationJob, Entry, EntrySet
+from .probing import ProbeResult
+from .search_cache import index_entrysets
+
+logger = logging.getLogger(__name__)
+
+
+CLASSIFIED_FIELDS = ["url", "type", "mime_type", "content_length", "probed_at"]
+
+
+def classify_entry(entry: Entry, probe_result: ProbeResult) -> None:
+    entry.url = probe_result.final_url
+    entry.mime_type = probe_result.mime_type or ""
+    entry.content_length = probe_result.content_length
+    entry.probed_at = probe_result.probed_at
+    entry.type = get_entry_type(entry)
+
+
+def clear_probe_metadata(entry: Entry) -> None:
+    # Metadata of the previous url must not be used to classify the new one
+    entry.mime_type = ""
+    entry.content_length = None
+    entry.probed_at = None
+
+
+def reclassify_entry(entry: Entry) -> bool:
+    """
+    Determine the entry type again from the stored probe metadata.
+    Return whether the type has changed.
+    """
+    if entry.probed_at is None and entry.guess_type(entry.url) is None:
+        # Never probed, so the type can't be known without a request
+        return False
+
+    type_ = get_entry_type(entry)
+    if type_ == entry.type:
+        return False
+    entry.type = type_
+    return True
+
+
+def get_entry_type(entry: Entry) -> Entry.EntryType:
+    type_ = entry.guess_type(entry.url) if settings.URL_FAST_CLASSIFICATION else None
+    if type_ is None:
+        type_ = entry.determine_type(entry.url, entry.mime_type)
+    return type_
+
+
+def classify_pending_entries(batch_size: Optional[int] = None) -> int:
+    """
+    Classify a batch of queued entries and return the number of processed jobs.
+    """
+    if batch_size is None:
+        batch_size = settings.DEFERRED_CLASSIFICATION_BATCH_SIZE
+
+    # Probes take up to the deadline, so the jobs are claimed and the entries are
+    # locked only to save the results, edits of them don't wait on the requests
+    claimed_jobs = ClassificationJob.objects.claim_available(batch_size)
+    if not claimed_jobs:
+        return 0
+
+    claimed_urls = {job.pk: job.entry.url for job in claimed_jobs}
+    results = probing.probe_urls(claimed_urls.values())
+
+    with transaction.atomic():
+        jobs = ClassificationJob.objects.lock_claimed(list(claimed_urls))
+        classified_entries, rewritten_entries, finished_jobs, retried_jobs = [], [], [], []
+        for job in jobs:
+            if job.entry.url != claimed_urls[job.pk]:
+                # Edited while being probed, the new url is probed by the next run
+                job.run_after = timezone.now()
+                retried_jobs.append(job)
+                continue
+
+            probe_result = results[job.entry.url]
+            if probe_result.is_reachable:
+                if probe_result.final_url != job.entry.url:
+                    rewritten_entries.append(job.entry)
+                classify_entry(job.entry, probe_result)
+                classified_entries.append(job.entry)
+                finished_jobs.append(job.pk)
+                continue
+
+            job.attempts += 1
+            if job.attempts >= settings.DEFERRED_CLASSIFICATION_MAX_ATTEMPTS:
+                logger.info(
+                    'Entry "%s" is left as url after %d failed attempts.',
+                    job.entry,
+                    job.attempts,
+                )
+                finished_jobs.append(job.pk)
+            else:
+                delay = settings.DEFERRED_CLASSIFICATION_RETRY_DELAY * job.attempts
+                job.run_after = timezone.now() + timedelta(seconds=delay)
+                retried_jobs.append(job)
+
+        Entry.objects.bulk_update(classified_entries, CLASSIFIED_FIELDS)
+        if rewritten_entries:
+            # bulk_update sends no signals, the sets are searched by their entries urls
+            index_entrysets(
+                EntrySet.objects.filter(entries__in=rewritten_entries).distinct()
+            )
+        ClassificationJob.objects.bulk_update(retried_jobs, ["attempts", "run_after"])
+        ClassificationJob.objects.filter(pk__in=finished_jobs).delete()
+
+    logger.debug(
+        "Classified %d entries, %d jobs will be retried.",
+        len(classified_entries),
+        len(retried_jobs),
+    )
+    return len(claimed_jobs)
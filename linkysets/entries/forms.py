@@ -1,11 +1,9 @@
 from __future__ import annotations
 
-import cgi
 import itertools
 import logging
-from typing import Sequence
+from typing import List, Optional, Sequence
 
-import requests
 from django import forms
 from django.conf import settings
 from django.db.models import QuerySet
@@ -15,7 +13,10 @@ from django.utils.translation import ugettext_lazy as _
 
 from linkysets.common.forms import AssignUserMixin, UniqueAutoIdMixin
 
+from . import probing
+from .classification import classify_entry, clear_probe_metadata
 from .models import Entry, EntrySet
+from .probing import ProbeResult
 
 logger = logging.getLogger(__name__)
 
@@ -29,6 +30,10 @@ class EntrySetForm(AssignUserMixin[EntrySet], forms.ModelForm):
 
 
 class EntryForm(forms.ModelForm):
+    probe_result: Optional[ProbeResult] = None
+    # Entry is saved as url and classified by the worker later
+    is_pending = False
+
     class Meta:
         model = Entry
         fields = ["type", "url", "label"]
@@ -43,13 +48,19 @@ class EntryForm(forms.ModelForm):
             return cleaned_data
 
         if url != self.instance.url:
-            try:
-                with requests.Session() as session:
-                    session.max_redirects = 2
-                    response = session.head(
-                        url, allow_redirects=True, timeout=settings.DEFAULT_REQUESTS_TIMEOUT
-                    )
-            except requests.RequestException:
+            fast_type = self.get_fast_type(url)
+            if fast_type is not None and not settings.URL_FAST_CLASSIFICATION_STRICT:
+                clear_probe_metadata(self.instance)
+                logger.debug('Entry type got guessed as "%s"', fast_type.label)
+                return {**cleaned_data, "type": fast_type}
+
+            if settings.DEFERRED_CLASSIFICATION:
+                clear_probe_metadata(self.instance)
+                self.is_pending = True
+                return {**cleaned_data, "type": fast_type or Entry.EntryType.URL}
+
+            probe_result = self.get_probe_result(url)
+            if not probe_result.is_reachable:
                 validation_error = ValidationError(
                     _("Could not reach target url: %(url)s"),
                     code="inaccessible_url",
@@ -57,21 +68,10 @@ class EntryForm(forms.ModelForm):
                 )
                 self.add_error("url", validation_error)
             else:
-                url = response.url
-                cleaned_data = {**cleaned_data, "url": url}
-                logger.debug('Entry url got tested to "%s"', url)
-
-                content_type = response.headers.get("content-type")
-                if content_type:
-                    mime_type, params = cgi.parse_header(content_type)
-                    logger.debug(
-                        '"%s" mime type is "%s". Parameters: %s', url, mime_type, params,
-                    )
-                    type_ = self.instance.determine_type(url, mime_type)
-                else:
-                    type_ = Entry.EntryType.URL
-
-                cleaned_data = {**cleaned_data, "type": type_}
+                # Stores the probe metadata on the instance as well
+                classify_entry(self.instance, probe_result)
+                type_ = self.instance.type
+                cleaned_data = {**cleaned_data, "url": self.instance.url, "type": type_}
                 logger.debug(
                     'Entry type got updated to "%s"',
                     Entry.EntryType(type_).label,  # type: ignore
@@ -79,8 +79,54 @@ class EntryForm(forms.ModelForm):
 
         return cleaned_data
 
+    def get_probe_result(self, url: str) -> ProbeResult:
+        if self.probe_result is not None and self.probe_result.url == url:
+            return self.probe_result
+        return probing.probe_url(url)
+
+    def get_fast_type(self, url: str) -> Optional[Entry.EntryType]:
+        if not settings.URL_FAST_CLASSIFICATION:
+            return None
+        return self.instance.guess_type(url)
+
+    def get_url_to_probe(self) -> Optional[str]:
+        # Runs before the form is cleaned, so the raw url is cleaned separately
+        field = self.fields["url"]
+        try:
+            url = field.clean(self["url"].data)
+        except ValidationError:
+            return None
+
+        if not url or url == self.instance.url or settings.DEFERRED_CLASSIFICATION:
+            return None
+        fast_type = self.get_fast_type(url)
+        if fast_type is not None and not settings.URL_FAST_CLASSIFICATION_STRICT:
+            return None
+        return url
+
 
 class EntryFormsetBase(BaseInlineFormSet):
+    def full_clean(self) -> None:
+        if self.is_bound:
+            self.probe_forms_urls()
+        super().full_clean()
+
+    def probe_forms_urls(self) -> None:
+        # Probe all urls at once, so the forms don't wait on the requests one by one
+        forms_urls = [(form, form.get_url_to_probe()) for form in self.forms]
+        probe_results = probing.probe_urls(url for _, url in forms_urls if url)
+        for form, url in forms_urls:
+            if url:
+                form.probe_result = probe_results[url]
+
+    @property
+    def pending_entries(self) -> List[Entry]:
+        return [
+            form.instance
+            for form in self.forms
+            if form.is_pending and form not in self.deleted_forms
+        ]
+
     def clean(self):
         active_forms = [form for form in self.forms if form not in self.deleted_forms]
 
@@ -0,0 +1,47 @@
+import itertools
+import time
+
+from django.core.management.base import BaseCommand
+
+from linkysets.entries import behavior
+from linkysets.entries.models import Entry
+
+_TYPE_URLS = {
+    Entry.EntryType.URL: "https://example.com/article",
+    Entry.EntryType.IMAGE: "https://example.com/image.png",
+    Entry.EntryType.VIDEO: "https://example.com/video.mp4",
+    Entry.EntryType.YT_VIDEO: "https://www.youtube.com/watch?v=dQw4w9WgXcQ",
+    Entry.EntryType.AUDIO: "https://example.com/audio.mp3",
+}
+
+
+class Command(BaseCommand):
+    help = "Measure per entry render cost with compiled and with uncached templates."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--entries", type=int, default=1000, help="Number of entries to render."
+        )
+
+    def handle(self, *args, **options):
+        types = itertools.cycle(_TYPE_URLS.items())
+        entries = [
+            Entry(type=type_, url=url, label=f"Entry {i}")
+            for i, (type_, url) in zip(range(options["entries"]), types)
+        ]
+
+        uncached = self.measure(entries, before_render=behavior.clear_templates)
+        behavior.warm_up_templates()
+        compiled = self.measure(entries)
+
+        self.stdout.write(f"uncached: {uncached * 1e6:.1f} us/entry")
+        self.stdout.write(f"compiled: {compiled * 1e6:.1f} us/entry")
+        self.stdout.write(self.style.SUCCESS(f"speedup: {uncached / compiled:.1f}x"))
+
+    def measure(self, entries, before_render=None):
+        start = time.perf_counter()
+        for entry in entries:
+            if before_render is not None:
+                before_render()
+            entry.render()
+        return (time.perf_counter() - start) / len(entries)
@@ -0,0 +1,74 @@
+import random
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand, CommandError
+
+from linkysets.entries.models import EntrySet
+from linkysets.entries.search_backends import PostgresSearchBackend, SqliteSearchBackend
+
+
+class Command(BaseCommand):
+    help = (
+        "Compare the search backends on the existing entry sets. The sqlite index is "
+        "built in a temporary file."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--queries", type=int, default=200, help="Number of searches per backend."
+        )
+        parser.add_argument("--page-size", type=int, default=10, help="Results per search.")
+
+    def handle(self, *args, **options):
+        terms = self.get_terms(options["queries"])
+        if not terms:
+            raise CommandError("There are no named entry sets to make search terms from.")
+
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            backends = {
+                "postgres": PostgresSearchBackend(),
+                "sqlite": SqliteSearchBackend(Path(tmp_dir) / "search.sqlite3"),
+            }
+            for name, backend in backends.items():
+                start = time.perf_counter()
+                count = backend.rebuild()
+                self.stdout.write(
+                    f"{name}: {count} sets indexed in {time.perf_counter() - start:.1f}s"
+                )
+                timings = [
+                    self.measure(backend, term, options["page_size"]) for term in terms
+                ]
+                timings.sort()
+                p95 = (
+                    timings[int(len(timings) * 0.95) - 1]
+                    if len(timings) > 1
+                    else timings[0]
+                )
+                self.stdout.write(
+                    f"{name}: mean {statistics.mean(timings) * 1e3:.2f} ms, "
+                    f"p95 {p95 * 1e3:.2f} ms per search"
+                )
+
+    def get_terms(self, count):
+        names = list(
+            EntrySet.objects.exclude(name="")
+            .order_by("?")
+            .values_list("name", flat=True)[:count]
+        )
+        words = [word for name in names for word in name.split() if len(word) > 2]
+        if not words:
+            return []
+        # Whole words and word prefixes
+        return [
+            word if i % 2 else word[: max(3, len(word) // 2)]
+            for i, word in enumerate(random.choices(words, k=count))
+        ]
+
+    def measure(self, backend, term, page_size):
+        start = time.perf_counter()
+        qs = backend.search(EntrySet.objects.for_list(), term)
+        list(qs.order_by("-rank", "-pk")[:page_size])
+        return time.perf_counter() - start
@@ -0,0 +1,25 @@
+from django.core.management.base import BaseCommand
+
+from linkysets.entries import rendering
+
+
+class Command(BaseCommand):
+    help = (
+        "Show rendered entries cache statistics. "
+        "Workers add their counts once per ENTRY_RENDER_STATS_FLUSH_INTERVAL."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after showing them."
+        )
+
+    def handle(self, *args, **options):
+        stats = rendering.cache_stats.get()
+        self.stdout.write(f"render cache hits: {stats['hits']}")
+        self.stdout.write(f"render cache misses: {stats['misses']}")
+        self.stdout.write(f"render cache hit_ratio: {stats['hit_ratio']:.2%}")
+
+        if options["reset"]:
+            rendering.cache_stats.reset()
+            self.stdout.write(self.style.SUCCESS("Entry render statistics got reset."))
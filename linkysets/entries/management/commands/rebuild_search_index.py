@@ -0,0 +1,27 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from linkysets.entries.search_backends import get_search_backend
+from linkysets.entries.search_cache import invalidate_search_results
+
+
+class Command(BaseCommand):
+    help = "Rebuild the entry sets index of the configured search backend."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=500, help="Entry sets indexed at once."
+        )
+
+    def handle(self, *args, **options):
+        backend = get_search_backend()
+        start = time.perf_counter()
+        count = backend.rebuild(chunk_size=options["chunk_size"])
+        elapsed = time.perf_counter() - start
+        invalidate_search_results()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"{count} entry sets indexed by {type(backend).__name__} in {elapsed:.1f}s."
+            )
+        )
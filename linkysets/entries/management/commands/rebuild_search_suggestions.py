@@ -0,0 +1,26 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from linkysets.entries.models import SearchSuggestion
+
+
+class Command(BaseCommand):
+    help = "Rebuild the search suggestions from the set names, labels, authors and domains."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--interval",
+            type=float,
+            help="Keep rebuilding the suggestions every given number of seconds.",
+        )
+
+    def handle(self, *args, **options):
+        while True:
+            start = time.perf_counter()
+            count = SearchSuggestion.objects.rebuild()
+            elapsed = time.perf_counter() - start
+            self.stdout.write(f"{count} search suggestions rebuilt in {elapsed:.1f}s.")
+            if options["interval"] is None:
+                return
+            time.sleep(options["interval"])
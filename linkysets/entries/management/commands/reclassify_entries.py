@@ -0,0 +1,70 @@
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from linkysets.entries.classification import reclassify_entry
+from linkysets.entries.models import Entry
+
+
+class Command(BaseCommand):
+    help = (
+        "Determine types of the entries again from their stored probe metadata, "
+        "without requesting their urls."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--chunk-size", type=int, default=2000, help="Number of entries per chunk."
+        )
+        parser.add_argument(
+            "--checkpoint",
+            type=Path,
+            help="File to store the last processed entry id in and to resume from.",
+        )
+        parser.add_argument(
+            "--dry-run", action="store_true", help="Count the changes without saving them."
+        )
+
+    def handle(self, *args, **options):
+        checkpoint = options["checkpoint"]
+        last_pk = self.read_checkpoint(checkpoint)
+        if last_pk:
+            self.stdout.write(f"Resuming after entry {last_pk}.")
+
+        fields = ["pk", "url", "type", "mime_type", "probed_at"]
+        processed = changed = 0
+        start = time.monotonic()
+        while True:
+            # Keyset pagination keeps chunks queries fast and resumable
+            qs = Entry.objects.filter(pk__gt=last_pk).order_by("pk").only(*fields)
+            chunk = list(qs[: options["chunk_size"]])
+            if not chunk:
+                break
+
+            changed_entries = [entry for entry in chunk if reclassify_entry(entry)]
+            if not options["dry_run"]:
+                Entry.objects.bulk_update(changed_entries, ["type"])
+                self.write_checkpoint(checkpoint, chunk[-1].pk)
+
+            last_pk = chunk[-1].pk
+            processed += len(chunk)
+            changed += len(changed_entries)
+            elapsed = max(time.monotonic() - start, 1e-6)
+            self.stdout.write(
+                f"Processed {processed} entries, changed {changed} "
+                f"({processed / elapsed:.0f} entries/s)."
+            )
+
+        self.stdout.write(
+            self.style.SUCCESS(f"Done: {changed} of {processed} entries changed type.")
+        )
+
+    def read_checkpoint(self, checkpoint):
+        if checkpoint is None or not checkpoint.exists():
+            return 0
+        return int(checkpoint.read_text().strip() or 0)
+
+    def write_checkpoint(self, checkpoint, pk):
+        if checkpoint is not None:
+            checkpoint.write_text(str(pk))
@@ -0,0 +1,23 @@
+from django.core.management.base import BaseCommand
+from django.db import transaction
+
+from linkysets.entries.models import Entry, EntrySet
+from linkysets.users.models import User
+
+
+class Command(BaseCommand):
+    help = "Recompute the stored counters of the entry sets and entries and users stats."
+
+    def handle(self, *args, **options):
+        with transaction.atomic():
+            qs = EntrySet.objects.all()
+            qs.recount_entries()
+            updated = qs.recount_replies()
+            updated_entries = Entry.objects.recount_sets()
+            updated_users = User.objects.recount_stats()
+
+        self.stdout.write(self.style.SUCCESS(f"Counters of {updated} entry sets repaired."))
+        self.stdout.write(
+            self.style.SUCCESS(f"Counters of {updated_entries} entries repaired.")
+        )
+        self.stdout.write(self.style.SUCCESS(f"Stats of {updated_users} users repaired."))
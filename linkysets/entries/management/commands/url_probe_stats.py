@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+
+from linkysets.entries import probing
+
+
+class Command(BaseCommand):
+    help = "Show url probe cache and circuit breakers statistics."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--host",
+            action="append",
+            default=[],
+            dest="hosts",
+            help="Show circuit breaker state of the host. Can be passed multiple times.",
+        )
+        parser.add_argument(
+            "--reset", action="store_true", help="Reset the counters after showing them."
+        )
+
+    def handle(self, *args, **options):
+        self.write_counters("cache", probing.cache_stats.get())
+        self.write_counters("breaker", probing.breaker_counters.get())
+
+        breaker = probing.CircuitBreaker(options["hosts"])
+        for host in options["hosts"]:
+            state = breaker.get_state(host)
+            self.stdout.write(f"{host}: {state} ({breaker.failures[host]} failures)")
+
+        if options["reset"]:
+            probing.cache_stats.reset()
+            probing.breaker_counters.reset()
+            self.stdout.write(self.style.SUCCESS("Url probe statistics got reset."))
+
+    def write_counters(self, prefix, counters):
+        for name, value in counters.items():
+            if isinstance(value, float):
+                value = f"{value:.2%}"
+            self.stdout.write(f"{prefix} {name}: {value}")
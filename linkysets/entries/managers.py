@@ -1,52 +1,160 @@
 from __future__ import annotations
 
-from typing import TYPE_CHECKING, cast
+from collections import Counter
+from datetime import timedelta
+from typing import TYPE_CHECKING, Iterable, List
+from urllib.parse import urlsplit
 
 from django.apps import apps
+from django.conf import settings
+from django.db import transaction
 from django.db.models import Count, Manager, OuterRef, Prefetch, QuerySet, Subquery
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from . import search, search_cache
 
 if TYPE_CHECKING:
-    from .models import EntrySet
+    from .models import ClassificationJob, Entry, EntrySet, SearchSuggestion
 
     EntrySetQuerySetBase = QuerySet[EntrySet]
-    EntrySetManagerBase = Manager[EntrySet]
+    EntryQuerySetBase = QuerySet[Entry]
+    ClassificationJobManagerBase = Manager[ClassificationJob]
+    SearchSuggestionQuerySetBase = QuerySet[SearchSuggestion]
 else:
     EntrySetQuerySetBase = QuerySet
-    EntrySetManagerBase = Manager
+    EntryQuerySetBase = QuerySet
+    ClassificationJobManagerBase = Manager
+    SearchSuggestionQuerySetBase = QuerySet
+
+
+MINIMAL_FIELDS = ["name", "author", "author__username"]
+
+LIST_FIELDS = [*MINIMAL_FIELDS, "created", "num_entries", "num_replies"]
+
+ENTRY_LIST_FIELDS = ["type", "url", "label", "origin", "num_of_sets"]
 
 
 class EntrySetQuerySet(EntrySetQuerySetBase):
-    def num_entries(self) -> EntrySetQuerySet:
-        return self.annotate(num_entries=Count("entries"))  # type: ignore
+    def recount_entries(self) -> int:
+        m2m_model = self.model.entries.through
+        num_entries_qs = m2m_model.objects.filter(entryset=OuterRef("pk")).order_by()
+        num_entries_qs = num_entries_qs.values("entryset").annotate(count=Count("*"))
+        return self.update(
+            num_entries=Coalesce(Subquery(num_entries_qs.values("count")), 0)
+        )
+
+    def update_search_index(self) -> int:
+        return search.update_search_index(self)
+
+    def search(self, term: str, complete: bool = False) -> EntrySetQuerySet:
+        return search_cache.search_entrysets(self, term, complete=complete)
+
+    def recount_replies(self) -> int:
+        Reply = apps.get_model("replies.Reply")
+        num_replies_qs = Reply.objects.filter(entryset=OuterRef("pk")).order_by()
+        num_replies_qs = num_replies_qs.values("entryset").annotate(count=Count("*"))
+        return self.update(
+            num_replies=Coalesce(Subquery(num_replies_qs.values("count")), 0)
+        )
+
+    def minimal(self) -> EntrySetQuerySet:
+        # Enough for the string representation, urls and permissions checks
+        return self.select_related("author").only(*MINIMAL_FIELDS)
+
+    def for_list(self) -> EntrySetQuerySet:
+        qs = self.select_related("author").only(*LIST_FIELDS)
+        return qs.prefetch_entries()
 
-    def num_replies(self) -> EntrySetQuerySet:
-        return self.annotate(num_replies=Count("replies"))  # type: ignore
+    def for_detail(self) -> EntrySetQuerySet:
+        # Replies version keys the cached thread html
+        return self.for_list().only(*LIST_FIELDS, "replies_version")
 
     def prefetch_entries(self) -> EntrySetQuerySet:
         Entry = apps.get_model("entries.Entry")
-        # Annotate entry sets count in prefetch subquery
-        # https://stackoverflow.com/a/44474268/10079612
-        m2m_model = Entry.sets.through
-        m2m_qs = m2m_model.objects.filter(entry=OuterRef("pk")).values("pk")
-        num_of_sets_qs = m2m_qs.annotate(num_of_sets=Count("*")).values("num_of_sets")
-        num_of_sets_qs.query.group_by = []
-
-        qs = Entry.objects.annotate(num_of_sets=Subquery(num_of_sets_qs))
-        qs = qs.select_related("origin")
+        qs = Entry.objects.only(*ENTRY_LIST_FIELDS)
         return self.prefetch_related(Prefetch("entries", queryset=qs))
 
-    def prefetch_replies(self) -> EntrySetQuerySet:
-        Reply = apps.get_model("replies.Reply")
-        return self.prefetch_related(
-            Prefetch("replies", queryset=Reply.objects.select_related("author"))
+
+class EntryQuerySet(EntryQuerySetBase):
+    def recount_sets(self) -> int:
+        m2m_model = self.model.sets.through
+        num_of_sets_qs = m2m_model.objects.filter(entry=OuterRef("pk")).order_by()
+        num_of_sets_qs = num_of_sets_qs.values("entry").annotate(count=Count("*"))
+        return self.update(
+            num_of_sets=Coalesce(Subquery(num_of_sets_qs.values("count")), 0)
+        )
+
+    def most_reposted(self) -> EntryQuerySet:
+        return self.filter(num_of_sets__gt=1).order_by("-num_of_sets", "-pk")
+
+
+class ClassificationJobManager(ClassificationJobManagerBase):
+    def enqueue(self, entries: Iterable[Entry]) -> None:
+        jobs = [self.model(entry=entry) for entry in entries]
+        # An entry that is already queued is classified by its current url anyway
+        self.bulk_create(jobs, ignore_conflicts=True)
+
+    def claim_available(self, batch_size: int) -> List[ClassificationJob]:
+        """
+        Lease a batch of due jobs to the worker by postponing them, so they can be
+        probed without holding locks. Jobs of a crashed worker are due again once
+        their lease runs out.
+        """
+        lease_end = timezone.now() + timedelta(
+            seconds=settings.DEFERRED_CLASSIFICATION_LEASE
         )
+        with transaction.atomic():
+            qs = self.filter(run_after__lte=timezone.now()).select_related("entry")
+            # Jobs claimed by other workers are skipped, the entries aren't locked
+            qs = qs.select_for_update(skip_locked=True, of=("self",))
+            jobs = list(qs.order_by("run_after", "pk")[:batch_size])
+            self.filter(pk__in=[job.pk for job in jobs]).update(run_after=lease_end)
+        return jobs
+
+    def lock_claimed(self, pks: Iterable[int]) -> List[ClassificationJob]:
+        """
+        Lock the claimed jobs that still exist with their entries, so the entries
+        can't be edited until the results are saved.
+        """
+        qs = self.filter(pk__in=pks).select_related("entry").select_for_update()
+        return list(qs.order_by("pk"))
+
+
+class SearchSuggestionQuerySet(SearchSuggestionQuerySetBase):
+    def for_prefix(self, prefix: str, limit: int) -> SearchSuggestionQuerySet:
+        qs = self.filter(normalized__startswith=prefix.lower())
+        return qs.order_by("-weight", "normalized")[:limit]
+
+    def rebuild(self) -> int:
+        Kind = self.model.Kind
+        weights: Counter = Counter()
+        EntrySet = apps.get_model("entries.EntrySet")
+        names_qs = EntrySet.objects.exclude(name="").values_list("name")
+        for name, weight in names_qs.annotate(weight=Count("pk")).order_by():
+            weights[Kind.NAME, name] += weight
+
+        Entry = apps.get_model("entries.Entry")
+        labels_qs = Entry.objects.exclude(label="").values_list("label")
+        for label, weight in labels_qs.annotate(weight=Count("pk")).order_by():
+            weights[Kind.LABEL, label] += weight
+        for url in Entry.objects.values_list("url", flat=True).iterator():
+            domain = urlsplit(url).hostname or ""
+            if domain.startswith("www."):
+                domain = domain[len("www.") :]
+            if domain:
+                weights[Kind.DOMAIN, domain] += 1
 
+        User = apps.get_model(settings.AUTH_USER_MODEL)
+        users_qs = User.objects.filter(num_sets__gt=0)
+        for username, weight in users_qs.values_list("username", "num_sets").order_by():
+            weights[Kind.USERNAME, username] += weight
 
-class EntrySetManager(EntrySetManagerBase):
-    def get_queryset(self) -> EntrySetQuerySet:
-        qs = super().get_queryset()
-        qs = cast(EntrySetQuerySet, qs)
-        qs = qs.select_related("author")
-        qs = qs.prefetch_entries()
-        qs = qs.num_entries().num_replies()
-        return qs
+        suggestions = [
+            self.model(kind=kind, text=text, normalized=text.lower(), weight=weight)
+            for (kind, text), weight in weights.items()
+        ]
+        with transaction.atomic():
+            self.all().delete()
+            self.bulk_create(suggestions, batch_size=1000)
+        return len(suggestions)
@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+import django.db.models.deletion
+import django.utils.timezone
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0003_auto_20200714_1625'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ClassificationJob',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('attempts', models.PositiveSmallIntegerField(default=0, verbose_name='attempts')),
+                ('run_after', models.DateTimeField(db_index=True, default=django.utils.timezone.now, verbose_name='run after')),
+                ('entry', models.OneToOneField(on_delete=django.db.models.deletion.CASCADE, related_name='classification_job', to='entries.entry', verbose_name='entry')),
+            ],
+            options={
+                'verbose_name': 'classification job',
+                'verbose_name_plural': 'classification jobs',
+            },
+        ),
+    ]
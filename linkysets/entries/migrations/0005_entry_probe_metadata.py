@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0004_classificationjob'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='content_length',
+            field=models.PositiveBigIntegerField(blank=True, editable=False, null=True, verbose_name='content length'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='mime_type',
+            field=models.CharField(blank=True, editable=False, max_length=255, verbose_name='mime type'),
+        ),
+        migrations.AddField(
+            model_name='entry',
+            name='probed_at',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='probed at'),
+        ),
+    ]
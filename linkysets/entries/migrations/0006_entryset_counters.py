@@ -0,0 +1,40 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_entries_and_replies(apps, schema_editor):
+    EntrySet = apps.get_model('entries', 'EntrySet')
+    Reply = apps.get_model('replies', 'Reply')
+    entries_qs = EntrySet.entries.through.objects.filter(entryset=OuterRef('pk')).order_by()
+    entries_qs = entries_qs.values('entryset').annotate(count=Count('*')).values('count')
+    replies_qs = Reply.objects.filter(entryset=OuterRef('pk')).order_by()
+    replies_qs = replies_qs.values('entryset').annotate(count=Count('*')).values('count')
+    EntrySet.objects.update(
+        num_entries=Coalesce(Subquery(entries_qs), 0),
+        num_replies=Coalesce(Subquery(replies_qs), 0),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replies', '0001_initial'),
+        ('entries', '0005_entry_probe_metadata'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entryset',
+            name='num_entries',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of entries'),
+        ),
+        migrations.AddField(
+            model_name='entryset',
+            name='num_replies',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of replies'),
+        ),
+        migrations.RunPython(count_entries_and_replies, migrations.RunPython.noop),
+    ]
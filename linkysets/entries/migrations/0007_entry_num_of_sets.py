@@ -0,0 +1,28 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, OuterRef, Subquery
+from django.db.models.functions import Coalesce
+
+
+def count_sets(apps, schema_editor):
+    Entry = apps.get_model('entries', 'Entry')
+    sets_qs = Entry.sets.through.objects.filter(entry=OuterRef('pk')).order_by()
+    sets_qs = sets_qs.values('entry').annotate(count=Count('*')).values('count')
+    Entry.objects.update(num_of_sets=Coalesce(Subquery(sets_qs), 0))
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0006_entryset_counters'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entry',
+            name='num_of_sets',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='number of sets'),
+        ),
+        migrations.RunPython(count_sets, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0007_entry_num_of_sets'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='entryset',
+            index=models.Index(fields=['created', 'id'], name='entryset_created_id_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entryset',
+            index=models.Index(fields=['author', 'created', 'id'], name='entryset_author_created_idx'),
+        ),
+    ]
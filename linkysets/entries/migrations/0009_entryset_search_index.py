@@ -0,0 +1,73 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+import django.contrib.postgres.indexes
+import django.contrib.postgres.search
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.search import SearchVector
+from django.db import migrations, models
+from django.db.models import F, Func, OuterRef, Subquery, Value
+from django.db.models.functions import Coalesce, Concat, Lower
+
+
+class Unaccent(Func):
+    function = 'UNACCENT'
+
+
+class UrlTokens(Func):
+    function = 'REGEXP_REPLACE'
+    template = "%(function)s(%(expressions)s, '[^[:alnum:]]+', ' ', 'g')"
+
+
+def index_entrysets(apps, schema_editor):
+    EntrySet = apps.get_model('entries', 'EntrySet')
+    User = apps.get_model('users', 'User')
+    m2m_qs = EntrySet.entries.through.objects.filter(entryset=OuterRef('pk')).order_by()
+    m2m_qs = m2m_qs.values('entryset')
+    labels_qs = m2m_qs.annotate(text=StringAgg('entry__label', ' ')).values('text')
+    urls_qs = m2m_qs.annotate(text=StringAgg(UrlTokens('entry__url'), ' ')).values('text')
+    username_qs = User.objects.filter(pk=OuterRef('author_id')).values('username')
+
+    username = Coalesce(Subquery(username_qs), Value(''))
+    labels = Coalesce(Subquery(labels_qs), Value(''))
+    urls = Coalesce(Subquery(urls_qs), Value(''))
+    space = Value(' ')
+    document = Concat(F('name'), space, username, space, labels, space, urls)
+    EntrySet.objects.update(
+        search_document=Unaccent(Lower(document)),
+        search_vector=(
+            SearchVector('name', weight='A', config='simple')
+            + SearchVector(username, weight='B', config='simple')
+            + SearchVector(labels, weight='B', config='simple')
+            + SearchVector(urls, weight='C', config='simple')
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0008_entryset_keyset_indexes'),
+        ('users', '0001_initial'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entryset',
+            name='search_document',
+            field=models.TextField(blank=True, editable=False, verbose_name='search document'),
+        ),
+        migrations.AddField(
+            model_name='entryset',
+            name='search_vector',
+            field=django.contrib.postgres.search.SearchVectorField(editable=False, null=True, verbose_name='search vector'),
+        ),
+        migrations.RunPython(index_entrysets, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name='entryset',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_vector'], name='entryset_search_vector_idx'),
+        ),
+        migrations.AddIndex(
+            model_name='entryset',
+            index=django.contrib.postgres.indexes.GinIndex(fields=['search_document'], name='entryset_search_document_idx', opclasses=['gin_trgm_ops']),
+        ),
+    ]
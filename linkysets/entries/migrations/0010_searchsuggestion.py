@@ -0,0 +1,35 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0009_entryset_search_index'),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='SearchSuggestion',
+            fields=[
+                ('id', models.AutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('kind', models.CharField(choices=[('name', 'Set name'), ('label', 'Entry label'), ('username', 'Username'), ('domain', 'Domain')], max_length=10, verbose_name='kind')),
+                ('text', models.CharField(max_length=255, verbose_name='text')),
+                ('normalized', models.CharField(editable=False, max_length=255, verbose_name='normalized text')),
+                ('weight', models.PositiveIntegerField(default=0, verbose_name='weight')),
+            ],
+            options={
+                'verbose_name': 'search suggestion',
+                'verbose_name_plural': 'search suggestions',
+            },
+        ),
+        migrations.AddIndex(
+            model_name='searchsuggestion',
+            index=models.Index(fields=['normalized'], name='search_suggestion_prefix_idx', opclasses=['varchar_pattern_ops']),
+        ),
+        migrations.AddConstraint(
+            model_name='searchsuggestion',
+            constraint=models.UniqueConstraint(fields=('kind', 'text'), name='unique_search_suggestion'),
+        ),
+    ]
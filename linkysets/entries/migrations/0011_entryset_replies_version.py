@@ -0,0 +1,18 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('entries', '0010_searchsuggestion'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='entryset',
+            name='replies_version',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='replies version'),
+        ),
+    ]
@@ -3,6 +3,7 @@ from typing import Any, ClassVar, Dict, Optional, cast
 from linkysets.common.mixins import ObjectPermissionMixin
 from linkysets.common.typing import SupportsStr
 
+from .rendering import prime_entrysets_render_cache
 from .utils import join_page_title
 
 
@@ -37,3 +38,14 @@ class PageTitleMixin:
 
 class EntrySetPermissionMixin(ObjectPermissionMixin):
     pass
+
+
+class PrimeEntriesRenderMixin:
+    """
+    Fetch the cached html of the listed entry sets entries in one cache query.
+    """
+
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)  # type: ignore
+        prime_entrysets_render_cache(context["object_list"])
+        return context
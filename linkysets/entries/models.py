@@ -2,18 +2,26 @@ from __future__ import annotations
 
 import logging
 from collections import OrderedDict
-from typing import cast
+from typing import Optional, cast
 
+from django.contrib.postgres.indexes import GinIndex
+from django.contrib.postgres.search import SearchVectorField
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.shortcuts import reverse  # type: ignore
+from django.utils import timezone
 from django.utils.translation import ugettext_lazy as _
 
 from linkysets.common.models import AuthoredModel, TimestampedModel
 
-from . import behavior
+from . import behavior, rendering
 from .behavior import EntryTypeBehavior
-from .managers import EntrySetManager, EntrySetQuerySet
+from .managers import (
+    ClassificationJobManager,
+    EntryQuerySet,
+    EntrySetQuerySet,
+    SearchSuggestionQuerySet,
+)
 
 logger = logging.getLogger(__name__)
 
@@ -28,12 +36,38 @@ class EntrySet(TimestampedModel, AuthoredModel):
         verbose_name=_("entries"),
         help_text=_("Entries that this set contains."),
     )
+    # Counters are kept by the signals handlers, so lists don't aggregate them
+    num_entries = models.PositiveIntegerField(
+        _("number of entries"), default=0, editable=False
+    )
+    num_replies = models.PositiveIntegerField(
+        _("number of replies"), default=0, editable=False
+    )
+    replies_version = models.PositiveIntegerField(
+        _("replies version"), default=0, editable=False
+    )
+    # Name, author and entries text for the search, kept by the signals handlers too
+    search_document = models.TextField(_("search document"), blank=True, editable=False)
+    search_vector = SearchVectorField(_("search vector"), null=True, editable=False)
 
-    objects = EntrySetManager.from_queryset(EntrySetQuerySet)()
+    objects = EntrySetQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("entry set")
         verbose_name_plural = _("entry sets")
+        # Keyset pagination seeks by (created, id), globally and per author
+        indexes = [
+            models.Index(fields=["created", "id"], name="entryset_created_id_idx"),
+            models.Index(
+                fields=["author", "created", "id"], name="entryset_author_created_idx"
+            ),
+            GinIndex(fields=["search_vector"], name="entryset_search_vector_idx"),
+            GinIndex(
+                fields=["search_document"],
+                name="entryset_search_document_idx",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ]
 
     def __str__(self) -> str:
         if self.name:
@@ -92,6 +126,17 @@ class Entry(models.Model):
         verbose_name=_("origin"),
         help_text=_("Original entry set of the entry."),
     )
+    # Probe metadata to reclassify entries without requesting their urls again
+    mime_type = models.CharField(_("mime type"), max_length=255, blank=True, editable=False)
+    content_length = models.PositiveBigIntegerField(
+        _("content length"), null=True, blank=True, editable=False
+    )
+    probed_at = models.DateTimeField(_("probed at"), null=True, blank=True, editable=False)
+    num_of_sets = models.PositiveIntegerField(
+        _("number of sets"), default=0, db_index=True, editable=False
+    )
+
+    objects = EntryQuerySet.as_manager()
 
     class Meta:
         verbose_name = _("entry")
@@ -101,12 +146,13 @@ class Entry(models.Model):
         return self.label or self.url
 
     def delete(self, *args, **kwargs):
-        sets_count = self.sets.count()
-        if sets_count != 0:
+        # Sets could be changed since the entry was loaded
+        self.refresh_from_db(fields=["num_of_sets"])
+        if self.num_of_sets != 0:
             logger.debug(
                 "Entry \"%s\" hasn't been deleted because it's posted to %d entrysets.",
                 self,
-                sets_count,
+                self.num_of_sets,
             )
             return
 
@@ -114,7 +160,7 @@ class Entry(models.Model):
         return super().delete(*args, **kwargs)
 
     def render(self) -> str:
-        return self.type_behavior.render()
+        return rendering.render_entry(self)
 
     def determine_type(self, url: str, mime_type: str, *args, **kwargs) -> EntryType:
         for type_, behavior_cls in self._TYPE_BEHAVIOR_DICT.items():
@@ -123,8 +169,78 @@ class Entry(models.Model):
 
         return self._meta.get_field("type").default
 
+    def guess_type(self, url: str, *args, **kwargs) -> Optional[EntryType]:
+        for type_, behavior_cls in self._TYPE_BEHAVIOR_DICT.items():
+            if behavior_cls.is_my_url(self, url, *args, **kwargs):
+                return type_
+
+        return None
+
     @property
     def type_behavior(self) -> EntryTypeBehavior:
         type_ = cast(Entry.EntryType, self.type)
         behavior_cls = self._TYPE_BEHAVIOR_DICT[type_]
         return behavior_cls(self)
+
+
+class ClassificationJob(models.Model):
+    """
+    Entry waiting for its type to be determined by the ``classify_entries`` worker.
+    """
+
+    entry = models.OneToOneField(
+        Entry,
+        on_delete=models.CASCADE,
+        related_name="classification_job",
+        verbose_name=_("entry"),
+    )
+    attempts = models.PositiveSmallIntegerField(_("attempts"), default=0)
+    run_after = models.DateTimeField(_("run after"), default=timezone.now, db_index=True)
+
+    objects = ClassificationJobManager()
+
+    class Meta:
+        verbose_name = _("classification job")
+        verbose_name_plural = _("classification jobs")
+
+    def __str__(self) -> str:
+        return f"{self.entry} ({self.attempts} attempts)"
+
+
+class SearchSuggestion(models.Model):
+    """
+    Word completion for the header search, rebuilt by ``rebuild_search_suggestions``.
+    """
+
+    class Kind(models.TextChoices):
+        NAME = "name", _("Set name")
+        LABEL = "label", _("Entry label")
+        USERNAME = "username", _("Username")
+        DOMAIN = "domain", _("Domain")
+
+    kind = models.CharField(_("kind"), max_length=10, choices=Kind.choices)
+    text = models.CharField(_("text"), max_length=255)
+    normalized = models.CharField(_("normalized text"), max_length=255, editable=False)
+    weight = models.PositiveIntegerField(_("weight"), default=0)
+
+    objects = SearchSuggestionQuerySet.as_manager()
+
+    class Meta:
+        verbose_name = _("search suggestion")
+        verbose_name_plural = _("search suggestions")
+        constraints = [
+            models.UniqueConstraint(
+                fields=["kind", "text"], name="unique_search_suggestion"
+            )
+        ]
+        # Serves the LIKE 'prefix%' lookups whatever the database collation is
+        indexes = [
+            models.Index(
+                fields=["normalized"],
+                name="search_suggestion_prefix_idx",
+                opclasses=["varchar_pattern_ops"],
+            )
+        ]
+
+    def __str__(self) -> str:
+        return self.text
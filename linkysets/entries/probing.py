@@ -0,0 +1,447 @@
+from __future__ import annotations
+
+import cgi
+import hashlib
+import logging
+import os
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait
+from datetime import datetime
+from http.cookiejar import DefaultCookiePolicy
+from typing import Dict, Iterable, List, NamedTuple, Optional, Tuple
+from urllib.parse import parse_qsl, urlencode, urlsplit, urlunsplit
+
+import requests
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.utils import timezone
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
+from linkysets.common.cache import CacheCounters, CacheStats
+
+logger = logging.getLogger(__name__)
+
+_session: Optional[requests.Session] = None
+_session_lock = threading.Lock()
+_limiter: Optional[ConcurrencyLimiter] = None
+_limiter_lock = threading.Lock()
+
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+class ProbeResult(NamedTuple):
+    url: str
+    final_url: Optional[str] = None
+    mime_type: Optional[str] = None
+    status: Optional[int] = None
+    probed_at: Optional[datetime] = None
+    content_length: Optional[int] = None
+
+    @property
+    def is_reachable(self) -> bool:
+        return self.final_url is not None
+
+
+class BreakerCounters(CacheCounters):
+    COUNTERS = ["opened", "closed", "rejected"]
+
+
+cache_stats = CacheStats("url-probe", cache_alias=settings.URL_PROBE_STATS_CACHE)
+breaker_counters = BreakerCounters(
+    "url-probe-breaker", cache_alias=settings.URL_PROBE_STATS_CACHE
+)
+
+
+def get_cache() -> BaseCache:
+    return caches[settings.URL_PROBE_CACHE]
+
+
+def normalize_url(url: str) -> str:
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    netloc = parts.hostname or ""
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        netloc = f"{netloc}:{parts.port}"
+    if parts.username:
+        userinfo = parts.username
+        if parts.password:
+            userinfo = f"{userinfo}:{parts.password}"
+        netloc = f"{userinfo}@{netloc}"
+
+    query = urlencode(sorted(parse_qsl(parts.query, keep_blank_values=True)))
+    return urlunsplit((scheme, netloc, parts.path or "/", query, ""))
+
+
+def make_cache_key(url: str) -> str:
+    url_hash = hashlib.sha1(normalize_url(url).encode()).hexdigest()
+    return f"url-probe:{url_hash}"
+
+
+def get_cached_results(urls: Iterable[str]) -> Dict[str, ProbeResult]:
+    keys = {make_cache_key(url): url for url in urls}
+    cached = get_cache().get_many(keys)
+    results = {keys[key]: result._replace(url=keys[key]) for key, result in cached.items()}
+    cache_stats.hit(len(results))
+    cache_stats.miss(len(keys) - len(results))
+    return results
+
+
+def cache_results(results: Iterable[ProbeResult]) -> None:
+    reachable, unreachable = {}, {}
+    for result in results:
+        data = reachable if result.is_reachable else unreachable
+        data[make_cache_key(result.url)] = result
+
+    if reachable:
+        get_cache().set_many(reachable, timeout=settings.URL_PROBE_CACHE_TTL)
+    # Failures are cached shortly, so a dead url doesn't burn the timeout on every submit
+    if unreachable:
+        get_cache().set_many(unreachable, timeout=settings.URL_PROBE_NEGATIVE_CACHE_TTL)
+
+
+def get_host(url: str) -> str:
+    return urlsplit(url).hostname or ""
+
+
+class CircuitBreaker:
+    """
+    Per host circuit breakers of a probe batch.
+
+    A breaker opens after URL_PROBE_BREAKER_THRESHOLD consecutive failures and rejects
+    probes for URL_PROBE_BREAKER_RESET_TIMEOUT seconds. Then it lets a single trial probe
+    through (half-open state) and closes if it succeeds. The state is kept in the probe
+    cache to be shared between workers.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half-open"
+
+    def __init__(self, hosts: Iterable[str]):
+        self.hosts = set(hosts)
+        keys = [
+            self.make_key(host, name)
+            for host in self.hosts
+            for name in ["failures", "open"]
+        ]
+        values = get_cache().get_many(keys)
+        self.failures = {
+            host: values.get(self.make_key(host, "failures"), 0) for host in self.hosts
+        }
+        self.opened = {host: self.make_key(host, "open") in values for host in self.hosts}
+
+    def get_state(self, host: str) -> str:
+        if self.opened[host]:
+            return self.OPEN
+        if self.failures[host] >= settings.URL_PROBE_BREAKER_THRESHOLD:
+            return self.HALF_OPEN
+        return self.CLOSED
+
+    def allow(self, host: str) -> bool:
+        state = self.get_state(host)
+        if state == self.HALF_OPEN:
+            # Only one worker gets to run the trial probe
+            trial_key = self.make_key(host, "trial")
+            allowed = get_cache().add(trial_key, True, timeout=settings.URL_PROBE_DEADLINE)
+            self.opened[host] = not allowed
+        else:
+            allowed = state == self.CLOSED
+
+        if not allowed:
+            breaker_counters.incr("rejected")
+            logger.debug('Circuit breaker for "%s" host rejected the probe.', host)
+        return allowed
+
+    def record(self, host: str, is_success: bool) -> None:
+        if is_success:
+            self.record_success(host)
+        else:
+            self.record_failure(host)
+
+    def record_success(self, host: str) -> None:
+        if not self.failures[host]:
+            return
+
+        was_closed = self.get_state(host) == self.CLOSED
+        get_cache().delete_many(
+            [self.make_key(host, name) for name in ["failures", "open", "trial"]]
+        )
+        self.failures[host] = 0
+        self.opened[host] = False
+        if not was_closed:
+            breaker_counters.incr("closed")
+            logger.info('Circuit breaker for "%s" host got closed.', host)
+
+    def record_failure(self, host: str) -> None:
+        cache = get_cache()
+        failures = self.failures[host] + 1
+        # Every failure restarts the window, so only failures in a row are counted
+        cache.set(
+            self.make_key(host, "failures"),
+            failures,
+            timeout=settings.URL_PROBE_BREAKER_WINDOW,
+        )
+        self.failures[host] = failures
+
+        if failures >= settings.URL_PROBE_BREAKER_THRESHOLD:
+            cache.set(
+                self.make_key(host, "open"),
+                True,
+                timeout=settings.URL_PROBE_BREAKER_RESET_TIMEOUT,
+            )
+            cache.delete(self.make_key(host, "trial"))
+            self.opened[host] = True
+            breaker_counters.incr("opened")
+            logger.warning(
+                'Circuit breaker for "%s" host got opened after %d failures.',
+                host,
+                failures,
+            )
+
+    @staticmethod
+    def make_key(host: str, name: str) -> str:
+        host_hash = hashlib.sha1(host.encode()).hexdigest()
+        return f"url-probe-breaker:{host_hash}:{name}"
+
+
+class ConcurrencyLimiter:
+    """
+    Limits of the probes in flight in the process, in total and to a single host.
+
+    Probes over a limit wait for a free slot until the given time and get rejected after.
+    """
+
+    def __init__(self, max_in_flight: int, max_per_host: int):
+        self.max_per_host = max_per_host
+        self._lock = threading.Lock()
+        self._in_flight = threading.BoundedSemaphore(max_in_flight)
+        # Host semaphores with the number of their users, so idle ones can be dropped
+        self._hosts: Dict[str, Tuple[threading.BoundedSemaphore, int]] = {}
+
+    def acquire(self, host: str, until: float) -> bool:
+        with self._lock:
+            semaphore, users = self._hosts.get(host, (None, 0))
+            if semaphore is None:
+                semaphore = threading.BoundedSemaphore(self.max_per_host)
+            self._hosts[host] = (semaphore, users + 1)
+
+        if semaphore.acquire(timeout=get_remaining_time(until)):
+            if self._in_flight.acquire(timeout=get_remaining_time(until)):
+                return True
+            semaphore.release()
+
+        self._leave(host)
+        return False
+
+    def release(self, host: str) -> None:
+        with self._lock:
+            semaphore, _ = self._hosts[host]
+        semaphore.release()
+        self._in_flight.release()
+        self._leave(host)
+
+    def _leave(self, host: str) -> None:
+        with self._lock:
+            semaphore, users = self._hosts[host]
+            if users > 1:
+                self._hosts[host] = (semaphore, users - 1)
+            else:
+                del self._hosts[host]
+
+
+def get_remaining_time(until: float) -> float:
+    return max(until - time.monotonic(), 0)
+
+
+def get_limiter() -> ConcurrencyLimiter:
+    global _limiter
+    if _limiter is None:
+        with _limiter_lock:
+            if _limiter is None:
+                _limiter = ConcurrencyLimiter(
+                    settings.URL_PROBE_MAX_IN_FLIGHT, settings.URL_PROBE_MAX_PER_HOST
+                )
+    return _limiter
+
+
+def reset_limiter() -> None:
+    global _limiter, _limiter_lock
+    _limiter = None
+    _limiter_lock = threading.Lock()
+
+
+def get_session() -> requests.Session:
+    """
+    Return the process-wide probing session, so probes reuse warm connections.
+    """
+    global _session
+    if _session is None:
+        with _session_lock:
+            if _session is None:
+                _session = _create_session()
+    return _session
+
+
+def reset_session() -> None:
+    global _session, _session_lock
+    # Connections inherited from a parent process must not be shared with it,
+    # so they are dropped without closing and the child opens its own.
+    _session = None
+    _session_lock = threading.Lock()
+
+
+def _create_session() -> requests.Session:
+    session = requests.Session()
+    session.max_redirects = 2
+    # Shared by all the probes, so cookies of one host must not be sent with the others
+    session.cookies.set_policy(DefaultCookiePolicy(allowed_domains=[]))
+    retry = Retry(
+        total=settings.URL_PROBE_MAX_RETRIES,
+        backoff_factor=settings.URL_PROBE_RETRY_BACKOFF,
+        status_forcelist=[502, 503, 504],
+        raise_on_status=False,
+    )
+    adapter = HTTPAdapter(
+        pool_connections=settings.URL_PROBE_POOL_CONNECTIONS,
+        pool_maxsize=settings.URL_PROBE_POOL_MAXSIZE,
+        max_retries=retry,
+    )
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    logger.debug("Url probing session got created in process %d.", os.getpid())
+    return session
+
+
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=reset_session)
+    os.register_at_fork(after_in_child=reset_limiter)
+
+
+def probe_url(url: str) -> ProbeResult:
+    return probe_urls([url])[url]
+
+
+def _probe_limited(url: str, until: float) -> Optional[ProbeResult]:
+    host = get_host(url)
+    limiter = get_limiter()
+    if not limiter.acquire(host, until):
+        logger.info('Probe of "%s" got rejected by the concurrency limits.', url)
+        return None
+
+    try:
+        # Requests never outlive the probes deadline
+        timeout = min(settings.DEFAULT_REQUESTS_TIMEOUT, get_remaining_time(until))
+        return _probe(url, timeout)
+    finally:
+        limiter.release(host)
+
+
+def _probe(url: str, timeout: float) -> ProbeResult:
+    if timeout <= 0:
+        return ProbeResult(url)
+
+    try:
+        response = get_session().head(url, allow_redirects=True, timeout=timeout)
+    except requests.RequestException:
+        logger.debug('Could not reach "%s".', url, exc_info=True)
+        return ProbeResult(url)
+
+    logger.debug('Entry url got tested to "%s"', response.url)
+    mime_type = None
+    content_type = response.headers.get("content-type")
+    if content_type:
+        mime_type, params = cgi.parse_header(content_type)
+        logger.debug(
+            '"%s" mime type is "%s". Parameters: %s', response.url, mime_type, params,
+        )
+
+    return ProbeResult(
+        url,
+        response.url,
+        mime_type,
+        response.status_code,
+        timezone.now(),
+        get_content_length(response),
+    )
+
+
+def get_content_length(response: requests.Response) -> Optional[int]:
+    try:
+        content_length = int(response.headers["content-length"])
+    except (KeyError, ValueError):
+        return None
+    return content_length if content_length >= 0 else None
+
+
+def probe_urls(
+    urls: Iterable[str], deadline: Optional[float] = None
+) -> Dict[str, ProbeResult]:
+    unique_urls = list(dict.fromkeys(urls))
+    if not unique_urls:
+        return {}
+
+    if deadline is None:
+        deadline = settings.URL_PROBE_DEADLINE
+
+    results = {url: ProbeResult(url) for url in unique_urls}
+    cached_results = get_cached_results(unique_urls)
+    results.update(cached_results)
+    urls_to_probe = [url for url in unique_urls if url not in cached_results]
+    if not urls_to_probe:
+        return results
+
+    breaker = CircuitBreaker(get_host(url) for url in urls_to_probe)
+    allowed_urls = []
+    for url in urls_to_probe:
+        if breaker.allow(get_host(url)):
+            allowed_urls.append(url)
+        else:
+            results[url] = _get_rejected_result(url)
+
+    probed_results = {}
+    if allowed_urls:
+        for url, result in _probe_concurrently(allowed_urls, deadline).items():
+            if result is None:
+                # Rejected by the local limits, it says nothing about the host
+                results[url] = _get_rejected_result(url)
+            else:
+                probed_results[url] = result
+                breaker.record(get_host(url), result.is_reachable)
+
+    results.update(probed_results)
+    cache_results(probed_results.values())
+    return results
+
+
+def _get_rejected_result(url: str) -> ProbeResult:
+    if settings.URL_PROBE_BREAKER_FALLBACK_TO_URL:
+        # Treated as reachable without a mime type, so the entry gets the URL type
+        return ProbeResult(url, final_url=url)
+    return ProbeResult(url)
+
+
+def _probe_concurrently(
+    urls: List[str], deadline: float
+) -> Dict[str, Optional[ProbeResult]]:
+    results: Dict[str, Optional[ProbeResult]] = {}
+    until = time.monotonic() + deadline
+    max_workers = min(len(urls), settings.URL_PROBE_MAX_WORKERS)
+    executor = ThreadPoolExecutor(max_workers=max_workers, thread_name_prefix="url-probe")
+    futures = {executor.submit(_probe_limited, url, until): url for url in urls}
+    done, not_done = wait(futures, timeout=deadline)
+    # Stragglers are bounded by the requests timeout, so the pool
+    # is left to finish them without blocking the caller.
+    executor.shutdown(wait=False)
+
+    for future in done:
+        results[futures[future]] = future.result()
+
+    for future in not_done:
+        future.cancel()
+        url = futures[future]
+        results[url] = ProbeResult(url)
+        logger.debug('Probe of "%s" exceeded %s seconds deadline.', url, deadline)
+
+    return results
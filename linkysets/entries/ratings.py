@@ -0,0 +1,51 @@
+from __future__ import annotations
+
+from typing import Any, Dict
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+
+from linkysets.common.cache import invalidate_on_commit
+
+RATINGS_CACHE_KEY = "entry-ratings"
+
+RATING_LIST_LIMIT = 5
+
+
+def get_cache() -> BaseCache:
+    return caches[settings.RATINGS_CACHE]
+
+
+def get_ratings() -> Dict[str, Any]:
+    """
+    Top authors and recent sets lists of the sidebar, cached until a set is
+    created, renamed or deleted, or an author is renamed.
+    """
+    ratings = get_cache().get(RATINGS_CACHE_KEY)
+    if ratings is None:
+        ratings = compute_ratings()
+        get_cache().set(RATINGS_CACHE_KEY, ratings, timeout=settings.RATINGS_CACHE_TTL)
+    return ratings
+
+
+def compute_ratings() -> Dict[str, Any]:
+    User = apps.get_model(settings.AUTH_USER_MODEL)
+    EntrySet = apps.get_model("entries", "EntrySet")
+    top_authors_qs = User.objects.top_authors().only("username", "num_sets")
+    top_authors_qs = top_authors_qs[:RATING_LIST_LIMIT]
+    recent_entrysets_qs = EntrySet.objects.minimal().order_by("-created", "-pk")
+    recent_entrysets_qs = recent_entrysets_qs[:RATING_LIST_LIMIT]
+    # Evaluated, so the cached lists don't query anything when rendered
+    return {
+        "top_authors": list(top_authors_qs),
+        "recent_entrysets": list(recent_entrysets_qs),
+    }
+
+
+def invalidate_ratings() -> None:
+    invalidate_on_commit(delete_ratings)
+
+
+def delete_ratings() -> None:
+    get_cache().delete(RATINGS_CACHE_KEY)
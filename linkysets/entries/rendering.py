@@ -0,0 +1,76 @@
+from __future__ import annotations
+
+import hashlib
+from typing import TYPE_CHECKING, Iterable
+
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.utils.safestring import SafeString, mark_safe
+
+from linkysets.common.cache import BufferedCacheStats
+
+if TYPE_CHECKING:
+    from .models import Entry, EntrySet
+
+cache_stats = BufferedCacheStats(
+    "entry-render",
+    cache_alias=settings.ENTRY_RENDER_STATS_CACHE,
+    flush_interval=settings.ENTRY_RENDER_STATS_FLUSH_INTERVAL,
+)
+
+
+def get_cache() -> BaseCache:
+    return caches[settings.ENTRY_RENDER_CACHE]
+
+
+def make_cache_key(entry: Entry) -> str:
+    # Rendered html depends only on these fields, so any change of them gets a new key
+    content = f"{entry.type}:{entry.url}:{entry.label}"
+    content_hash = hashlib.sha1(content.encode()).hexdigest()
+    return f"entry-render:{entry.pk}:{content_hash}"
+
+
+def render_entry(entry: Entry) -> SafeString:
+    if entry.pk is None:
+        return entry.type_behavior.render()
+
+    key = make_cache_key(entry)
+    # Html is primed in batches for pages of entries, it's not counted twice
+    primed_key, html = getattr(entry, "_primed_html", (None, None))
+    if primed_key != key:
+        html = get_cache().get(key)
+        if html is None:
+            cache_stats.miss()
+        else:
+            cache_stats.hit()
+
+    if html is None:
+        html = str(entry.type_behavior.render())
+        get_cache().set(key, html, timeout=settings.ENTRY_RENDER_CACHE_TTL)
+
+    entry._primed_html = (key, html)  # type: ignore
+    return mark_safe(html)
+
+
+def prime_render_cache(entries: Iterable[Entry]) -> None:
+    """
+    Fetch the cached html of the entries at once,
+    so their renders don't query the cache one by one.
+    """
+    keys = {
+        make_cache_key(entry): entry
+        for entry in entries
+        if entry.pk is not None and entry.type != entry.EntryType.URL
+    }
+    if not keys:
+        return
+
+    cached = get_cache().get_many(keys)
+    cache_stats.hit(len(cached))
+    cache_stats.miss(len(keys) - len(cached))
+    for key, entry in keys.items():
+        entry._primed_html = (key, cached.get(key))  # type: ignore
+
+
+def prime_entrysets_render_cache(entrysets: Iterable[EntrySet]) -> None:
+    prime_render_cache(entry for entryset in entrysets for entry in entryset.entries.all())
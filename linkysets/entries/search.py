@@ -0,0 +1,74 @@
+from __future__ import annotations
+
+from django.contrib.postgres.aggregates import StringAgg
+from django.contrib.postgres.lookups import PostgresOperatorLookup
+from django.contrib.postgres.search import SearchQuery, SearchRank, SearchVector
+from django.db.models import F, FloatField, Func, OuterRef, Q, QuerySet, Subquery, Value
+from django.db.models.functions import Cast, Coalesce, Concat, Lower
+
+# Names and urls aren't language specific, so words are indexed without stemming
+SEARCH_CONFIG = "simple"
+
+
+class TrigramWordSimilar(PostgresOperatorLookup):
+    lookup_name = "trigram_word_similar"
+    postgres_operator = "%%>"
+
+
+class TrigramWordSimilarity(Func):
+    function = "WORD_SIMILARITY"
+    output_field = FloatField()
+
+
+class Unaccent(Func):
+    function = "UNACCENT"
+
+
+class UrlTokens(Func):
+    """
+    Url with punctuation replaced by spaces, so its parts are separate words.
+    """
+
+    function = "REGEXP_REPLACE"
+    template = "%(function)s(%(expressions)s, '[^[:alnum:]]+', ' ', 'g')"
+
+
+def update_search_index(queryset: QuerySet) -> int:
+    """
+    Rebuilds the search document and vector of the entry sets in one query.
+    """
+    model = queryset.model
+    m2m_qs = model.entries.through.objects.filter(entryset=OuterRef("pk")).order_by()
+    m2m_qs = m2m_qs.values("entryset")
+    labels_qs = m2m_qs.annotate(text=StringAgg("entry__label", " ")).values("text")
+    urls_qs = m2m_qs.annotate(text=StringAgg(UrlTokens("entry__url"), " ")).values("text")
+    author_model = model._meta.get_field("author").related_model
+    username_qs = author_model.objects.filter(pk=OuterRef("author_id")).values("username")
+
+    username = Coalesce(Subquery(username_qs), Value(""))
+    labels = Coalesce(Subquery(labels_qs), Value(""))
+    urls = Coalesce(Subquery(urls_qs), Value(""))
+    space = Value(" ")
+    document = Concat(F("name"), space, username, space, labels, space, urls)
+    vector = SearchVector("name", weight="A", config=SEARCH_CONFIG)
+    vector += SearchVector(username, weight="B", config=SEARCH_CONFIG)
+    vector += SearchVector(labels, weight="B", config=SEARCH_CONFIG)
+    vector += SearchVector(urls, weight="C", config=SEARCH_CONFIG)
+    return queryset.update(search_document=Unaccent(Lower(document)), search_vector=vector)
+
+
+def search_entrysets(queryset: QuerySet, term: str) -> QuerySet:
+    """
+    Entry sets matching the whole words of the term or similar to its part,
+    annotated with their relevance rank.
+    """
+    query = SearchQuery(term, config=SEARCH_CONFIG)
+    term_expression = Unaccent(Lower(Value(term)))
+    rank = SearchRank(F("search_vector"), query)
+    rank += TrigramWordSimilarity(term_expression, F("search_document"))
+    return queryset.filter(
+        Q(search_vector=query) | Q(search_document__trigram_word_similar=term_expression)
+    ).annotate(
+        # Double precision, so the rank of a page cursor equals the one it was taken from
+        rank=Cast(rank, FloatField())
+    )
@@ -0,0 +1,183 @@
+from __future__ import annotations
+
+import re
+import sqlite3
+from contextlib import closing, contextmanager
+from pathlib import Path
+from typing import Iterable, Iterator, List, Optional, Sequence, Tuple, Union
+
+from django.apps import apps
+from django.conf import settings
+from django.core.signals import setting_changed
+from django.db.models import Case, FloatField, Prefetch, QuerySet, Value, When
+from django.dispatch import receiver
+from django.utils.module_loading import import_string
+
+from . import search
+
+_backend: Optional[SearchBackend] = None
+
+
+class SearchBackend:
+    """
+    Entry sets search index. Backends are told about changed and deleted sets by
+    the signals handlers and filter the given queryset by a search term,
+    annotating it with a "rank" to order the results by.
+    """
+
+    def search(self, queryset: QuerySet, term: str) -> QuerySet:
+        raise NotImplementedError
+
+    def update(self, queryset: QuerySet) -> None:
+        raise NotImplementedError
+
+    def remove(self, pks: Iterable[int]) -> None:
+        pass
+
+    def clear(self) -> None:
+        pass
+
+    def rebuild(self, chunk_size: int = 500) -> int:
+        EntrySet = apps.get_model("entries", "EntrySet")
+        self.clear()
+        count = 0
+        last_pk = 0
+        while True:
+            pks_qs = EntrySet.objects.filter(pk__gt=last_pk).order_by("pk")
+            pks = list(pks_qs.values_list("pk", flat=True)[:chunk_size])
+            if not pks:
+                return count
+
+            self.update(EntrySet.objects.filter(pk__in=pks))
+            count += len(pks)
+            last_pk = pks[-1]
+
+
+class PostgresSearchBackend(SearchBackend):
+    """
+    Search by the entry sets search document and vector columns.
+    """
+
+    def search(self, queryset: QuerySet, term: str) -> QuerySet:
+        return search.search_entrysets(queryset, term)
+
+    def update(self, queryset: QuerySet) -> None:
+        search.update_search_index(queryset)
+
+
+class SqliteSearchBackend(SearchBackend):
+    """
+    Search by an FTS5 index in a local SQLite file, so searches don't query the
+    database for anything but the found sets. The index is written right away,
+    so sets of rolled back transactions can stay in it until they are dropped by
+    a rebuild, the search skips them as they aren't in the database.
+    """
+
+    # Same priority as the weights of the Postgres search vector
+    COLUMN_WEIGHTS = (10.0, 5.0, 5.0, 2.0)
+
+    def __init__(
+        self, path: Union[str, Path, None] = None, max_results: Optional[int] = None
+    ):
+        self.path = path or settings.ENTRY_SEARCH_SQLITE_PATH
+        self.max_results = max_results or settings.ENTRY_SEARCH_MAX_RESULTS
+
+    def search(self, queryset: QuerySet, term: str) -> QuerySet:
+        query = make_match_query(term)
+        if not query:
+            return filter_ranked(queryset, [])
+
+        with self.connect() as connection:
+            rows = connection.execute(
+                "SELECT rowid, -bm25(entrysets, ?, ?, ?, ?) FROM entrysets "
+                "WHERE entrysets MATCH ? ORDER BY 2 DESC LIMIT ?",
+                [*self.COLUMN_WEIGHTS, query, self.max_results],
+            ).fetchall()
+        return filter_ranked(queryset, rows)
+
+    def update(self, queryset: QuerySet) -> None:
+        documents = self.get_documents(queryset)
+        with self.connect() as connection:
+            connection.executemany(
+                "DELETE FROM entrysets WHERE rowid = ?", [[pk] for pk, *_ in documents]
+            )
+            connection.executemany(
+                "INSERT INTO entrysets (rowid, name, username, labels, urls) "
+                "VALUES (?, ?, ?, ?, ?)",
+                documents,
+            )
+
+    def remove(self, pks: Iterable[int]) -> None:
+        with self.connect() as connection:
+            connection.executemany(
+                "DELETE FROM entrysets WHERE rowid = ?", [[pk] for pk in pks]
+            )
+
+    def clear(self) -> None:
+        with self.connect() as connection:
+            connection.execute("DELETE FROM entrysets")
+
+    def get_documents(self, queryset: QuerySet) -> List[Tuple[int, str, str, str, str]]:
+        entry_model = queryset.model._meta.get_field("entries").related_model
+        queryset = queryset.select_related("author").prefetch_related(
+            Prefetch("entries", queryset=entry_model.objects.only("label", "url"))
+        )
+        return [
+            (
+                entryset.pk,
+                entryset.name,
+                entryset.author.username if entryset.author else "",
+                " ".join(entry.label for entry in entryset.entries.all()),
+                " ".join(get_url_tokens(entry.url) for entry in entryset.entries.all()),
+            )
+            for entryset in queryset
+        ]
+
+    @contextmanager
+    def connect(self) -> Iterator[sqlite3.Connection]:
+        with closing(sqlite3.connect(str(self.path), timeout=10)) as connection:
+            connection.execute("PRAGMA journal_mode=WAL")
+            connection.execute(
+                "CREATE VIRTUAL TABLE IF NOT EXISTS entrysets USING fts5"
+                "(name, username, labels, urls, tokenize='unicode61 remove_diacritics 2')"
+            )
+            with connection:
+                yield connection
+
+
+def filter_ranked(queryset: QuerySet, ranked_pks: Sequence[Tuple[int, float]]) -> QuerySet:
+    """
+    Entry sets of the queryset with the given ids, annotated with their ranks.
+    """
+    if not ranked_pks:
+        # Annotated like the results, so they can be ordered by the rank in any case
+        return queryset.none().annotate(rank=Value(0.0, output_field=FloatField()))
+
+    rank = Case(
+        *[When(pk=pk, then=Value(rank)) for pk, rank in ranked_pks],
+        output_field=FloatField(),
+    )
+    return queryset.filter(pk__in=[pk for pk, _ in ranked_pks]).annotate(rank=rank)
+
+
+def get_url_tokens(url: str) -> str:
+    return " ".join(re.findall(r"[^\W_]+", url))
+
+
+def make_match_query(term: str) -> str:
+    # Every word of the term is matched as a prefix of the indexed words
+    return " ".join(f'"{word}"*' for word in re.findall(r"[^\W_]+", term.lower()))
+
+
+def get_search_backend() -> SearchBackend:
+    global _backend
+    if _backend is None:
+        _backend = import_string(settings.ENTRY_SEARCH_BACKEND)()
+    return _backend
+
+
+@receiver(setting_changed)
+def reset_search_backend_on_setting_change(*, setting: str, **kwargs) -> None:
+    global _backend
+    if setting.startswith("ENTRY_SEARCH_"):
+        _backend = None
@@ -0,0 +1,100 @@
+from __future__ import annotations
+
+import hashlib
+import time
+from typing import Iterable, List, Tuple
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.db.models import QuerySet
+
+from linkysets.common.cache import invalidate_on_commit
+
+from .search_backends import filter_ranked, get_search_backend
+
+GENERATION_KEY = "entry-search:generation"
+
+
+def get_cache() -> BaseCache:
+    return caches[settings.ENTRY_SEARCH_CACHE]
+
+
+def get_generation_cache() -> BaseCache:
+    return caches[settings.ENTRY_SEARCH_GENERATION_CACHE]
+
+
+def get_generation() -> int:
+    cache = get_generation_cache()
+    generation = cache.get(GENERATION_KEY)
+    if generation is None:
+        # Started from the current time, so results cached before the counter
+        # got evicted can't be found again under a reused generation.
+        cache.add(GENERATION_KEY, time.time_ns() // 1000, timeout=None)
+        generation = cache.get(GENERATION_KEY)
+    return generation
+
+
+def invalidate_search_results() -> None:
+    invalidate_on_commit(bump_generation)
+
+
+def bump_generation() -> None:
+    try:
+        get_generation_cache().incr(GENERATION_KEY)
+    except ValueError:
+        get_generation()
+
+
+def normalize_term(term: str) -> str:
+    return " ".join(term.lower().split())
+
+
+def make_cache_key(term: str, generation: int) -> str:
+    digest = hashlib.sha1(normalize_term(term).encode()).hexdigest()
+    return f"entry-search:{generation}:{digest}"
+
+
+def get_ranked_pks(term: str) -> List[Tuple[int, float]]:
+    """
+    Found entry set ids with their ranks in the result order, the best ones up to
+    ENTRY_SEARCH_MAX_RESULTS are cached until any set or entry changes.
+    """
+    EntrySet = apps.get_model("entries", "EntrySet")
+    key = make_cache_key(term, get_generation())
+    ranked_pks = get_cache().get(key)
+    if ranked_pks is not None:
+        return ranked_pks
+
+    qs = get_search_backend().search(EntrySet.objects.all(), normalize_term(term))
+    qs = qs.order_by("-rank", "-pk").values_list("pk", "rank")
+    ranked_pks = list(qs[: settings.ENTRY_SEARCH_MAX_RESULTS])
+    get_cache().set(key, ranked_pks, timeout=settings.ENTRY_SEARCH_CACHE_TTL)
+    return ranked_pks
+
+
+def search_entrysets(queryset: QuerySet, term: str, complete: bool = False) -> QuerySet:
+    """
+    Entry sets of the queryset found by the term, annotated with the rank.
+    Only the best ENTRY_SEARCH_MAX_RESULTS are cached and looked up by the primary
+    keys, which covers the first pages. With complete the sets past them are found
+    by the search backend.
+    """
+    ranked_pks = get_ranked_pks(term)
+    if complete and is_truncated(ranked_pks):
+        return get_search_backend().search(queryset, normalize_term(term))
+    return filter_ranked(queryset, ranked_pks)
+
+
+def is_truncated(ranked_pks: List[Tuple[int, float]]) -> bool:
+    return len(ranked_pks) >= settings.ENTRY_SEARCH_MAX_RESULTS
+
+
+def index_entrysets(queryset: QuerySet) -> None:
+    get_search_backend().update(queryset)
+    invalidate_search_results()
+
+
+def unindex_entrysets(pks: Iterable[int]) -> None:
+    get_search_backend().remove(pks)
+    invalidate_search_results()
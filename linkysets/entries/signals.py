@@ -0,0 +1,170 @@
+from __future__ import annotations
+
+from django.conf import settings
+from django.db.models import F
+from django.db.models.functions import Greatest
+from django.db.models.signals import m2m_changed, post_delete, post_save, pre_delete
+from django.dispatch import receiver
+
+from linkysets.common.models import AuthoredModel
+from linkysets.users.models import User
+
+from .managers import EntryQuerySet
+from .models import Entry, EntrySet
+from .ratings import invalidate_ratings
+from .search_cache import index_entrysets, unindex_entrysets
+
+
+@receiver(m2m_changed, sender=EntrySet.entries.through)
+def update_membership_fields(sender, instance, action, reverse, pk_set, **kwargs):
+    if action == "pre_clear":
+        # Related objects are unknown after they got cleared
+        related = instance.sets if reverse else instance.entries
+        instance._cleared_pks = list(related.values_list("pk", flat=True))
+        return
+    if action not in ["post_add", "post_remove", "post_clear"]:
+        return
+
+    if action == "post_clear":
+        related_pks = instance.__dict__.pop("_cleared_pks", [])
+    else:
+        related_pks = list(pk_set)
+
+    # Recounted in the database, so concurrent changes can't be lost
+    if reverse:
+        entryset_pks, entry_pks = related_pks, [instance.pk]
+    else:
+        entryset_pks, entry_pks = [instance.pk], related_pks
+
+    entrysets_qs = EntrySet.objects.filter(pk__in=entryset_pks)
+    entrysets_qs.recount_entries()
+    index_entrysets(entrysets_qs)
+    if entry_pks:
+        entries_qs = Entry.objects.filter(pk__in=entry_pks)
+        entries_qs.recount_sets()
+        recount_origin_authors_stats(entries_qs)
+
+
+@receiver(post_save, sender=EntrySet)
+def update_entryset_search_index(sender, instance, update_fields, **kwargs):
+    if update_fields is None or {"name", "author"} & set(update_fields):
+        index_entrysets(EntrySet.objects.filter(pk=instance.pk))
+
+
+@receiver(post_save, sender=Entry)
+def update_entry_sets_search_index(sender, instance, created, update_fields, **kwargs):
+    if created:
+        # New entries have no sets yet, they are indexed when added to them
+        return
+    if update_fields is None or {"label", "url"} & set(update_fields):
+        index_entrysets(EntrySet.objects.filter(entries=instance))
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_author_sets_search_index(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or "username" in update_fields:
+        index_entrysets(EntrySet.objects.filter(author=instance))
+
+
+@receiver(pre_delete, sender=EntrySet)
+def remember_entryset_entries(sender, instance, **kwargs):
+    # Membership rows are deleted by cascade without m2m_changed signals
+    instance._deleted_entry_pks = list(instance.entries.values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=EntrySet)
+def update_new_entryset_author_stats(sender, instance, created, **kwargs):
+    if created:
+        recount_author_stats(instance)
+
+
+@receiver(post_delete, sender=EntrySet)
+def update_deleted_entryset_counters(sender, instance, **kwargs):
+    entry_pks = instance.__dict__.pop("_deleted_entry_pks", [])
+    if entry_pks:
+        entries_qs = Entry.objects.filter(pk__in=entry_pks)
+        entries_qs.recount_sets()
+        recount_origin_authors_stats(entries_qs)
+    # Entries first posted in the set have lost their origin along with it
+    recount_author_stats(instance)
+
+
+@receiver(post_delete, sender=EntrySet)
+def remove_entryset_from_search_index(sender, instance, **kwargs):
+    unindex_entrysets([instance.pk])
+
+
+@receiver(post_save, sender=EntrySet)
+def invalidate_ratings_on_entryset_save(sender, instance, created, update_fields, **kwargs):
+    if created or update_fields is None or {"name", "author"} & set(update_fields):
+        invalidate_ratings()
+
+
+@receiver(post_delete, sender=EntrySet)
+def invalidate_ratings_on_entryset_delete(sender, instance, **kwargs):
+    invalidate_ratings()
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def invalidate_ratings_on_author_rename(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or "username" in update_fields:
+        invalidate_ratings()
+
+
+@receiver(post_delete, sender=settings.AUTH_USER_MODEL)
+def invalidate_ratings_on_author_delete(sender, instance, **kwargs):
+    invalidate_ratings()
+
+
+@receiver(post_save, sender="replies.Reply")
+def increment_num_replies(sender, instance, created, **kwargs):
+    if created:
+        # New version drops the cached thread html
+        EntrySet.objects.filter(pk=instance.entryset_id).update(
+            num_replies=F("num_replies") + 1, replies_version=F("replies_version") + 1
+        )
+
+
+@receiver(post_delete, sender="replies.Reply")
+def decrement_num_replies(sender, instance, **kwargs):
+    EntrySet.objects.filter(pk=instance.entryset_id).update(
+        num_replies=Greatest(F("num_replies") - 1, 0),
+        replies_version=F("replies_version") + 1,
+    )
+
+
+@receiver(post_save, sender=settings.AUTH_USER_MODEL)
+def update_replied_sets_versions(sender, instance, created, update_fields, **kwargs):
+    if created:
+        return
+    if update_fields is None or "username" in update_fields:
+        # Usernames are a part of the cached threads html
+        EntrySet.objects.filter(replies__author=instance).update(
+            replies_version=F("replies_version") + 1
+        )
+
+
+@receiver(post_save, sender="replies.Reply")
+def update_new_reply_author_stats(sender, instance, created, **kwargs):
+    if created:
+        recount_author_stats(instance)
+
+
+@receiver(post_delete, sender="replies.Reply")
+def update_deleted_reply_author_stats(sender, instance, **kwargs):
+    recount_author_stats(instance)
+
+
+def recount_author_stats(instance: AuthoredModel) -> None:
+    if instance.author_id is not None:  # type: ignore
+        User.objects.filter(pk=instance.author_id).recount_stats()  # type: ignore
+
+
+def recount_origin_authors_stats(entries_qs: EntryQuerySet) -> None:
+    # Reposts of the entries are counted for the authors of their original sets
+    authors_qs = entries_qs.filter(origin__author__isnull=False).values("origin__author")
+    User.objects.filter(pk__in=authors_qs).recount_stats()
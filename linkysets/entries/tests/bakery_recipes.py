@@ -8,4 +8,6 @@ entryset_recipe = Recipe(
     "entries.EntrySet",
     author=foreign_key(user_recipe),
     entries=related(entry_recipe, entry_recipe),
+    # Kept by the signals handlers and not supported by the baker
+    search_vector=None,
 )
@@ -0,0 +1,192 @@
+import tempfile
+import threading
+from datetime import timedelta
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+import requests
+from django.core.management import call_command
+from django.db import DatabaseError, connection, transaction
+from django.test import TestCase, TransactionTestCase, override_settings
+from django.utils import timezone
+from faker import Faker
+
+from .. import probing
+from ..classification import classify_pending_entries, reclassify_entry
+from ..models import ClassificationJob, Entry
+from .bakery_recipes import entry_recipe
+from .common import get_random_youtube_url, head_response_factory
+
+fake = Faker()
+
+
+@override_settings(DEFERRED_CLASSIFICATION_MAX_ATTEMPTS=2)
+class ClassifyPendingEntriesTests(TestCase):
+    def setUp(self):
+        probing.get_cache().clear()
+        self.entry = entry_recipe.make(url=fake.url(), type=Entry.EntryType.URL)
+        ClassificationJob.objects.enqueue([self.entry])
+
+    @patch("requests.Session.head")
+    def test_determines_entry_type(self, head_mock):
+        head_mock.side_effect = head_response_factory(lambda response: "image/png")
+        self.assertEqual(classify_pending_entries(), 1)
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.type, Entry.EntryType.IMAGE)
+        self.assertFalse(ClassificationJob.objects.exists())
+
+    @patch("requests.Session.head")
+    def test_updates_entry_url_to_final_url(self, head_mock):
+        final_url = get_random_youtube_url()
+
+        def get_response(url, *args, **kwargs):
+            return head_response_factory()(final_url)
+
+        head_mock.side_effect = get_response
+        classify_pending_entries()
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.url, final_url)
+        self.assertEqual(self.entry.type, Entry.EntryType.YT_VIDEO)
+
+    @patch("requests.Session.head")
+    def test_classifies_entries_in_one_batch(self, head_mock):
+        head_mock.side_effect = head_response_factory(lambda response: "audio/mpeg")
+        entries = entry_recipe.make(_quantity=3)
+        ClassificationJob.objects.enqueue(entries)
+        self.assertEqual(classify_pending_entries(batch_size=2), 2)
+        self.assertEqual(classify_pending_entries(batch_size=2), 2)
+        self.assertEqual(classify_pending_entries(batch_size=2), 0)
+        types = Entry.objects.values_list("type", flat=True)
+        self.assertEqual(set(types), {Entry.EntryType.AUDIO})
+
+    @patch("requests.Session.head")
+    def test_retries_unreachable_entry_later(self, head_mock):
+        head_mock.side_effect = requests.ConnectionError
+        classify_pending_entries()
+        job = ClassificationJob.objects.get()
+        self.assertEqual(job.attempts, 1)
+        self.assertGreater(job.run_after, timezone.now())
+        self.assertEqual(classify_pending_entries(), 0)
+
+    @patch("requests.Session.head")
+    def test_leaves_entry_as_url_after_max_attempts(self, head_mock):
+        head_mock.side_effect = requests.ConnectionError
+        ClassificationJob.objects.update(attempts=1)
+        with self.assertLogs("linkysets.entries.classification", "INFO"):
+            classify_pending_entries()
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.type, Entry.EntryType.URL)
+        self.assertFalse(ClassificationJob.objects.exists())
+
+    def test_keeps_job_of_entry_edited_during_probe(self):
+        new_url = fake.url()
+
+        def probe_urls(urls):
+            Entry.objects.filter(pk=self.entry.pk).update(url=new_url)
+            return {
+                url: probing.ProbeResult(url, final_url=url, mime_type="image/png")
+                for url in urls
+            }
+
+        with patch.object(probing, "probe_urls", side_effect=probe_urls):
+            self.assertEqual(classify_pending_entries(), 1)
+        self.entry.refresh_from_db()
+        self.assertEqual((self.entry.url, self.entry.type), (new_url, Entry.EntryType.URL))
+        self.assertLessEqual(ClassificationJob.objects.get().run_after, timezone.now())
+
+    def test_leases_claimed_jobs(self):
+        def probe_urls(urls):
+            self.assertGreater(ClassificationJob.objects.get().run_after, timezone.now())
+            return {url: probing.ProbeResult(url) for url in urls}
+
+        with patch.object(probing, "probe_urls", side_effect=probe_urls):
+            classify_pending_entries()
+
+    def test_enqueue_skips_already_queued_entries(self):
+        ClassificationJob.objects.enqueue([self.entry])
+        self.assertEqual(ClassificationJob.objects.count(), 1)
+
+    @patch("requests.Session.head")
+    def test_command_processes_available_jobs(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        future = timezone.now() + timedelta(hours=1)
+        delayed_entry = entry_recipe.make()
+        ClassificationJob.objects.create(entry=delayed_entry, run_after=future)
+        out = StringIO()
+        call_command("classify_entries", "--once", stdout=out)
+        self.assertIn("Processed 1 classification jobs.", out.getvalue())
+        self.assertEqual(ClassificationJob.objects.get().entry, delayed_entry)
+
+
+class ClassifyPendingEntriesLockTests(TransactionTestCase):
+    def test_probes_without_locking_entries(self):
+        entry = entry_recipe.make(url=fake.url(), type=Entry.EntryType.URL)
+        ClassificationJob.objects.enqueue([entry])
+        errors = []
+
+        def edit_entry():
+            # An edit in another connection doesn't wait for the probes
+            try:
+                with transaction.atomic():
+                    Entry.objects.select_for_update(nowait=True).get(pk=entry.pk)
+            except DatabaseError as e:
+                errors.append(e)
+            finally:
+                connection.close()
+
+        def probe_urls(urls):
+            thread = threading.Thread(target=edit_entry)
+            thread.start()
+            thread.join()
+            return {url: probing.ProbeResult(url) for url in urls}
+
+        with patch.object(probing, "probe_urls", side_effect=probe_urls):
+            classify_pending_entries()
+        self.assertEqual(errors, [])
+
+
+class ReclassifyEntriesTests(TestCase):
+    def setUp(self):
+        self.probed_entry = entry_recipe.make(
+            url=fake.url(),
+            type=Entry.EntryType.URL,
+            mime_type="video/webm",
+            probed_at=timezone.now(),
+        )
+        self.unprobed_entry = entry_recipe.make(url=fake.url(), type=Entry.EntryType.IMAGE)
+
+    def test_determines_type_from_stored_mime_type(self):
+        self.assertTrue(reclassify_entry(self.probed_entry))
+        self.assertEqual(self.probed_entry.type, Entry.EntryType.VIDEO)
+
+    def test_keeps_type_of_entry_without_probe_metadata(self):
+        self.assertFalse(reclassify_entry(self.unprobed_entry))
+        self.assertEqual(self.unprobed_entry.type, Entry.EntryType.IMAGE)
+
+    def test_command_updates_changed_entries(self):
+        out = StringIO()
+        call_command("reclassify_entries", "--chunk-size", "1", stdout=out)
+        self.assertIn("Done: 1 of 2 entries changed type.", out.getvalue())
+        self.probed_entry.refresh_from_db()
+        self.assertEqual(self.probed_entry.type, Entry.EntryType.VIDEO)
+
+    def test_command_dry_run_does_not_save_changes(self):
+        call_command("reclassify_entries", "--dry-run", stdout=StringIO())
+        self.probed_entry.refresh_from_db()
+        self.assertEqual(self.probed_entry.type, Entry.EntryType.URL)
+
+    def test_command_resumes_from_checkpoint(self):
+        last_pk = max(self.probed_entry.pk, self.unprobed_entry.pk)
+        with tempfile.TemporaryDirectory() as tmp_dir:
+            checkpoint = Path(tmp_dir) / "checkpoint"
+            checkpoint.write_text(str(last_pk))
+            new_entry = entry_recipe.make(
+                url=fake.url(), mime_type="image/png", probed_at=timezone.now()
+            )
+            out = StringIO()
+            call_command("reclassify_entries", "--checkpoint", checkpoint, stdout=out)
+            self.assertEqual(checkpoint.read_text(), str(new_entry.pk))
+
+        self.assertIn(f"Resuming after entry {last_pk}.", out.getvalue())
+        self.assertIn("Done: 1 of 1 entries changed type.", out.getvalue())
@@ -0,0 +1,102 @@
+from django.core.cache.backends.locmem import LocMemCache
+from django.db import transaction
+from django.test import RequestFactory, TestCase, TransactionTestCase
+
+from linkysets.users.models import User
+from linkysets.users.tests.bakery_recipes import user_recipe
+
+from ..context_processors import ratings
+from ..models import EntrySet
+from ..ratings import (
+    RATING_LIST_LIMIT,
+    RATINGS_CACHE_KEY,
+    get_cache,
+    get_ratings,
+    invalidate_ratings,
+)
+from .bakery_recipes import entryset_recipe
+
+
+class RatingsContextProcessorTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.prolific_author = user_recipe.make()
+        cls.author = user_recipe.make()
+        entryset_recipe.make(author=cls.prolific_author, _quantity=2)
+        cls.entryset = entryset_recipe.make(author=cls.author)
+
+    def setUp(self):
+        invalidate_ratings()
+        self.request = RequestFactory().get("/")
+
+    def get_ratings(self):
+        return ratings(self.request)
+
+    def test_lists_top_authors(self):
+        top_authors = self.get_ratings()["top_authors"]
+        self.assertEqual(top_authors, [self.prolific_author, self.author])
+        self.assertEqual([author.num_sets for author in top_authors], [2, 1])
+
+    def test_lists_recent_entrysets(self):
+        recent_entrysets = self.get_ratings()["recent_entrysets"]
+        self.assertEqual(recent_entrysets[0], self.entryset)
+        self.assertEqual(len(recent_entrysets), 3)
+
+    def test_limits_lists(self):
+        entryset_recipe.make(_quantity=RATING_LIST_LIMIT)
+        self.assertEqual(len(self.get_ratings()["recent_entrysets"]), RATING_LIST_LIMIT)
+
+    def test_cached_ratings_render_with_one_cache_lookup(self):
+        self.get_ratings()
+        with self.assertNumQueries(1):
+            context = self.get_ratings()
+            for entryset in context["recent_entrysets"]:
+                str(entryset)
+                entryset.get_absolute_url()
+                entryset.get_author().get_absolute_url()
+            for author in context["top_authors"]:
+                author.get_absolute_url()
+
+    def test_invalidates_on_new_entryset(self):
+        self.get_ratings()
+        entryset = entryset_recipe.make(author=self.author)
+        self.assertEqual(self.get_ratings()["recent_entrysets"][0], entryset)
+
+    def test_invalidates_on_deleted_entryset(self):
+        self.get_ratings()
+        EntrySet.objects.get(pk=self.entryset.pk).delete()
+        self.assertNotIn(self.entryset, self.get_ratings()["recent_entrysets"])
+        self.assertNotIn(self.author, self.get_ratings()["top_authors"])
+
+    def test_invalidates_on_entryset_rename(self):
+        self.get_ratings()
+        entryset = EntrySet.objects.get(pk=self.entryset.pk)
+        entryset.name = "Renamed"
+        entryset.save(update_fields=["name"])
+        self.assertEqual(str(self.get_ratings()["recent_entrysets"][0]), "Renamed")
+
+    def test_invalidates_on_author_rename(self):
+        self.get_ratings()
+        author = User.objects.get(pk=self.author.pk)
+        author.username = "renamed"
+        author.save()
+        usernames = [author.username for author in self.get_ratings()["top_authors"]]
+        self.assertIn("renamed", usernames)
+
+    def test_keeps_cache_on_login(self):
+        self.get_ratings()
+        self.author.save(update_fields=["last_login"])
+        with self.assertNumQueries(1):
+            self.get_ratings()
+
+    def test_uses_shared_cache(self):
+        self.assertNotIsInstance(get_cache(), LocMemCache)
+
+
+class RatingsCommitTests(TransactionTestCase):
+    def test_drops_ratings_cached_before_commit(self):
+        with transaction.atomic():
+            entryset = entryset_recipe.make()
+            # Another process renders a page before the commit and caches the old ratings
+            get_cache().set(RATINGS_CACHE_KEY, {"recent_entrysets": []})
+        self.assertEqual(get_ratings()["recent_entrysets"], [entryset])
@@ -1,7 +1,8 @@
 from unittest.mock import patch
 
 import requests
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.utils import timezone
 from faker import Faker
 
 from linkysets.users.tests.bakery_recipes import user_recipe
@@ -62,6 +63,14 @@ class EntryFormTests(TestCase):
         # getting entry from db shouldn't raise errors
         entry = Entry.objects.get(pk=entry.pk)
 
+    @patch("requests.Session.head")
+    def test_stores_probe_metadata(self, head_mock):
+        head_mock.side_effect = head_response_factory(lambda response: "audio/mpeg")
+        entry = EntryForm(self.valid_data).save()
+        entry.refresh_from_db()
+        self.assertEqual(entry.mime_type, "audio/mpeg")
+        self.assertIsNotNone(entry.probed_at)
+
     @patch("requests.Session.head")
     def test_skips_url_request_on_resave_with_same_url(self, head_mock):
         self.valid_data["url"] = self.entry.url
@@ -76,6 +85,29 @@ class EntryFormTests(TestCase):
         form.save()
         head_mock.assert_called_once()
 
+    @patch("requests.Session.head")
+    def test_validates_cached_url_without_request(self, head_mock):
+        head_mock.side_effect = self.head_response
+        EntryForm(self.valid_data).is_valid()
+        head_mock.reset_mock()
+        form = EntryForm(self.valid_data)
+        self.assertTrue(form.is_valid())
+        head_mock.assert_not_called()
+
+    @override_settings(
+        URL_PROBE_BREAKER_THRESHOLD=1, URL_PROBE_BREAKER_FALLBACK_TO_URL=True
+    )
+    @patch("requests.Session.head")
+    def test_sets_url_type_if_host_breaker_is_open(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        with self.assertLogs("linkysets.entries.probing", "WARNING"):
+            EntryForm(self.valid_data).is_valid()
+        data = {**self.valid_data, "url": f"{self.url}{fake.uri_path()}"}
+        form = EntryForm(data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["type"], Entry.EntryType.URL)
+        head_mock.assert_called_once()
+
     @patch("requests.Session.head")
     def test_determines_youtube_video_type(self, head_mock):
         head_mock.side_effect = head_response_factory()
@@ -84,6 +116,62 @@ class EntryFormTests(TestCase):
         entry = form.save()
         self.assertEqual(entry.type, Entry.EntryType.YT_VIDEO)
 
+    @patch("requests.Session.head")
+    def test_classifies_url_with_known_shape_without_request(self, head_mock):
+        self.valid_data["url"] = f"{self.url}image.png"
+        form = EntryForm(self.valid_data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["type"], Entry.EntryType.IMAGE)
+        head_mock.assert_not_called()
+
+    def assertProbeMetadataCleared(self, new_url):
+        entry = entry_recipe.make(
+            mime_type="text/html", content_length=1024, probed_at=timezone.now()
+        )
+        form = EntryForm({**self.valid_data, "url": new_url}, instance=entry)
+        entry = form.save()
+        self.assertEqual(entry.mime_type, "")
+        self.assertIsNone(entry.content_length)
+        self.assertIsNone(entry.probed_at)
+
+    def test_clears_probe_metadata_of_fast_classified_url(self):
+        self.assertProbeMetadataCleared(f"{self.url}image.png")
+
+    @override_settings(DEFERRED_CLASSIFICATION=True)
+    def test_clears_probe_metadata_of_deferred_url(self):
+        self.assertProbeMetadataCleared(self.url)
+
+    @override_settings(URL_FAST_CLASSIFICATION=False)
+    @patch("requests.Session.head")
+    def test_requests_url_with_known_shape_if_fast_classification_is_off(self, head_mock):
+        head_mock.side_effect = head_response_factory(
+            get_content_type=lambda response: "text/html"
+        )
+        self.valid_data["url"] = f"{self.url}image.png"
+        form = EntryForm(self.valid_data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["type"], Entry.EntryType.URL)
+        head_mock.assert_called_once()
+
+    @override_settings(URL_FAST_CLASSIFICATION_STRICT=True)
+    @patch("requests.Session.head")
+    def test_strict_fast_classification_still_checks_reachability(self, head_mock):
+        head_mock.side_effect = requests.ConnectionError
+        self.valid_data["url"] = f"{self.url}video.mp4"
+        form = EntryForm(self.valid_data)
+        self.assertFalse(form.is_valid())
+        self.assertIn("url", form.errors)
+
+    @override_settings(URL_FAST_CLASSIFICATION_STRICT=True)
+    @patch("requests.Session.head")
+    def test_strict_fast_classification_keeps_guessed_type(self, head_mock):
+        head_mock.side_effect = head_response_factory(get_content_type=None)
+        self.valid_data["url"] = f"{self.url}video.mp4"
+        form = EntryForm(self.valid_data)
+        self.assertTrue(form.is_valid())
+        self.assertEqual(form.cleaned_data["type"], Entry.EntryType.VIDEO)
+        head_mock.assert_called_once()
+
     @patch("requests.Session.head")
     def test_sets_type_to_url_if_response_has_no_content_type(self, head_mock):
         head_mock.side_effect = head_response_factory(get_content_type=None)
@@ -184,6 +272,27 @@ class EntryFormsetTests(EntryFormsetDataMixin, TestCase):
         delete_obj = formset.deleted_objects[0]
         self.assertEqual(delete_obj.pk, delete_id)
 
+    @patch("requests.Session.head")
+    def test_probes_only_changed_urls_once(self, head_mock):
+        head_mock.side_effect = self.head_response
+        url = fake.url()
+        valid_data = {**self.valid_data, "entries-0-url": url}
+        formset = EntryFormset(valid_data, instance=self.entryset)
+        self.assertTrue(formset.is_valid())
+        head_mock.assert_called_once()
+        self.assertEqual(head_mock.call_args[0][0], url)
+
+    @patch("requests.Session.head")
+    def test_passes_probe_results_to_forms(self, head_mock):
+        head_mock.side_effect = self.head_response
+        url = fake.url()
+        valid_data = {**self.valid_data, "entries-1-url": url}
+        formset = EntryFormset(valid_data, instance=self.entryset)
+        formset.full_clean()
+        form = formset.forms[1]
+        self.assertEqual(form.probe_result.url, url)
+        self.assertIsNone(formset.forms[0].probe_result)
+
     @patch("requests.Session.head")
     def test_respects_max_entries_setting(self, head_mock):
         head_mock.side_effect = self.head_response
@@ -1,5 +1,9 @@
+from io import StringIO
+
+from django.conf import settings
 from django.core.exceptions import ValidationError
-from django.test import TestCase
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
 from faker import Faker
 
 from .. import behavior
@@ -60,6 +64,31 @@ class EntryTests(TestCase):
         type_ = self.entry.determine_type(url, "text/html")
         self.assertEqual(type_, Entry.EntryType.URL)
 
+    def test_guesses_type_from_url_extension(self):
+        for type_, behavior_cls in Entry._TYPE_BEHAVIOR_DICT.items():
+            if not behavior_cls.url_extensions:
+                continue
+            extension = fake.random_element(behavior_cls.url_extensions)
+            url = f"{fake.url()}{fake.uri_path()}{extension.upper()}"
+            with self.subTest(type_=type_, url=url):
+                self.assertEqual(self.entry.guess_type(url), type_)
+
+    def test_guesses_youtube_type(self):
+        url = get_random_youtube_url()
+        self.assertEqual(self.entry.guess_type(url), Entry.EntryType.YT_VIDEO)
+
+    def test_does_not_guess_type_of_unknown_url(self):
+        for url in [fake.url(), "https://www.youtube.com/", "https://youtu.be/"]:
+            with self.subTest(url=url):
+                self.assertIsNone(self.entry.guess_type(url))
+
+    @override_settings(URL_CLASSIFICATION_EXTENSIONS={"ImageTypeBehavior": [".svg"]})
+    def test_guesses_type_from_extensions_setting(self):
+        self.assertEqual(
+            self.entry.guess_type("https://example.com/logo.svg"), Entry.EntryType.IMAGE
+        )
+        self.assertIsNone(self.entry.guess_type("https://example.com/logo.png"))
+
     def test_gets_correct_type_behavior(self):
         for type_, behavior_cls in Entry._TYPE_BEHAVIOR_DICT.items():
             self.entry.type = type_
@@ -85,3 +114,33 @@ class EntryTests(TestCase):
         self.entry.type = Entry.EntryType.YT_VIDEO
         html = self.entry.render()
         self.assertRegex(html, r"https://www\.youtube\.com/embed/\w+")
+
+
+class BehaviorTemplatesTests(SimpleTestCase):
+    def setUp(self):
+        behavior.clear_templates()
+
+    def test_compiles_template_once(self):
+        for behavior_cls in Entry._TYPE_BEHAVIOR_DICT.values():
+            with self.subTest(behavior_cls=behavior_cls):
+                self.assertIs(behavior_cls.get_template(), behavior_cls.get_template())
+
+    def test_warm_up_compiles_all_templates(self):
+        behavior.warm_up_templates()
+        self.assertEqual(set(behavior._templates), set(Entry._TYPE_BEHAVIOR_DICT.values()))
+
+    def test_clears_templates_on_templates_setting_change(self):
+        template = behavior.UrlTypeBehavior.get_template()
+        with override_settings(TEMPLATES=settings.TEMPLATES):
+            self.assertIsNot(behavior.UrlTypeBehavior.get_template(), template)
+
+    @override_settings(DEBUG=True)
+    def test_does_not_cache_template_files_in_debug(self):
+        behavior.ImageTypeBehavior.get_template()
+        behavior.VideoTypeBehavior.get_template()
+        self.assertNotIn(behavior.VideoTypeBehavior, behavior._templates)
+
+    def test_benchmark_command_reports_render_cost(self):
+        out = StringIO()
+        call_command("bench_entry_rendering", "--entries", "10", stdout=out)
+        self.assertIn("us/entry", out.getvalue())
@@ -0,0 +1,408 @@
+import io
+import itertools
+import threading
+import time
+from http.client import HTTPMessage
+from unittest.mock import patch
+
+import requests
+from django.core.management import call_command
+from django.test import SimpleTestCase, TestCase, override_settings
+from faker import Faker
+from requests.cookies import MockRequest, MockResponse
+
+from .. import probing
+from .common import head_response_factory
+
+fake = Faker()
+url_ids = itertools.count()
+
+
+def unique_url(host: str) -> str:
+    # Random paths repeat, and repeated urls of one batch get deduplicated
+    return f"https://{host}/{fake.uri_path()}/{next(url_ids)}"
+
+
+class SessionTests(SimpleTestCase):
+    def setUp(self):
+        probing.reset_session()
+        self.addCleanup(probing.reset_session)
+
+    def test_reuses_session(self):
+        self.assertIs(probing.get_session(), probing.get_session())
+
+    def test_creates_new_session_after_reset(self):
+        session = probing.get_session()
+        probing.reset_session()
+        self.assertIsNot(probing.get_session(), session)
+
+    @override_settings(
+        URL_PROBE_POOL_CONNECTIONS=3, URL_PROBE_POOL_MAXSIZE=7, URL_PROBE_MAX_RETRIES=2
+    )
+    def test_configures_pools_and_retries(self):
+        session = probing.get_session()
+        for prefix in ["http://", "https://"]:
+            adapter = session.get_adapter(f"{prefix}{fake.domain_name()}")
+            with self.subTest(prefix=prefix):
+                self.assertEqual(adapter._pool_connections, 3)
+                self.assertEqual(adapter._pool_maxsize, 7)
+                self.assertEqual(adapter.max_retries.total, 2)
+
+    def test_rejects_cookies(self):
+        session = probing.get_session()
+        headers = HTTPMessage()
+        headers["Set-Cookie"] = "session=secret"
+        request = requests.Request("HEAD", fake.url()).prepare()
+        session.cookies.extract_cookies(MockResponse(headers), MockRequest(request))
+        self.assertEqual(len(session.cookies), 0)
+
+    def test_shares_session_between_threads(self):
+        sessions = []
+        threads = [
+            threading.Thread(target=lambda: sessions.append(probing.get_session()))
+            for _ in range(4)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+        self.assertEqual(len({id(session) for session in sessions}), 1)
+
+
+class ProbeUrlTests(TestCase):
+    def setUp(self):
+        self.url = fake.url()
+
+    @patch("requests.Session.head")
+    def test_returns_final_url_and_mime_type(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        result = probing.probe_url(self.url)
+        self.assertTrue(result.is_reachable)
+        self.assertEqual(result.final_url, self.url)
+        self.assertEqual(result.mime_type, "text/html")
+
+    @patch("requests.Session.head")
+    def test_returns_no_mime_type_if_response_has_no_content_type(self, head_mock):
+        head_mock.side_effect = head_response_factory(get_content_type=None)
+        result = probing.probe_url(self.url)
+        self.assertTrue(result.is_reachable)
+        self.assertIsNone(result.mime_type)
+
+    @patch("requests.Session.head")
+    def test_returns_content_length(self, head_mock):
+        get_response = head_response_factory()
+
+        def head(url, *args, **kwargs):
+            response = get_response(url, *args, **kwargs)
+            response.headers["content-length"] = "1024"
+            return response
+
+        head_mock.side_effect = head
+        result = probing.probe_url(self.url)
+        self.assertEqual(result.content_length, 1024)
+
+    @patch("requests.Session.head")
+    def test_returns_no_content_length_if_header_is_invalid(self, head_mock):
+        get_response = head_response_factory()
+
+        def head(url, *args, **kwargs):
+            response = get_response(url, *args, **kwargs)
+            response.headers["content-length"] = "-1"
+            return response
+
+        head_mock.side_effect = head
+        result = probing.probe_url(self.url)
+        self.assertIsNone(result.content_length)
+
+    @patch("requests.Session.head")
+    def test_returns_unreachable_result_on_request_error(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        result = probing.probe_url(self.url)
+        self.assertFalse(result.is_reachable)
+        self.assertEqual(result.url, self.url)
+
+
+class ProbeUrlsTests(TestCase):
+    def setUp(self):
+        self.urls = [fake.url() for _ in range(3)]
+
+    @patch("requests.Session.head")
+    def test_probes_urls_concurrently(self, head_mock):
+        # Every probe waits for the others, so the barrier breaks if they run in a row
+        barrier = threading.Barrier(len(self.urls), timeout=1)
+        get_response = head_response_factory()
+
+        def head(url, *args, **kwargs):
+            barrier.wait()
+            return get_response(url, *args, **kwargs)
+
+        head_mock.side_effect = head
+        results = probing.probe_urls(self.urls)
+        self.assertEqual(list(results), self.urls)
+        for url, result in results.items():
+            with self.subTest(url=url):
+                self.assertTrue(result.is_reachable)
+
+    @patch("requests.Session.head")
+    def test_probes_same_url_once(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        url = self.urls[0]
+        probing.probe_urls([url, url])
+        head_mock.assert_called_once()
+
+    @override_settings(URL_PROBE_DEADLINE=0.1)
+    @patch("requests.Session.head")
+    def test_marks_urls_unreachable_after_deadline(self, head_mock):
+        get_response = head_response_factory()
+
+        def head(url, *args, **kwargs):
+            time.sleep(0.5)
+            return get_response(url, *args, **kwargs)
+
+        head_mock.side_effect = head
+        start = time.monotonic()
+        results = probing.probe_urls(self.urls)
+        self.assertLess(time.monotonic() - start, 0.5)
+        for url, result in results.items():
+            with self.subTest(url=url):
+                self.assertFalse(result.is_reachable)
+
+
+class ConcurrencyLimiterTests(SimpleTestCase):
+    def setUp(self):
+        self.limiter = probing.ConcurrencyLimiter(max_in_flight=2, max_per_host=1)
+        self.until = time.monotonic() + 1
+
+    def test_limits_probes_per_host(self):
+        self.assertTrue(self.limiter.acquire("a.com", self.until))
+        self.assertFalse(self.limiter.acquire("a.com", time.monotonic()))
+        self.assertTrue(self.limiter.acquire("b.com", self.until))
+        self.limiter.release("a.com")
+        self.assertTrue(self.limiter.acquire("a.com", time.monotonic()))
+
+    def test_limits_probes_in_flight(self):
+        self.assertTrue(self.limiter.acquire("a.com", self.until))
+        self.assertTrue(self.limiter.acquire("b.com", self.until))
+        self.assertFalse(self.limiter.acquire("c.com", time.monotonic()))
+        self.limiter.release("b.com")
+        self.assertTrue(self.limiter.acquire("c.com", time.monotonic()))
+
+    def test_queues_probes_until_slot_is_free(self):
+        self.limiter.acquire("a.com", self.until)
+        timer = threading.Timer(0.05, self.limiter.release, ["a.com"])
+        timer.start()
+        self.addCleanup(timer.cancel)
+        self.assertTrue(self.limiter.acquire("a.com", self.until))
+
+    def test_drops_idle_hosts(self):
+        self.limiter.acquire("a.com", self.until)
+        self.limiter.acquire("a.com", time.monotonic())
+        self.limiter.release("a.com")
+        self.assertEqual(self.limiter._hosts, {})
+
+
+@override_settings(URL_PROBE_MAX_PER_HOST=1)
+class ProbeLimitsTests(TestCase):
+    def setUp(self):
+        probing.get_cache().clear()
+        probing.reset_limiter()
+        self.addCleanup(probing.reset_limiter)
+        self.host = fake.domain_name()
+        self.urls = [unique_url(self.host) for _ in range(3)]
+
+    @patch("requests.Session.head")
+    def test_limits_concurrent_probes_to_one_host(self, head_mock):
+        lock = threading.Lock()
+        in_flight = []
+        max_in_flight = []
+        get_response = head_response_factory()
+
+        def head(url, *args, **kwargs):
+            with lock:
+                in_flight.append(url)
+                max_in_flight.append(len(in_flight))
+            time.sleep(0.02)
+            with lock:
+                in_flight.remove(url)
+            return get_response(url, *args, **kwargs)
+
+        head_mock.side_effect = head
+        results = probing.probe_urls(self.urls)
+        self.assertEqual(max(max_in_flight), 1)
+        self.assertTrue(all(result.is_reachable for result in results.values()))
+
+    @override_settings(URL_PROBE_DEADLINE=0.05)
+    @patch("requests.Session.head")
+    def test_rejected_probes_are_not_cached_nor_counted_as_failures(self, head_mock):
+        limiter = probing.get_limiter()
+        limiter.acquire(self.host, time.monotonic())
+        self.addCleanup(limiter.release, self.host)
+
+        with self.assertLogs("linkysets.entries.probing", "INFO"):
+            result = probing.probe_url(self.urls[0])
+        self.assertFalse(result.is_reachable)
+        head_mock.assert_not_called()
+        self.assertEqual(probing.get_cached_results([self.urls[0]]), {})
+        self.assertEqual(probing.CircuitBreaker([self.host]).failures[self.host], 0)
+
+
+class ProbeCacheTests(TestCase):
+    def setUp(self):
+        self.url = fake.url()
+        probing.cache_stats.reset()
+
+    def test_normalizes_url(self):
+        self.assertEqual(
+            probing.normalize_url("HTTPS://Example.COM:443/path?b=2&a=1#fragment"),
+            "https://example.com/path?a=1&b=2",
+        )
+
+    def test_keeps_non_default_port_in_normalized_url(self):
+        self.assertEqual(
+            probing.normalize_url("http://example.com:8080"), "http://example.com:8080/"
+        )
+
+    @patch("requests.Session.head")
+    def test_serves_repeated_probe_from_cache(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        first = probing.probe_url(self.url)
+        second = probing.probe_url(self.url)
+        head_mock.assert_called_once()
+        self.assertEqual(first, second)
+
+    @patch("requests.Session.head")
+    def test_shares_cache_between_equivalent_urls(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        probing.probe_url("http://example.com/path?a=1&b=2")
+        result = probing.probe_url("HTTP://EXAMPLE.COM:80/path?b=2&a=1")
+        head_mock.assert_called_once()
+        self.assertEqual(result.url, "HTTP://EXAMPLE.COM:80/path?b=2&a=1")
+
+    @patch("requests.Session.head")
+    def test_stores_status_and_probe_time(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        probing.probe_url(self.url)
+        result = probing.get_cache().get(probing.make_cache_key(self.url))
+        self.assertEqual(result.final_url, self.url)
+        self.assertIsNotNone(result.probed_at)
+
+    @patch("requests.Session.head")
+    def test_caches_unreachable_urls(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        probing.probe_url(self.url)
+        result = probing.probe_url(self.url)
+        head_mock.assert_called_once()
+        self.assertFalse(result.is_reachable)
+
+    @override_settings(URL_PROBE_NEGATIVE_CACHE_TTL=0)
+    @patch("requests.Session.head")
+    def test_unreachable_urls_expire_after_negative_ttl(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        probing.probe_url(self.url)
+        probing.probe_url(self.url)
+        self.assertEqual(head_mock.call_count, 2)
+
+    @patch("requests.Session.head")
+    def test_counts_hits_and_misses(self, head_mock):
+        head_mock.side_effect = head_response_factory()
+        probing.probe_urls([self.url, fake.url()])
+        probing.probe_url(self.url)
+        stats = probing.cache_stats.get()
+        self.assertEqual(stats["hits"], 1)
+        self.assertEqual(stats["misses"], 2)
+        self.assertAlmostEqual(stats["hit_ratio"], 1 / 3)
+
+    def test_stats_command_shows_counters(self):
+        probing.cache_stats.hit()
+        out = io.StringIO()
+        call_command("url_probe_stats", stdout=out)
+        self.assertIn("hits: 1", out.getvalue())
+        self.assertIn("hit_ratio: 100.00%", out.getvalue())
+
+
+@override_settings(URL_PROBE_BREAKER_THRESHOLD=2)
+class CircuitBreakerTests(TestCase):
+    def setUp(self):
+        self.host = fake.domain_name()
+        probing.breaker_counters.reset()
+
+    def get_url(self):
+        return unique_url(self.host)
+
+    def open_breaker(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        with self.assertLogs(probing.logger, "WARNING") as logs:
+            probing.probe_urls([self.get_url(), self.get_url()])
+        self.assertIn(f'Circuit breaker for "{self.host}" host got opened', logs.output[0])
+        head_mock.reset_mock()
+
+    def expire_breaker(self):
+        probing.get_cache().delete(probing.CircuitBreaker.make_key(self.host, "open"))
+
+    def get_state(self):
+        return probing.CircuitBreaker([self.host]).get_state(self.host)
+
+    @patch("requests.Session.head")
+    def test_opens_after_consecutive_failures(self, head_mock):
+        self.open_breaker(head_mock)
+        self.assertEqual(self.get_state(), probing.CircuitBreaker.OPEN)
+        self.assertEqual(probing.breaker_counters.get()["opened"], 1)
+
+    @patch("requests.Session.head")
+    def test_success_resets_failures(self, head_mock):
+        head_mock.side_effect = requests.RequestException()
+        probing.probe_url(self.get_url())
+        head_mock.side_effect = head_response_factory()
+        probing.probe_url(self.get_url())
+        head_mock.side_effect = requests.RequestException()
+        probing.probe_url(self.get_url())
+        self.assertEqual(self.get_state(), probing.CircuitBreaker.CLOSED)
+
+    @patch("requests.Session.head")
+    def test_open_breaker_fails_fast(self, head_mock):
+        self.open_breaker(head_mock)
+        result = probing.probe_url(self.get_url())
+        head_mock.assert_not_called()
+        self.assertFalse(result.is_reachable)
+        self.assertEqual(probing.breaker_counters.get()["rejected"], 1)
+
+    @override_settings(URL_PROBE_BREAKER_FALLBACK_TO_URL=True)
+    @patch("requests.Session.head")
+    def test_open_breaker_falls_back_to_url_type(self, head_mock):
+        self.open_breaker(head_mock)
+        url = self.get_url()
+        result = probing.probe_url(url)
+        head_mock.assert_not_called()
+        self.assertEqual(result.final_url, url)
+        self.assertIsNone(result.mime_type)
+
+    @patch("requests.Session.head")
+    def test_closes_after_successful_trial(self, head_mock):
+        self.open_breaker(head_mock)
+        self.expire_breaker()
+        self.assertEqual(self.get_state(), probing.CircuitBreaker.HALF_OPEN)
+        head_mock.side_effect = head_response_factory()
+        with self.assertLogs(probing.logger, "INFO"):
+            results = probing.probe_urls([self.get_url(), self.get_url()])
+        # Only one trial probe gets through the half-open breaker
+        head_mock.assert_called_once()
+        self.assertEqual(sum(result.is_reachable for result in results.values()), 1)
+        self.assertEqual(self.get_state(), probing.CircuitBreaker.CLOSED)
+        self.assertEqual(probing.breaker_counters.get()["closed"], 1)
+
+    @patch("requests.Session.head")
+    def test_reopens_after_failed_trial(self, head_mock):
+        self.open_breaker(head_mock)
+        self.expire_breaker()
+        head_mock.side_effect = requests.RequestException()
+        with self.assertLogs(probing.logger, "WARNING"):
+            probing.probe_url(self.get_url())
+        head_mock.assert_called_once()
+        self.assertEqual(self.get_state(), probing.CircuitBreaker.OPEN)
+
+    @patch("requests.Session.head")
+    def test_stats_command_shows_host_state(self, head_mock):
+        self.open_breaker(head_mock)
+        out = io.StringIO()
+        call_command("url_probe_stats", host=[self.host], stdout=out)
+        self.assertIn(f"{self.host}: open (2 failures)", out.getvalue())
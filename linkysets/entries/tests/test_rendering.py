@@ -0,0 +1,98 @@
+from io import StringIO
+from unittest.mock import patch
+
+from django.conf import settings
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.test import TestCase
+from django.utils.safestring import SafeString
+from faker import Faker
+
+from linkysets.common.cache import CacheStats
+
+from .. import rendering
+from ..behavior import ImageTypeBehavior
+from ..models import Entry, EntrySet
+from .bakery_recipes import entry_recipe, entryset_recipe
+
+fake = Faker()
+
+
+class RenderCacheTests(TestCase):
+    def setUp(self):
+        rendering.get_cache().clear()
+        self.entry = entry_recipe.make(type=Entry.EntryType.IMAGE, url=fake.image_url())
+
+    def test_renders_entry_once(self):
+        with patch.object(ImageTypeBehavior, "render", return_value="<img>") as render:
+            self.assertEqual(self.entry.render(), "<img>")
+            entry = Entry.objects.get(pk=self.entry.pk)
+            self.assertEqual(entry.render(), "<img>")
+        render.assert_called_once()
+
+    def test_returns_safe_html(self):
+        self.entry.render()
+        entry = Entry.objects.get(pk=self.entry.pk)
+        self.assertIsInstance(entry.render(), SafeString)
+
+    def test_renders_again_after_entry_change(self):
+        html = self.entry.render()
+        self.entry.url = fake.image_url()
+        self.entry.save()
+        entry = Entry.objects.get(pk=self.entry.pk)
+        self.assertNotEqual(entry.render(), html)
+        self.assertIn(self.entry.url, entry.render())
+
+    def test_renders_again_after_type_change(self):
+        self.entry.render()
+        self.entry.type = Entry.EntryType.URL
+        self.assertIn("<a href", self.entry.render())
+
+    def test_does_not_cache_unsaved_entry(self):
+        entry = entry_recipe.prepare(type=Entry.EntryType.IMAGE)
+        entry.render()
+        self.assertEqual(rendering.cache_stats.get()["misses"], 0)
+
+    def test_primes_page_of_entries_with_one_query(self):
+        entryset = entryset_recipe.make()
+        entries = entry_recipe.make(_quantity=3, type=Entry.EntryType.VIDEO)
+        entryset.entries.set(entries)
+        for entry in entries:
+            entry.render()
+
+        entrysets = list(EntrySet.objects.for_list().filter(pk=entryset.pk))
+        cache = rendering.get_cache()
+        with patch.object(cache, "get_many", wraps=cache.get_many) as get_many_mock:
+            rendering.prime_entrysets_render_cache(entrysets)
+        get_many_mock.assert_called_once()
+
+        with patch.object(cache, "get") as get_mock:
+            for entry in entrysets[0].entries.all():
+                entry.render()
+        get_mock.assert_not_called()
+
+    def test_counts_hits_and_misses(self):
+        rendering.cache_stats.reset()
+        self.entry.render()
+        Entry.objects.get(pk=self.entry.pk).render()
+        entries = [Entry.objects.get(pk=self.entry.pk), entry_recipe.make(type=1)]
+        rendering.prime_render_cache(entries)
+        stats = rendering.cache_stats.get()
+        self.assertEqual((stats["hits"], stats["misses"]), (2, 2))
+
+    def test_stats_command_shows_hit_ratio(self):
+        rendering.cache_stats.reset()
+        self.entry.render()
+        Entry.objects.get(pk=self.entry.pk).render()
+        out = StringIO()
+        call_command("entry_render_stats", stdout=out)
+        self.assertIn("render cache hit_ratio: 50.00%", out.getvalue())
+
+    def test_counters_are_shared_between_processes(self):
+        rendering.cache_stats.reset()
+        self.entry.render()
+        rendering.cache_stats.flush()
+        # The counters must not live in a per process cache, unlike the html
+        stats = CacheStats("entry-render", cache_alias=settings.ENTRY_RENDER_STATS_CACHE)
+        self.assertNotIsInstance(stats.cache, LocMemCache)
+        self.assertEqual(stats.get()["misses"], 1)
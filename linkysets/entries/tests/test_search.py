@@ -0,0 +1,324 @@
+import tempfile
+from io import StringIO
+from pathlib import Path
+from unittest.mock import patch
+
+from django.core.cache.backends.locmem import LocMemCache
+from django.core.management import call_command
+from django.db import transaction
+from django.shortcuts import reverse
+from django.test import TestCase, TransactionTestCase, override_settings
+
+from linkysets.users.tests.bakery_recipes import user_recipe
+
+from .. import probing, search_cache
+from ..classification import classify_pending_entries
+from ..models import ClassificationJob, EntrySet, SearchSuggestion
+from ..search_backends import PostgresSearchBackend, SqliteSearchBackend, get_search_backend
+from ..search_cache import invalidate_search_results
+from .bakery_recipes import entry_recipe, entryset_recipe
+from .common import head_response_factory
+
+
+class SearchIndexTests(TestCase):
+    def setUp(self):
+        self.author = user_recipe.make(username="penguin")
+        self.entry = entry_recipe.make(label="Glacier", url="https://example.com/ice-floe")
+        self.entryset = entryset_recipe.make(
+            name="Antarctica", author=self.author, entries=[self.entry]
+        )
+
+    def get_document(self):
+        self.entryset.refresh_from_db()
+        return self.entryset.search_document
+
+    def test_indexes_name_author_labels_and_url_tokens(self):
+        self.assertEqual(
+            self.get_document(), "antarctica penguin glacier https example com ice floe"
+        )
+
+    def test_updates_on_rename(self):
+        self.entryset.name = "Arctic"
+        self.entryset.save()
+        self.assertIn("arctic", self.get_document())
+
+    def test_skips_update_without_indexed_fields(self):
+        EntrySet.objects.filter(pk=self.entryset.pk).update(search_document="")
+        self.entryset.save(update_fields=["updated"])
+        self.assertEqual(self.get_document(), "")
+
+    def test_updates_on_added_and_removed_entries(self):
+        entry = entry_recipe.make(label="Iceberg")
+        self.entryset.entries.add(entry)
+        self.assertIn("iceberg", self.get_document())
+        self.entryset.entries.remove(entry)
+        self.assertNotIn("iceberg", self.get_document())
+
+    def test_updates_on_entry_change(self):
+        self.entry.label = "Fjord"
+        self.entry.save()
+        self.assertIn("fjord", self.get_document())
+
+    def test_updates_on_author_rename(self):
+        self.author.username = "albatross"
+        self.author.save()
+        self.assertIn("albatross", self.get_document())
+
+    def test_skips_update_on_login(self):
+        EntrySet.objects.filter(pk=self.entryset.pk).update(search_document="")
+        self.author.save(update_fields=["last_login"])
+        self.assertEqual(self.get_document(), "")
+
+    def test_fills_search_vector(self):
+        self.entryset.refresh_from_db()
+        self.assertIn("'antarctica':1A", self.entryset.search_vector)
+
+
+class SearchBackendTestsMixin:
+    """
+    Relevance fixtures shared by the search backends tests.
+    """
+
+    @classmethod
+    def setUpTestData(cls):
+        cls.by_name = entryset_recipe.make(name="Volcano trip")
+        cls.by_url = entryset_recipe.make(
+            name="Holidays", entries=[entry_recipe.make(url="https://volcano.example.com")]
+        )
+        cls.by_label = entryset_recipe.make(
+            name="Maps", entries=[entry_recipe.make(label="Crater lakes")]
+        )
+        cls.unrelated = entryset_recipe.make(name="Gardening")
+
+    def setUp(self):
+        invalidate_search_results()
+
+    def search(self, term):
+        return list(EntrySet.objects.search(term).order_by("-rank", "-pk"))
+
+    def test_finds_whole_words(self):
+        self.assertEqual(self.search("volcano"), [self.by_name, self.by_url])
+
+    def test_finds_word_prefixes(self):
+        self.assertEqual(self.search("gardenin"), [self.unrelated])
+
+    def test_finds_entry_labels(self):
+        self.assertEqual(self.search("crater"), [self.by_label])
+
+    def test_finds_nothing_for_unknown_word(self):
+        self.assertEqual(self.search("submarine"), [])
+
+    def test_finds_nothing_for_punctuation(self):
+        self.assertEqual(self.search("!?"), [])
+
+    def test_ranks_name_matches_higher(self):
+        results = EntrySet.objects.search("volcano")
+        ranks = {entryset.pk: entryset.rank for entryset in results}
+        self.assertGreater(ranks[self.by_name.pk], ranks[self.by_url.pk])
+
+    def test_finds_renamed_set(self):
+        self.unrelated.name = "Beekeeping"
+        self.unrelated.save()
+        self.assertEqual(self.search("beekeeping"), [self.unrelated])
+        self.assertEqual(self.search("gardening"), [])
+
+    def test_skips_deleted_set(self):
+        EntrySet.objects.get(pk=self.by_url.pk).delete()
+        self.assertEqual(self.search("volcano"), [self.by_name])
+
+    @patch("requests.Session.head")
+    def test_finds_urls_rewritten_by_classification(self, head_mock):
+        def get_response(url, *args, **kwargs):
+            return head_response_factory()(f"https://geyser.example.com/{url[-1]}")
+
+        head_mock.side_effect = get_response
+        probing.get_cache().clear()
+        entries = [
+            entry_recipe.make(url=f"https://short.example.com/{i}") for i in range(2)
+        ]
+        entryset = entryset_recipe.make(name="Iceland", entries=entries)
+        ClassificationJob.objects.enqueue(entries)
+        classify_pending_entries()
+        self.assertEqual(self.search("geyser"), [entryset])
+        self.assertEqual(self.search("short"), [])
+
+    def test_rebuilds_index(self):
+        backend = get_search_backend()
+        self.assertEqual(backend.rebuild(chunk_size=2), EntrySet.objects.count())
+        self.assertEqual(self.search("volcano"), [self.by_name, self.by_url])
+
+    def test_rebuild_command(self):
+        out = StringIO()
+        call_command("rebuild_search_index", stdout=out)
+        self.assertIn(f"{EntrySet.objects.count()} entry sets indexed", out.getvalue())
+
+
+class PostgresSearchBackendTests(SearchBackendTestsMixin, TestCase):
+    def test_uses_postgres_backend(self):
+        self.assertIsInstance(get_search_backend(), PostgresSearchBackend)
+
+    def test_does_not_join_entries(self):
+        sql = str(EntrySet.objects.search("volcano").query)
+        self.assertNotIn('"entries_entry"', sql)
+        self.assertNotIn("DISTINCT", sql)
+
+
+class SqliteSearchBackendTests(SearchBackendTestsMixin, TestCase):
+    @classmethod
+    def setUpClass(cls):
+        tmp_dir = tempfile.TemporaryDirectory()
+        cls.addClassCleanup(tmp_dir.cleanup)
+        settings_override = override_settings(
+            ENTRY_SEARCH_BACKEND="linkysets.entries.search_backends.SqliteSearchBackend",
+            ENTRY_SEARCH_SQLITE_PATH=Path(tmp_dir.name) / "search.sqlite3",
+        )
+        settings_override.enable()
+        cls.addClassCleanup(settings_override.disable)
+        super().setUpClass()
+
+    def setUp(self):
+        super().setUp()
+        # The index file isn't rolled back with the test transactions
+        get_search_backend().rebuild()
+
+    def test_uses_sqlite_backend(self):
+        self.assertIsInstance(get_search_backend(), SqliteSearchBackend)
+
+    def test_search_queries_only_found_sets(self):
+        # found ids with their ranks and the sets, the rest are the generation and
+        # found ids lookups and 5 queries of the write in the shared cache
+        with self.assertNumQueries(9):
+            self.search("volcano")
+
+    def test_limits_results(self):
+        with override_settings(ENTRY_SEARCH_MAX_RESULTS=1):
+            get_search_backend().rebuild()
+            self.assertEqual(self.search("volcano"), [self.by_name])
+
+
+class SearchCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entry = entry_recipe.make(label="Volcano photos")
+        cls.entryset = entryset_recipe.make(name="Trip", entries=[cls.entry])
+
+    def setUp(self):
+        invalidate_search_results()
+
+    def search(self, term):
+        return list(EntrySet.objects.search(term).order_by("-rank", "-pk"))
+
+    def test_caches_found_ids(self):
+        self.search("volcano")
+        # the sets and the generation and found ids lookups in the shared cache
+        with self.assertNumQueries(3):
+            self.assertEqual(self.search("volcano"), [self.entryset])
+
+    def test_caches_normalized_term(self):
+        self.search("volcano")
+        with self.assertNumQueries(3):
+            self.search("  VOLCANO ")
+
+    def test_uses_shared_cache(self):
+        self.assertNotIsInstance(search_cache.get_cache(), LocMemCache)
+
+    def test_invalidates_on_new_set(self):
+        self.search("volcano")
+        entryset = entryset_recipe.make(name="Volcano")
+        self.assertEqual(self.search("volcano"), [entryset, self.entryset])
+
+    def test_invalidates_on_entry_change(self):
+        self.search("volcano")
+        self.entry.label = "Glacier photos"
+        self.entry.save()
+        self.assertEqual(self.search("volcano"), [])
+
+    def test_invalidates_on_deleted_set(self):
+        self.search("volcano")
+        EntrySet.objects.get(pk=self.entryset.pk).delete()
+        self.assertEqual(self.search("volcano"), [])
+
+    def test_evicted_generation_is_not_reused(self):
+        generation = search_cache.get_generation()
+        search_cache.get_generation_cache().delete(search_cache.GENERATION_KEY)
+        self.assertGreater(search_cache.get_generation(), generation)
+
+
+class SearchCacheCommitTests(TransactionTestCase):
+    def test_drops_results_cached_before_commit(self):
+        with transaction.atomic():
+            entryset = entryset_recipe.make(name="Volcano")
+            # Another process searches before the commit and caches the old results
+            key = search_cache.make_cache_key("volcano", search_cache.get_generation())
+            search_cache.get_cache().set(key, [])
+        self.assertEqual(list(EntrySet.objects.search("volcano")), [entryset])
+
+
+class SearchSuggestionTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.author = user_recipe.make(username="volcanologist")
+        entryset_recipe.make(
+            name="Volcano trip",
+            author=cls.author,
+            entries=[
+                entry_recipe.make(label="Volcanic ash", url="https://www.volcano.org/ash"),
+                entry_recipe.make(label="Volcanic ash", url="https://volcano.org/lava"),
+            ],
+        )
+        SearchSuggestion.objects.rebuild()
+
+    def get_suggestions(self, term):
+        response = self.client.get(reverse("entries:search_suggestions"), {"term": term})
+        return response.json()["suggestions"]
+
+    def test_rebuilds_suggestions_of_every_kind(self):
+        suggestions = {
+            (suggestion.kind, suggestion.text): suggestion.weight
+            for suggestion in SearchSuggestion.objects.filter(
+                normalized__startswith="volcan"
+            )
+        }
+        Kind = SearchSuggestion.Kind
+        self.assertEqual(
+            suggestions,
+            {
+                (Kind.NAME, "Volcano trip"): 1,
+                (Kind.LABEL, "Volcanic ash"): 2,
+                (Kind.DOMAIN, "volcano.org"): 2,
+                (Kind.USERNAME, "volcanologist"): 1,
+            },
+        )
+
+    def test_suggests_by_prefix_ordered_by_weight(self):
+        suggestions = self.get_suggestions("VOLC")
+        self.assertEqual(len(suggestions), 4)
+        self.assertEqual(
+            {suggestion["text"] for suggestion in suggestions[:2]},
+            {"Volcanic ash", "volcano.org"},
+        )
+        self.assertEqual(suggestions[0].keys(), {"text", "kind"})
+
+    def test_limits_suggestions(self):
+        with override_settings(SEARCH_SUGGESTIONS_LIMIT=1):
+            self.assertEqual(len(self.get_suggestions("volc")), 1)
+
+    def test_does_not_suggest_for_short_term(self):
+        with self.assertNumQueries(0):
+            self.assertEqual(self.get_suggestions("v"), [])
+
+    def test_queries_only_suggestions(self):
+        with self.assertNumQueries(1):
+            self.get_suggestions("volc")
+
+    def test_rejects_post(self):
+        response = self.client.post(reverse("entries:search_suggestions"), {"term": "volc"})
+        self.assertEqual(response.status_code, 405)
+
+    def test_rebuild_command_replaces_suggestions(self):
+        EntrySet.objects.update(name="Glacier")
+        out = StringIO()
+        call_command("rebuild_search_suggestions", stdout=out)
+        self.assertIn("search suggestions rebuilt", out.getvalue())
+        self.assertFalse(SearchSuggestion.objects.filter(text="Volcano trip").exists())
+        self.assertTrue(SearchSuggestion.objects.filter(text="Glacier").exists())
@@ -0,0 +1,192 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.test import TestCase
+
+from linkysets.replies.tests.bakery_recipes import reply_recipe
+from linkysets.users.models import User
+from linkysets.users.tests.bakery_recipes import user_recipe
+
+from ..models import Entry, EntrySet
+from .bakery_recipes import entry_recipe, entryset_recipe
+
+
+class EntrySetCountersTests(TestCase):
+    def setUp(self):
+        self.entryset = entryset_recipe.make()
+
+    def assertCounters(self, num_entries, num_replies):
+        self.entryset.refresh_from_db()
+        self.assertEqual(self.entryset.num_entries, num_entries)
+        self.assertEqual(self.entryset.num_replies, num_replies)
+
+    def test_counts_entries_on_create(self):
+        self.assertCounters(2, 0)
+
+    def test_counts_added_and_removed_entries(self):
+        entry = entry_recipe.make()
+        self.entryset.entries.add(entry)
+        self.assertCounters(3, 0)
+        self.entryset.entries.remove(entry)
+        self.assertCounters(2, 0)
+
+    def test_does_not_count_removed_entry_that_is_not_in_set(self):
+        self.entryset.entries.remove(entry_recipe.make())
+        self.assertCounters(2, 0)
+
+    def test_counts_cleared_entries(self):
+        self.entryset.entries.clear()
+        self.assertCounters(0, 0)
+
+    def test_counts_entries_added_from_entry_side(self):
+        entry = entry_recipe.make()
+        other_entryset = entryset_recipe.make()
+        entry.sets.add(self.entryset, other_entryset)
+        self.assertCounters(3, 0)
+        other_entryset.refresh_from_db()
+        self.assertEqual(other_entryset.num_entries, 3)
+
+    def test_counts_entries_cleared_from_entry_side(self):
+        entry = self.entryset.entries.first()
+        entry.sets.clear()
+        self.assertCounters(1, 0)
+
+    def test_counts_created_and_deleted_replies(self):
+        reply = reply_recipe.make(entryset=self.entryset, parent=None)
+        reply_recipe.make(entryset=self.entryset, parent=reply)
+        self.assertCounters(2, 2)
+        # Child reply is deleted by cascade
+        reply.delete()
+        self.assertCounters(2, 0)
+
+    def test_repair_command_recounts_counters(self):
+        reply_recipe.make(entryset=self.entryset, parent=None)
+        EntrySet.objects.update(num_entries=10, num_replies=10)
+        out = StringIO()
+        call_command("repair_counters", stdout=out)
+        self.assertIn("Counters of 1 entry sets repaired.", out.getvalue())
+        self.assertCounters(2, 1)
+
+    def test_repair_command_recounts_entries_sets(self):
+        Entry.objects.update(num_of_sets=10)
+        call_command("repair_counters", stdout=StringIO())
+        self.assertEqual(set(Entry.objects.values_list("num_of_sets", flat=True)), {1})
+
+    def test_lists_do_not_aggregate_counters(self):
+        query = str(EntrySet.objects.all().query)
+        self.assertNotIn("COUNT(", query)
+        self.assertNotIn("GROUP BY", query)
+
+
+class EntryNumOfSetsTests(TestCase):
+    def setUp(self):
+        self.entryset = entryset_recipe.make()
+        self.entry = self.entryset.entries.first()
+
+    def assertNumOfSets(self, num_of_sets):
+        self.entry.refresh_from_db()
+        self.assertEqual(self.entry.num_of_sets, num_of_sets)
+
+    def test_counts_sets_of_created_entries(self):
+        self.assertNumOfSets(1)
+
+    def test_counts_reposts(self):
+        other_entryset = entryset_recipe.make(entries=[])
+        other_entryset.entries.add(self.entry)
+        self.assertNumOfSets(2)
+        other_entryset.entries.remove(self.entry)
+        self.assertNumOfSets(1)
+
+    def test_counts_cleared_sets(self):
+        self.entryset.entries.clear()
+        self.assertNumOfSets(0)
+        self.entry.sets.add(self.entryset)
+        self.entry.sets.clear()
+        self.assertNumOfSets(0)
+
+    def test_counts_deleted_sets(self):
+        self.entryset.delete()
+        self.assertNumOfSets(0)
+
+    def test_entry_delete_checks_stored_counter(self):
+        self.entry.delete()
+        self.assertTrue(Entry.objects.filter(pk=self.entry.pk).exists())
+        self.entryset.entries.remove(self.entry)
+        self.entry.delete()
+        self.assertFalse(Entry.objects.filter(pk=self.entry.pk).exists())
+
+    def test_lists_most_reposted_entries(self):
+        for _ in range(2):
+            entryset_recipe.make(entries=[self.entry])
+        other_entry = self.entryset.entries.exclude(pk=self.entry.pk).get()
+        entryset_recipe.make(entries=[other_entry])
+        self.assertEqual(list(Entry.objects.most_reposted()), [self.entry, other_entry])
+
+    def test_prefetches_entries_without_subquery(self):
+        with self.assertNumQueries(2) as context:
+            list(EntrySet.objects.for_list().filter(pk=self.entryset.pk))
+        self.assertNotIn("COUNT(", context.captured_queries[1]["sql"])
+
+
+class UserStatsTests(TestCase):
+    def setUp(self):
+        self.author = user_recipe.make()
+        self.entryset = entryset_recipe.make(author=self.author)
+        self.entry = self.entryset.entries.first()
+        Entry.objects.filter(pk=self.entry.pk).update(origin=self.entryset)
+
+    def assertStats(self, num_sets, num_replies, num_reposts):
+        self.author.refresh_from_db()
+        self.assertEqual(
+            (self.author.num_sets, self.author.num_replies, self.author.num_reposts),
+            (num_sets, num_replies, num_reposts),
+        )
+
+    def test_counts_created_and_deleted_sets(self):
+        entryset = entryset_recipe.make(author=self.author)
+        self.assertStats(2, 0, 0)
+        entryset.delete()
+        self.assertStats(1, 0, 0)
+
+    def test_counts_created_and_deleted_replies(self):
+        reply = reply_recipe.make(entryset=self.entryset, author=self.author, parent=None)
+        self.assertStats(1, 1, 0)
+        reply.delete()
+        self.assertStats(1, 0, 0)
+
+    def test_counts_reposts_by_others(self):
+        repost = entryset_recipe.make(entries=[self.entry])
+        self.assertStats(1, 0, 1)
+        repost.entries.remove(self.entry)
+        self.assertStats(1, 0, 0)
+        repost.entries.add(self.entry)
+        repost.delete()
+        self.assertStats(1, 0, 0)
+
+    def test_skips_own_reposts(self):
+        entryset_recipe.make(author=self.author, entries=[self.entry])
+        self.assertStats(2, 0, 0)
+
+    def test_drops_reposts_of_deleted_origin(self):
+        entryset_recipe.make(entries=[self.entry])
+        self.entryset.delete()
+        self.assertStats(0, 0, 0)
+
+    def test_keeps_last_activity(self):
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.last_activity, self.entryset.created)
+        reply = reply_recipe.make(entryset=self.entryset, author=self.author, parent=None)
+        self.author.refresh_from_db()
+        self.assertEqual(self.author.last_activity, reply.created)
+
+    def test_repair_command_recounts_stats(self):
+        User.objects.update(num_sets=10, num_replies=10, num_reposts=10)
+        out = StringIO()
+        call_command("repair_counters", stdout=out)
+        self.assertIn("Stats of 1 users repaired.", out.getvalue())
+        self.assertStats(1, 0, 0)
+
+    def test_lists_top_authors(self):
+        other_author = user_recipe.make()
+        entryset_recipe.make(author=other_author, _quantity=2)
+        self.assertEqual(list(User.objects.top_authors()), [other_author, self.author])
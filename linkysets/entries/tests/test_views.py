@@ -1,15 +1,20 @@
 from unittest.mock import patch
 
 from django.contrib import messages
+from django.db import connection
 from django.shortcuts import reverse
-from django.test import TestCase
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
 from django.utils import translation
 from faker import Faker
 
+from linkysets.replies.tests.bakery_recipes import reply_recipe
 from linkysets.users.tests.bakery_recipes import user_recipe
 
-from .. import views
-from ..models import Entry, EntrySet
+from .. import rendering, views
+from ..models import ClassificationJob, Entry, EntrySet
+from ..ratings import get_ratings
+from ..search_cache import invalidate_search_results
 from .bakery_recipes import entry_recipe, entryset_recipe
 from .common import EntryFormsetDataMixin, head_response_factory
 
@@ -63,7 +68,7 @@ class SearchTests(TestCase):
 
     def test_gets_empty_queryset_if_invalid_form(self):
         response = self.client.get(reverse("entries:search"))
-        self.assertEqual(response.context["entryset_list"].count(), 0)
+        self.assertEqual(len(response.context["entryset_list"]), 0)
 
     def test_finds_entryset_by_name_slice(self):
         name = self.entryset.name
@@ -106,6 +111,62 @@ class SearchTests(TestCase):
         )
 
 
+@override_settings(ENTRY_SEARCH_MAX_RESULTS=2)
+class SearchPastCachedResultsTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entrysets = entryset_recipe.make(name="Volcano trip", _quantity=3)
+
+    def setUp(self):
+        invalidate_search_results()
+
+    def test_counts_cached_sets_as_lower_bound(self):
+        response = self.client.get(reverse("entries:search"), {"term": "volcano"})
+        self.assertContains(response, "Found 2+ sets")
+
+    def test_counts_all_sets_when_not_truncated(self):
+        with override_settings(ENTRY_SEARCH_MAX_RESULTS=10):
+            response = self.client.get(reverse("entries:search"), {"term": "volcano"})
+        self.assertContains(response, "Found 3 sets")
+
+    def test_pages_go_past_cached_results(self):
+        found_pks = []
+        params = {"term": "volcano"}
+        with patch.object(views.SearchView, "paginate_by", 1):
+            for _ in range(3):
+                response = self.client.get(reverse("entries:search"), params)
+                page = response.context["page_obj"]
+                found_pks.extend(entryset.pk for entryset in page)
+                params["cursor"] = page.next_cursor()
+
+        self.assertFalse(page.has_next())
+        self.assertEqual(sorted(found_pks), sorted(es.pk for es in self.entrysets))
+        self.assertContains(response, "Found 2+ sets")
+
+    def test_pages_go_back_into_cached_results(self):
+        params = {"term": "volcano"}
+        with patch.object(views.SearchView, "paginate_by", 1):
+            pages = []
+            for _ in range(3):
+                response = self.client.get(reverse("entries:search"), params)
+                pages.append(list(response.context["page_obj"]))
+                params["cursor"] = response.context["page_obj"].next_cursor()
+
+            params["cursor"] = response.context["page_obj"].previous_cursor()
+            response = self.client.get(reverse("entries:search"), params)
+        self.assertEqual(list(response.context["page_obj"]), pages[1])
+
+    def test_page_fetches_only_its_sets(self):
+        with patch.object(views.SearchView, "paginate_by", 1):
+            self.client.get(reverse("entries:search"), {"term": "volcano"})
+            with CaptureQueriesContext(connection) as queries:
+                self.client.get(reverse("entries:search"), {"term": "volcano"})
+        sets_sql = [q["sql"] for q in queries if 'FROM "entries_entryset"' in q["sql"]]
+        self.assertEqual(len(sets_sql), 1)
+        self.assertNotIn("CASE", sets_sql[0])
+        self.assertIn(f'"entries_entryset"."id" IN ({self.entrysets[-1].pk})', sets_sql[0])
+
+
 class CreateEntrySetTests(EntryFormsetDataMixin, TestCase):
     @classmethod
     def setUpTestData(cls):
@@ -172,6 +233,16 @@ class CreateEntrySetTests(EntryFormsetDataMixin, TestCase):
         with self.assertRaises(EntrySet.DoesNotExist):
             EntrySet.objects.get(name=self.entryset_name)
 
+    @override_settings(DEFERRED_CLASSIFICATION=True)
+    @patch("requests.Session.head")
+    def test_queues_entries_classification_if_deferred(self, head_mock):
+        self.client.post(reverse("entries:create"), self.valid_data)
+        entryset = EntrySet.objects.get(name=self.entryset_name)
+        entry = entryset.entries.get()
+        self.assertEqual(entry.type, Entry.EntryType.URL)
+        self.assertTrue(ClassificationJob.objects.filter(entry=entry).exists())
+        head_mock.assert_not_called()
+
     @patch("requests.Session.head")
     def test_creates_entryset_for_anonymous_user(self, head_mock):
         head_mock.side_effect = self.head_response
@@ -440,3 +511,100 @@ class RepostEntryTests(TestCase):
         self.client.post(reverse("entries:repost", kwargs={"pk": self.entry.pk}))
         entryset = EntrySet.objects.latest("id")
         self.assertEqual(entryset.get_author().pk, self.user.pk)
+
+
+class QueryProfilesTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = user_recipe.make()
+        cls.entrysets = entryset_recipe.make(author=cls.user, _quantity=3)
+        cls.entryset = cls.entrysets[0]
+
+    def setUp(self):
+        self.client.force_login(self.user)
+        # Sidebar ratings are cached between requests, every page looks them up in
+        # the shared cache with one query
+        get_ratings()
+
+    def assertNumQueriesForGet(self, num, url):
+        with self.assertNumQueries(num):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=10 ** 6)
+    def test_home_queries(self, estimate_mock):
+        # ratings, sets, entries, user
+        self.assertNumQueriesForGet(4, reverse("entries:home"))
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=10 ** 6)
+    def test_home_queries_with_rendered_entries(self, estimate_mock):
+        entries = [
+            entry_recipe.make(type=Entry.EntryType.IMAGE, url=fake.image_url()),
+            entry_recipe.make(type=Entry.EntryType.VIDEO, url=f"{fake.url()}clip.mp4"),
+        ]
+        entryset_recipe.make(author=self.user, entries=entries)
+        get_ratings()
+        # Starts a new interval, so the render stats aren't flushed during the requests
+        rendering.cache_stats.flush()
+        for cached in [False, True]:
+            with self.subTest(cached=cached):
+                # ratings, sets, entries, user
+                self.assertNumQueriesForGet(4, reverse("entries:home"))
+
+    @patch("linkysets.common.pagination.get_table_estimate", return_value=10 ** 6)
+    def test_home_next_page_queries(self, estimate_mock):
+        with patch.object(views.HomeView, "paginate_by", 1):
+            response = self.client.get(reverse("entries:home"))
+            cursor = response.context["page_obj"].next_cursor()
+            self.assertNumQueriesForGet(4, reverse("entries:home") + f"?cursor={cursor}")
+
+    def test_search_queries(self):
+        # generation and found ids lookups in the shared cache, found ids, 5 for the
+        # cache write, sets, entries, user, ratings
+        url = reverse("entries:search") + f"?term={self.user.username[:20]}"
+        self.assertNumQueriesForGet(12, url)
+
+    def test_search_queries_with_cached_results(self):
+        # generation and found ids lookups in the shared cache, sets, entries, user,
+        # ratings. Sets are counted by the cached ids.
+        url = reverse("entries:search") + f"?term={self.user.username[:20]}"
+        self.client.get(url)
+        self.assertNumQueriesForGet(6, url)
+
+    def test_home_shows_approximate_count(self):
+        with patch("linkysets.common.pagination.get_table_estimate", return_value=12345):
+            response = self.client.get(reverse("entries:home"))
+        self.assertContains(response, "Found about 12,345 sets")
+
+    def test_detail_queries(self):
+        # set, entries, user, ratings
+        url = reverse("entries:detail", kwargs={"pk": self.entryset.pk})
+        self.assertNumQueriesForGet(4, url)
+
+    def test_detail_queries_with_replies(self):
+        reply_recipe.make(entryset=self.entryset, parent=None)
+        url = reverse("entries:detail", kwargs={"pk": self.entryset.pk})
+        # set, entries, user, ratings, root replies, replies
+        self.assertNumQueriesForGet(6, url)
+        # Thread html is cached
+        self.assertNumQueriesForGet(4, url)
+
+    def test_delete_queries(self):
+        # set for the permission check, user, set, ratings
+        url = reverse("entries:delete", kwargs={"pk": self.entryset.pk})
+        self.assertNumQueriesForGet(4, url)
+
+    def test_list_profile_loads_only_used_columns(self):
+        sql = str(EntrySet.objects.for_list().query)
+        for column in ['"name"', '"created"', '"num_entries"', '"username"']:
+            with self.subTest(column=column):
+                self.assertIn(column, sql)
+        for column in ['"updated"', '"password"', '"email"']:
+            with self.subTest(column=column):
+                self.assertNotIn(column, sql)
+
+    def test_minimal_profile_loads_only_used_columns(self):
+        sql = str(EntrySet.objects.minimal().query)
+        self.assertNotIn('"num_entries"', sql)
+        self.assertNotIn('"password"', sql)
+        self.assertNotIn('"entries_entry"', sql)
@@ -7,6 +7,7 @@ app_name = "entries"
 urlpatterns = [
     path("", views.HomeView.as_view(), name="home"),
     path("search/", views.SearchView.as_view(), name="search"),
+    path("search/suggestions/", views.search_suggestions_view, name="search_suggestions"),
     path("detail/<str:pk>/", views.EntrySetDetailView.as_view(), name="detail"),
     path("create/", views.create_entryset_view, name="create"),
     path("edit/<str:pk>/", views.edit_entryset_view, name="edit"),
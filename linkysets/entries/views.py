@@ -2,48 +2,62 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict
+from typing import Any, Dict, Tuple
 
 from django.conf import settings
 from django.contrib import messages
 from django.contrib.auth.decorators import login_required
 from django.db import transaction
-from django.db.models import Q
-from django.http import Http404, HttpRequest, HttpResponse
+from django.http import Http404, HttpRequest, HttpResponse, JsonResponse
 from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse_lazy
 from django.utils.translation import ugettext_lazy as _
-from django.views.decorators.http import require_POST
+from django.views.decorators.http import require_GET, require_POST
 from django.views.generic import DeleteView, DetailView, ListView
 
+from linkysets.common.pagination import (
+    CursorPage,
+    CursorPaginator,
+    RankedPaginator,
+    RankedPksExhausted,
+)
 from linkysets.common.typing import SupportsStr
-from linkysets.common.views import ObjectPermissionRequiredMixin
-
+from linkysets.common.views import (
+    CursorPaginationMixin,
+    ObjectPermissionRequiredMixin,
+    get_cursor_page,
+    get_paginator_page,
+)
+
+from . import search_cache
 from .forms import EntryFormset, EntrySetForm, SearchForm
 from .managers import EntrySetQuerySet
-from .mixins import EntrySetPermissionMixin, PageTitleMixin
-from .models import Entry, EntrySet
+from .mixins import EntrySetPermissionMixin, PageTitleMixin, PrimeEntriesRenderMixin
+from .models import ClassificationJob, Entry, EntrySet, SearchSuggestion
+from .rendering import prime_render_cache
 from .utils import join_page_title
 
 logger = logging.getLogger(__name__)
 
 
-class HomeView(PageTitleMixin, ListView):
-    queryset = EntrySet.objects.all()
+class HomeView(CursorPaginationMixin, PrimeEntriesRenderMixin, PageTitleMixin, ListView):
+    queryset = EntrySet.objects.for_list()
     template_name = "entries/home.html"
-    ordering = "created"
+    cursor_ordering = ("created", "pk")
     paginate_by = 10
 
     def get_full_title(self) -> SupportsStr:
         return settings.PAGE_TITLE_EXTENSION
 
 
-class SearchView(PageTitleMixin, ListView):
+class SearchView(CursorPaginationMixin, PrimeEntriesRenderMixin, PageTitleMixin, ListView):
     template_name = "entries/search.html"
+    cursor_ordering = ("-rank", "-pk")
     paginate_by = 10
     page_title = _("Search")
 
     form: SearchForm
+    ranked_paginator: RankedPaginator
 
     def get(self, request: HttpRequest, *args, **kwargs) -> HttpResponse:
         self.form = SearchForm(request.GET or None, initial=request.GET)
@@ -52,22 +66,31 @@ class SearchView(PageTitleMixin, ListView):
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
         context["form"] = self.form
+        if context["page_obj"]:
+            context["entrysets_count"] = self.ranked_paginator.approximate_count
         return context
 
     def get_queryset(self) -> EntrySetQuerySet:
         if not self.form.is_valid():
             return EntrySet.objects.none()
-
-        term = self.form.cleaned_data.get("term")
-        qs = EntrySet.objects.all()
-        qs = qs.filter(
-            Q(name__unaccent__lower__trigram_similar=term)
-            | Q(author__username__icontains=term)
-            | Q(entries__label__unaccent__lower__trigram_similar=term)
-            | Q(entries__url__icontains=term)
+        return EntrySet.objects.for_list()
+
+    def paginate_queryset(
+        self, queryset: EntrySetQuerySet, page_size: int
+    ) -> Tuple[CursorPaginator, CursorPage, CursorPage, bool]:
+        term = self.form.cleaned_data["term"] if self.form.is_valid() else ""
+        ranked_pks = search_cache.get_ranked_pks(term) if term else []
+        self.ranked_paginator = RankedPaginator(
+            queryset, page_size, ranked_pks, search_cache.is_truncated(ranked_pks)
         )
-        qs = qs.order_by("created").distinct()
-        return qs
+        cursor = self.request.GET.get(self.cursor_kwarg)
+        try:
+            page = get_paginator_page(self.ranked_paginator, cursor)
+        except RankedPksExhausted:
+            # Pages past the cached best results are searched by the backend
+            queryset = queryset.search(term, complete=True)
+            page = get_cursor_page(queryset, page_size, cursor, self.cursor_ordering)
+        return page.paginator, page, page, page.has_other_pages()
 
 
 def create_entryset_view(request: HttpRequest) -> HttpResponse:
@@ -82,6 +105,7 @@ def create_entryset_view(request: HttpRequest) -> HttpResponse:
                 formset.instance = entryset
                 saved_entries = formset.save()
                 entryset.entries.set(saved_entries)
+                ClassificationJob.objects.enqueue(formset.pending_entries)
 
             logger.debug(
                 'Entryset has been created: "%s". Entries: %s',
@@ -125,6 +149,7 @@ def edit_entryset_view(request: HttpRequest, pk: Any) -> HttpResponse:
             for entry in saved_entries:
                 entry.save()
             entryset.entries.add(*saved_entries)
+            ClassificationJob.objects.enqueue(formset.pending_entries)
 
             logger.debug(
                 "Entry formset saved entries: %s. Deleted entries: %s",
@@ -149,7 +174,7 @@ def edit_entryset_view(request: HttpRequest, pk: Any) -> HttpResponse:
 
 
 class EntrySetDeleteView(PageTitleMixin, ObjectPermissionRequiredMixin, DeleteView):
-    model = EntrySet
+    queryset = EntrySet.objects.minimal()
     template_name = "entries/entryset_delete.html"
     success_url = reverse_lazy("entries:home")
     permission_required = ["entries.delete_entryset"]
@@ -165,10 +190,15 @@ class EntrySetDeleteView(PageTitleMixin, ObjectPermissionRequiredMixin, DeleteVi
 
 
 class EntrySetDetailView(EntrySetPermissionMixin, PageTitleMixin, DetailView):
-    queryset = EntrySet.objects.prefetch_replies()
+    queryset = EntrySet.objects.for_detail()
     template_name = "entries/entryset_detail.html"
     title_object_name = "object"
 
+    def get_context_data(self, **kwargs) -> Dict[str, Any]:
+        context = super().get_context_data(**kwargs)
+        prime_render_cache(self.object.entries.all())
+        return context
+
 
 @require_POST
 @login_required
@@ -182,3 +212,13 @@ def repost_entry_view(request: HttpRequest, pk: Any) -> HttpResponse:
         raise Http404(f"No {Entry._meta.object_name} matches the given query.")
 
     return redirect("entries:edit", pk=entryset.pk)
+
+
+@require_GET
+def search_suggestions_view(request: HttpRequest) -> JsonResponse:
+    term = request.GET.get("term", "").strip()
+    if len(term) < settings.SEARCH_SUGGESTIONS_MIN_LENGTH:
+        return JsonResponse({"suggestions": []})
+
+    qs = SearchSuggestion.objects.for_prefix(term, settings.SEARCH_SUGGESTIONS_LIMIT)
+    return JsonResponse({"suggestions": list(qs.values("text", "kind"))})
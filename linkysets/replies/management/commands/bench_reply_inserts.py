@@ -0,0 +1,90 @@
+import random
+import threading
+import time
+from typing import List
+
+from django.core.management.base import BaseCommand, CommandError
+from django.db import connection
+from django.db.models import F
+
+from linkysets.entries.models import EntrySet
+from linkysets.replies.models import Reply
+
+
+class Command(BaseCommand):
+    help = (
+        "Post replies to one thread from concurrent writers and check its tree. "
+        "The thread is deleted afterwards."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--writers", type=int, default=8, help="Number of concurrent writers."
+        )
+        parser.add_argument(
+            "--replies", type=int, default=50, help="Number of replies per writer."
+        )
+
+    def handle(self, *args, **options):
+        entryset = EntrySet.objects.create(name="Reply inserts benchmark")
+        try:
+            root = Reply.objects.create(entryset=entryset, text="Root")
+            errors: List[BaseException] = []
+            writers = [
+                threading.Thread(
+                    target=self.post_replies,
+                    args=(root, options["replies"], random.Random(seed), errors),
+                )
+                for seed in range(options["writers"])
+            ]
+
+            start = time.perf_counter()
+            for writer in writers:
+                writer.start()
+            for writer in writers:
+                writer.join()
+            elapsed = time.perf_counter() - start
+
+            if errors:
+                raise CommandError(f"{len(errors)} writers failed: {errors[0]!r}")
+
+            num_replies = options["writers"] * options["replies"]
+            self.stdout.write(
+                f"{num_replies} replies by {options['writers']} writers "
+                f"in {elapsed:.2f}s ({num_replies / elapsed:.0f} replies/s)"
+            )
+            if not is_valid_tree(root.tree_id, num_replies + 1):
+                raise CommandError("Thread tree is corrupted.")
+            self.stdout.write(self.style.SUCCESS("Thread tree is valid."))
+        finally:
+            EntrySet.objects.filter(pk=entryset.pk).delete()
+
+    def post_replies(self, root, num_replies, rng, errors):
+        parent_pks = [root.pk]
+        try:
+            for i in range(num_replies):
+                reply = Reply.objects.create(
+                    entryset_id=root.entryset_id,
+                    parent_id=rng.choice(parent_pks),
+                    text=f"Reply {i}",
+                )
+                parent_pks.append(reply.pk)
+        except BaseException as e:
+            errors.append(e)
+        finally:
+            connection.close()
+
+
+def is_valid_tree(tree_id: int, size: int) -> bool:
+    replies_qs = Reply.objects.filter(tree_id=tree_id)
+    bounds = sorted(
+        bound for bounds in replies_qs.values_list("lft", "rght") for bound in bounds
+    )
+    if bounds != list(range(1, 2 * size + 1)):
+        return False
+
+    # Every reply is nested right inside its parent
+    misplaced_qs = replies_qs.filter(parent__isnull=False).exclude(
+        lft__gt=F("parent__lft"), rght__lt=F("parent__rght"), level=F("parent__level") + 1
+    )
+    return not misplaced_qs.exists()
@@ -0,0 +1,157 @@
+# flake8: noqa: E501
+import time
+from typing import List
+
+from django.core.management.base import BaseCommand
+from django.template import engines
+from django.template.loader import get_template
+from django.utils import timezone
+
+from linkysets.replies.models import Reply
+from linkysets.replies.threads import ReplyThread
+
+# The thread markup as it was rendered by nested recursetree calls
+RECURSETREE_TEMPLATE = """{% load i18n static mptt_tags %}
+{% recursetree thread.replies %}
+  <div id="reply-{{ node.pk }}" class="media my-3">
+    <img
+      src="{% static 'img/user_light.svg' %}"
+      width="56"
+      height="56"
+      alt="user image"
+      class="rounded mr-2 align-self-start"
+    >
+
+    <div class="media-body">
+      <div class="d-flex align-items-center">
+        {% with node.get_author as author %}
+          {% if author.is_authenticated %}
+            <a
+              href="{{ author.get_absolute_url }}"
+              class="text-decoration-none mr-2"
+            >
+              {{ author.username }}
+            </a>
+          {% else %}
+            <span class="mr-2">
+              {{ author.username }}
+            </span>
+          {% endif %}
+        {% endwith %}
+
+        <small>
+          {{ node.created|date:"SHORT_DATETIME_FORMAT" }}
+        </small>
+      </div>
+
+      <p class="font-weight-bold my-1">{{ node.text }}</p>
+
+      <div class="d-flex">
+        <a
+          href="{% url 'replies:post' %}?entryset={{ node.entryset_id }}&reply={{ node.pk }}"
+          class="text-decoration-none"
+        >
+          {% trans "Reply" %}
+        </a>
+      </div>
+
+      {{ children }}
+
+      {% if node.level == thread.max_level and not node.is_leaf_node %}
+        <div class="replies-more my-2">
+          <a
+            href="{% url 'replies:subtree' pk=node.pk %}"
+            class="replies-more-link text-decoration-none"
+          >
+            {% trans "Continue thread" %}
+          </a>
+        </div>
+      {% endif %}
+    </div>
+  </div>
+{% endrecursetree %}
+"""
+
+
+class Command(BaseCommand):
+    help = "Compare reply thread render times of recursetree and the linear renderer."
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--sizes",
+            type=int,
+            nargs="+",
+            default=[1000, 10000, 50000],
+            help="Numbers of replies of the synthetic threads.",
+        )
+        parser.add_argument(
+            "--children", type=int, default=3, help="Number of children of every reply."
+        )
+        parser.add_argument(
+            "--depth", type=int, default=5, help="Number of levels of every tree."
+        )
+
+    def handle(self, *args, **options):
+        recursetree_template = engines["django"].from_string(RECURSETREE_TEMPLATE)
+        linear_template = get_template("replies/includes/reply_thread.html")
+
+        for size in options["sizes"]:
+            replies = make_replies(size, options["children"], options["depth"])
+            thread = ReplyThread(1, replies, max_level=options["depth"] - 1)
+            recursetree = self.measure(recursetree_template, thread)
+            linear = self.measure(linear_template, thread)
+            speedup = self.style.SUCCESS(f"speedup: {recursetree / linear:.1f}x")
+            self.stdout.write(
+                f"{size} replies: recursetree {recursetree * 1e3:.0f} ms, "
+                f"linear {linear * 1e3:.0f} ms, {speedup}"
+            )
+
+    def measure(self, template, thread):
+        # Cached children are set by recursetree, the replies are rendered anew
+        for reply in thread.replies:
+            reply.__dict__.pop("_cached_children", None)
+        start = time.perf_counter()
+        template.render({"thread": thread})
+        return time.perf_counter() - start
+
+
+def make_replies(size: int, children: int, depth: int) -> List[Reply]:
+    """
+    Unsaved replies of full trees with the given number of children per reply,
+    in depth-first order with their nested sets fields filled.
+    """
+    replies: List[Reply] = []
+    created = timezone.now()
+    tree_id = 0
+    while len(replies) < size:
+        tree_id += 1
+        add_subtree(replies, size, children, depth, tree_id, created)
+    return replies
+
+
+def add_subtree(replies, size, children, depth, tree_id, created, parent=None, lft=1):
+    pk = len(replies) + 1
+    level = parent.level + 1 if parent is not None else 0
+    reply = Reply(
+        pk=pk,
+        entryset_id=1,
+        parent=parent,
+        text=f"Reply {pk}",
+        created=created,
+        tree_id=tree_id,
+        lft=lft,
+        level=level,
+    )
+    replies.append(reply)
+
+    rght = lft + 1
+    if level + 1 < depth:
+        for _ in range(children):
+            if len(replies) == size:
+                break
+            rght = add_subtree(
+                replies, size, children, depth, tree_id, created, reply, rght
+            )
+            rght += 1
+    reply.rght = rght
+    return rght
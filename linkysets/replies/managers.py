@@ -0,0 +1,23 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Union
+
+from django.db.models import Subquery
+from mptt.querysets import TreeQuerySet
+
+if TYPE_CHECKING:
+    from .models import Reply  # noqa: F401
+
+
+class ReplyQuerySet(TreeQuerySet):
+    def thread_roots(self, entryset_pk: int) -> ReplyQuerySet:
+        # Every root reply has a tree of its own, ordered by creation
+        return self.filter(entryset=entryset_pk, level=0).order_by("tree_id")
+
+    def for_thread(self) -> ReplyQuerySet:
+        return self.select_related("author").order_by("tree_id", "lft")
+
+    def lock_tree(self, tree_id: Union[int, Subquery]) -> None:
+        # Inserts and deletes of a tree are serialized by its root row lock
+        roots_qs = self.select_for_update().filter(tree_id=tree_id, level=0).order_by()
+        list(roots_qs.only("pk"))
@@ -0,0 +1,17 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('replies', '0002_reply_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='reply',
+            index=models.Index(fields=['entryset', 'level', 'tree_id'], name='reply_thread_roots_idx'),
+        ),
+    ]
@@ -1,9 +1,16 @@
-from django.db import models
+from django.db import connection, models, transaction
+from django.db.models import Subquery
 from django.utils.translation import ugettext_lazy as _
+from mptt.managers import TreeManager
 from mptt.models import MPTTModel, TreeForeignKey
 
 from linkysets.common.models import AuthoredModel, TimestampedModel
 
+from .managers import ReplyQuerySet
+
+# Postgres advisory lock key serializing the tree ids hand out to new root replies
+NEW_ROOT_LOCK_KEY = 0x5265706C
+
 
 class Reply(TimestampedModel, AuthoredModel, MPTTModel):
     entryset = models.ForeignKey(
@@ -24,12 +31,43 @@ class Reply(TimestampedModel, AuthoredModel, MPTTModel):
     )
     text = models.CharField(_("text"), max_length=200, help_text=_("Reply text."))
 
+    objects = TreeManager.from_queryset(ReplyQuerySet)()
+
     class Meta:
         verbose_name = _("reply")
         verbose_name_plural = _("replies")
+        indexes = [
+            models.Index(
+                fields=["author", "created", "id"], name="reply_author_created_idx"
+            ),
+            # Threads are loaded by pages of root replies
+            models.Index(
+                fields=["entryset", "level", "tree_id"], name="reply_thread_roots_idx"
+            ),
+        ]
 
-    class MPTTMeta:
-        order_insertion_by = ["created"]
+    # No order_insertion_by: replies are created in order, so the default last child
+    # and last root insertion keeps them ordered without looking for their siblings.
 
     def __str__(self) -> str:
         return self.text
+
+    def save(self, *args, **kwargs):
+        if not self._state.adding:
+            return super().save(*args, **kwargs)
+
+        # Nested set fields are computed from the current tree, concurrent inserts
+        # into the same tree would get the same positions without the lock.
+        with transaction.atomic():
+            if self.parent_id is None:
+                with connection.cursor() as cursor:
+                    cursor.execute("SELECT pg_advisory_xact_lock(%s)", [NEW_ROOT_LOCK_KEY])
+            else:
+                tree_id_qs = Reply.objects.filter(pk=self.parent_id).values("tree_id")
+                Reply.objects.lock_tree(Subquery(tree_id_qs))
+            super().save(*args, **kwargs)
+
+    def delete(self, *args, **kwargs):
+        with transaction.atomic():
+            Reply.objects.lock_tree(self.tree_id)
+            return super().delete(*args, **kwargs)
@@ -0,0 +1,38 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, Iterable, List, Tuple
+
+from django import template
+from django.utils.safestring import SafeString
+
+from linkysets.replies.threads import render_thread
+
+if TYPE_CHECKING:
+    from linkysets.entries.models import EntrySet
+    from linkysets.replies.models import Reply
+
+register = template.Library()
+
+
+@register.filter
+def reply_tree(replies: Iterable[Reply]) -> List[Tuple[Reply, List[Reply]]]:
+    """
+    Pair every reply of the depth-first ordered list with the replies to close
+    right after it, deepest first, so a tree is rendered in one loop.
+    """
+    tree: List[Tuple[Reply, List[Reply]]] = []
+    open_replies: List[Reply] = []
+    for reply in replies:
+        while open_replies and open_replies[-1].level >= reply.level:
+            tree[-1][1].append(open_replies.pop())
+        tree.append((reply, []))
+        open_replies.append(reply)
+
+    if tree:
+        tree[-1][1].extend(reversed(open_replies))
+    return tree
+
+
+@register.simple_tag
+def reply_thread(entryset: EntrySet) -> SafeString:
+    return render_thread(entryset)
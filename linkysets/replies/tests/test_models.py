@@ -0,0 +1,54 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.db.models import Max
+from django.test import TestCase, TransactionTestCase
+
+from linkysets.entries.tests.bakery_recipes import entryset_recipe
+
+from ..management.commands.bench_reply_inserts import is_valid_tree
+from ..models import Reply
+from .bakery_recipes import reply_recipe
+
+
+class ReplyInsertionTests(TestCase):
+    def setUp(self):
+        self.entryset = entryset_recipe.make()
+        self.root = reply_recipe.make(entryset=self.entryset, parent=None)
+
+    def make_reply(self, parent):
+        return reply_recipe.make(entryset=self.entryset, parent=parent)
+
+    def test_appends_new_root_tree(self):
+        max_tree_id = Reply.objects.aggregate(Max("tree_id"))["tree_id__max"]
+        root = self.make_reply(None)
+        self.assertEqual((root.tree_id, root.lft, root.rght), (max_tree_id + 1, 1, 2))
+
+    def test_appends_children_in_creation_order(self):
+        first = self.make_reply(self.root)
+        second = self.make_reply(self.root)
+        self.make_reply(first)
+        self.assertEqual(list(self.root.get_children()), [first, second])
+        self.assertTrue(is_valid_tree(self.root.tree_id, 4))
+
+    def test_keeps_tree_valid_after_delete(self):
+        child = self.make_reply(self.root)
+        self.make_reply(child)
+        self.make_reply(self.root)
+        Reply.objects.get(pk=child.pk).delete()
+        self.assertTrue(is_valid_tree(self.root.tree_id, 2))
+
+    def test_locks_tree_root_on_insert(self):
+        # savepoint, tree lock, parent, space for the reply, reply, set counters, release
+        with self.assertNumQueries(7) as context:
+            self.make_reply(self.root)
+        self.assertIn("FOR UPDATE", context.captured_queries[1]["sql"])
+
+
+class ReplyInsertsBenchmarkTests(TransactionTestCase):
+    def test_concurrent_writers_keep_tree_valid(self):
+        out = StringIO()
+        call_command("bench_reply_inserts", "--writers", "3", "--replies", "5", stdout=out)
+        self.assertIn("15 replies by 3 writers", out.getvalue())
+        self.assertIn("Thread tree is valid.", out.getvalue())
+        self.assertFalse(Reply.objects.exists())
@@ -0,0 +1,48 @@
+from io import StringIO
+
+from django.core.management import call_command
+from django.template import engines
+from django.template.loader import render_to_string
+from django.test import SimpleTestCase
+
+from ..management.commands.bench_reply_tree import RECURSETREE_TEMPLATE, make_replies
+from ..templatetags.replies_tags import reply_tree
+from ..threads import ReplyThread
+
+
+class ReplyTreeFilterTests(SimpleTestCase):
+    def setUp(self):
+        # A full tree of three levels with two children per reply and a part of one more
+        self.replies = make_replies(10, children=2, depth=3)
+
+    def get_closed_pks(self):
+        return {
+            reply.pk: [closed.pk for closed in closed_replies]
+            for reply, closed_replies in reply_tree(self.replies)
+        }
+
+    def test_closes_replies_by_levels(self):
+        closed_pks = self.get_closed_pks()
+        self.assertEqual(closed_pks[3], [3])
+        self.assertEqual(closed_pks[4], [4, 2])
+        self.assertEqual(closed_pks[7], [7, 5, 1])
+        self.assertEqual(closed_pks[10], [10, 9, 8])
+        self.assertEqual(closed_pks[1], [])
+
+    def test_handles_empty_list(self):
+        self.assertEqual(reply_tree([]), [])
+
+    def test_renders_same_markup_as_recursetree(self):
+        thread = ReplyThread(1, self.replies, max_level=1)
+        linear_html = render_to_string(
+            "replies/includes/reply_thread.html", {"thread": thread}
+        )
+        recursetree_html = (
+            engines["django"].from_string(RECURSETREE_TEMPLATE).render({"thread": thread})
+        )
+        self.assertEqual(linear_html.split(), recursetree_html.split())
+
+    def test_benchmark_command_reports_render_times(self):
+        out = StringIO()
+        call_command("bench_reply_tree", "--sizes", "20", stdout=out)
+        self.assertIn("20 replies: recursetree", out.getvalue())
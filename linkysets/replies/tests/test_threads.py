@@ -0,0 +1,137 @@
+from django.shortcuts import reverse
+from django.test import TestCase, override_settings
+from django.utils import translation
+
+from linkysets.entries.models import EntrySet
+from linkysets.entries.tests.bakery_recipes import entryset_recipe
+from linkysets.users.tests.bakery_recipes import user_recipe
+
+from ..models import Reply
+from ..threads import get_cache, get_subtree, get_thread, make_cache_key, render_thread
+from .bakery_recipes import reply_recipe
+
+
+@override_settings(REPLY_THREAD_ROOTS=2, REPLY_THREAD_DEPTH=2)
+class ReplyThreadTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entryset = entryset_recipe.make()
+        cls.roots = [
+            reply_recipe.make(entryset=cls.entryset, parent=None) for _ in range(3)
+        ]
+        cls.chain = []
+        parent = cls.roots[0]
+        for _ in range(4):
+            parent = reply_recipe.make(entryset=cls.entryset, parent=parent)
+            cls.chain.append(parent)
+        cls.other_root = reply_recipe.make(parent=None)
+
+    def test_loads_first_roots_down_to_depth(self):
+        thread = get_thread(self.entryset.pk)
+        self.assertEqual(thread.replies, [self.roots[0], self.chain[0], self.roots[1]])
+        self.assertEqual(thread.max_level, 1)
+        self.assertEqual(thread.next_after, self.roots[1].tree_id)
+
+    def test_loads_roots_after_tree_id(self):
+        thread = get_thread(self.entryset.pk, after=self.roots[1].tree_id)
+        self.assertEqual(thread.replies, [self.roots[2]])
+        self.assertIsNone(thread.next_after)
+
+    def test_loads_thread_with_two_queries(self):
+        with self.assertNumQueries(2):
+            get_thread(self.entryset.pk)
+
+    def test_loads_subtree_down_to_depth(self):
+        thread = get_subtree(self.chain[0])
+        self.assertEqual(thread.replies, self.chain[1:3])
+        self.assertEqual(thread.max_level, 3)
+
+    def test_detail_page_links_to_rest_of_thread(self):
+        response = self.client.get(
+            reverse("entries:detail", kwargs={"pk": self.entryset.pk})
+        )
+        self.assertContains(response, f'id="reply-{self.chain[0].pk}"')
+        self.assertNotContains(response, f'id="reply-{self.chain[1].pk}"')
+        self.assertNotContains(response, f'id="reply-{self.roots[2].pk}"')
+        subtree_url = reverse("replies:subtree", kwargs={"pk": self.chain[0].pk})
+        self.assertContains(response, subtree_url)
+        thread_url = reverse("replies:thread", kwargs={"entryset_pk": self.entryset.pk})
+        self.assertContains(response, f"{thread_url}?after={self.roots[1].tree_id}")
+
+    def test_thread_view_renders_next_roots(self):
+        response = self.client.get(
+            reverse("replies:thread", kwargs={"entryset_pk": self.entryset.pk}),
+            {"after": self.roots[1].tree_id},
+        )
+        self.assertContains(response, f'id="reply-{self.roots[2].pk}"')
+        self.assertNotContains(response, f'id="reply-{self.roots[0].pk}"')
+        self.assertTemplateNotUsed(response, "base.html")
+
+    def test_thread_view_returns_not_found_for_invalid_after(self):
+        response = self.client.get(
+            reverse("replies:thread", kwargs={"entryset_pk": self.entryset.pk}),
+            {"after": "invalid"},
+        )
+        self.assertEqual(response.status_code, 404)
+
+    def test_subtree_view_renders_descendants(self):
+        response = self.client.get(
+            reverse("replies:subtree", kwargs={"pk": self.chain[0].pk})
+        )
+        self.assertNotContains(response, f'id="reply-{self.chain[0].pk}"')
+        self.assertContains(response, f'id="reply-{self.chain[1].pk}"')
+        self.assertContains(response, f'id="reply-{self.chain[2].pk}"')
+        self.assertNotContains(response, f'id="reply-{self.chain[3].pk}"')
+        self.assertContains(
+            response, reverse("replies:subtree", kwargs={"pk": self.chain[2].pk})
+        )
+
+    def test_subtree_view_returns_not_found_for_unknown_reply(self):
+        response = self.client.get(reverse("replies:subtree", kwargs={"pk": 0}))
+        self.assertEqual(response.status_code, 404)
+
+
+class ReplyThreadCacheTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.entryset = entryset_recipe.make()
+        cls.reply = reply_recipe.make(entryset=cls.entryset, parent=None, text="Lava")
+
+    def setUp(self):
+        # Versions of the set are rolled back with the tests, unlike the cache
+        get_cache().clear()
+
+    def render(self):
+        entryset = EntrySet.objects.for_detail().get(pk=self.entryset.pk)
+        return render_thread(entryset)
+
+    def test_caches_thread_html(self):
+        html = self.render()
+        entryset = EntrySet.objects.for_detail().get(pk=self.entryset.pk)
+        with self.assertNumQueries(0):
+            self.assertEqual(render_thread(entryset), html)
+
+    def test_renders_new_reply(self):
+        self.render()
+        reply_recipe.make(entryset=self.entryset, parent=self.reply, text="Ash")
+        self.assertIn("Ash", self.render())
+
+    def test_drops_deleted_reply(self):
+        self.render()
+        Reply.objects.get(pk=self.reply.pk).delete()
+        self.assertNotIn("Lava", self.render())
+
+    def test_renders_renamed_author(self):
+        author = user_recipe.make(username="geologist")
+        reply_recipe.make(entryset=self.entryset, parent=None, author=author)
+        self.render()
+        author.username = "volcanologist"
+        author.save()
+        self.assertIn("volcanologist", self.render())
+
+    def test_caches_thread_per_language(self):
+        entryset = EntrySet.objects.for_detail().get(pk=self.entryset.pk)
+        with translation.override("en"):
+            en_key = make_cache_key(entryset)
+        with translation.override("ru"):
+            self.assertNotEqual(make_cache_key(entryset), en_key)
@@ -0,0 +1,82 @@
+from __future__ import annotations
+
+from typing import TYPE_CHECKING, List, NamedTuple, Optional
+
+from django.apps import apps
+from django.conf import settings
+from django.core.cache import BaseCache, caches
+from django.template.loader import render_to_string
+from django.utils.safestring import SafeString, mark_safe
+from django.utils.translation import get_language
+
+if TYPE_CHECKING:
+    from linkysets.entries.models import EntrySet
+
+    from .models import Reply
+
+
+class ReplyThread(NamedTuple):
+    entryset_pk: int
+    # Depth-first ordered, as recursetree expects them
+    replies: List[Reply]
+    # Replies at this level can have children that aren't loaded yet
+    max_level: int
+    # Tree id to load the next roots after, if there are any
+    next_after: Optional[int] = None
+
+
+def get_thread(entryset_pk: int, after: Optional[int] = None) -> ReplyThread:
+    """
+    First REPLY_THREAD_ROOTS root replies of the entry set after the given tree id,
+    with their descendants down to REPLY_THREAD_DEPTH levels.
+    """
+    Reply = apps.get_model("replies", "Reply")
+    num_roots = settings.REPLY_THREAD_ROOTS
+    roots_qs = Reply.objects.thread_roots(entryset_pk)
+    if after is not None:
+        roots_qs = roots_qs.filter(tree_id__gt=after)
+    tree_ids = list(roots_qs.values_list("tree_id", flat=True)[: num_roots + 1])
+    next_after = tree_ids[num_roots - 1] if len(tree_ids) > num_roots else None
+    tree_ids = tree_ids[:num_roots]
+
+    max_level = settings.REPLY_THREAD_DEPTH - 1
+    replies = []
+    if tree_ids:
+        replies_qs = Reply.objects.filter(tree_id__in=tree_ids, level__lte=max_level)
+        replies = list(replies_qs.for_thread())
+    return ReplyThread(entryset_pk, replies, max_level, next_after)
+
+
+def get_subtree(reply: Reply) -> ReplyThread:
+    """
+    Descendants of the reply down to REPLY_THREAD_DEPTH levels below it.
+    """
+    Reply = apps.get_model("replies", "Reply")
+    max_level = reply.level + settings.REPLY_THREAD_DEPTH
+    replies_qs = Reply.objects.filter(
+        tree_id=reply.tree_id, lft__gt=reply.lft, rght__lt=reply.rght, level__lte=max_level
+    )
+    return ReplyThread(reply.entryset_id, list(replies_qs.for_thread()), max_level)
+
+
+def get_cache() -> BaseCache:
+    return caches[settings.REPLY_THREAD_CACHE]
+
+
+def make_cache_key(entryset: EntrySet) -> str:
+    # Any new or deleted reply of the set gets a new version
+    return f"reply-thread:{entryset.pk}:{entryset.replies_version}:{get_language()}"
+
+
+def render_thread(entryset: EntrySet) -> SafeString:
+    """
+    First page html of the entry set replies thread, cached until the set
+    replies change. It has nothing specific to the current user.
+    """
+    key = make_cache_key(entryset)
+    html = get_cache().get(key)
+    if html is None:
+        context = {"thread": get_thread(entryset.pk)}
+        html = render_to_string("replies/includes/reply_thread.html", context)
+        get_cache().set(key, html, timeout=settings.REPLY_THREAD_CACHE_TTL)
+    return mark_safe(html)
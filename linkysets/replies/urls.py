@@ -6,4 +6,6 @@ app_name = "replies"
 
 urlpatterns = [
     path("post/", views.PostReplyView.as_view(), name="post"),
+    path("thread/<int:entryset_pk>/", views.thread_view, name="thread"),
+    path("<int:pk>/subtree/", views.subtree_view, name="subtree"),
 ]
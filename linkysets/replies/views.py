@@ -1,6 +1,9 @@
 from typing import Any, Dict, Optional, cast
 
+from django.http import Http404, HttpRequest, HttpResponse
+from django.shortcuts import get_object_or_404, render
 from django.utils.translation import ugettext_lazy as _
+from django.views.decorators.http import require_GET
 from django.views.generic import CreateView
 
 from linkysets.common.views import QsObjectMeta, QuerystringObjectsMixin
@@ -9,6 +12,7 @@ from linkysets.entries.models import EntrySet
 
 from .forms import ReplyForm
 from .models import Reply
+from .threads import get_subtree, get_thread
 
 
 class PostReplyView(PageTitleMixin, QuerystringObjectsMixin, CreateView):
@@ -60,3 +64,23 @@ class PostReplyView(PageTitleMixin, QuerystringObjectsMixin, CreateView):
         if reply is None:
             return reply
         return cast(Reply, reply[0])
+
+
+@require_GET
+def thread_view(request: HttpRequest, entryset_pk: int) -> HttpResponse:
+    try:
+        after = int(request.GET["after"]) if "after" in request.GET else None
+    except ValueError:
+        raise Http404('Invalid "after" parameter.')
+
+    context = {"thread": get_thread(entryset_pk, after)}
+    return render(request, "replies/includes/reply_thread.html", context)
+
+
+@require_GET
+def subtree_view(request: HttpRequest, pk: int) -> HttpResponse:
+    reply = get_object_or_404(
+        Reply.objects.only("entryset", "tree_id", "lft", "rght", "level"), pk=pk
+    )
+    context = {"thread": get_subtree(reply)}
+    return render(request, "replies/includes/reply_thread.html", context)
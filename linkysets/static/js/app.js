@@ -14,4 +14,41 @@ $(function ($) {
       .find(".card .collapse")
       .collapse("hide");
   });
+
+  var suggestionsTimeout = null;
+
+  $(".search-input").on("input", function (ev) {
+    var input = ev.currentTarget;
+    var datalist = document.getElementById(input.getAttribute("list"));
+    var url = new URL(input.dataset.suggestionsUrl, window.location.origin);
+    url.searchParams.set("term", input.value);
+
+    clearTimeout(suggestionsTimeout);
+    suggestionsTimeout = setTimeout(function () {
+      fetch(url)
+        .then(function (response) {
+          return response.json();
+        })
+        .then(function (data) {
+          $(datalist).empty();
+          data.suggestions.forEach(function (suggestion) {
+            $("<option>").val(suggestion.text).appendTo(datalist);
+          });
+        })
+        .catch(function () {});
+    }, 150);
+  });
+
+  $(document).on("click", ".replies-more-link", function (ev) {
+    ev.preventDefault();
+    var more = $(ev.currentTarget).closest(".replies-more");
+    fetch(ev.currentTarget.href)
+      .then(function (response) {
+        return response.text();
+      })
+      .then(function (html) {
+        more.replaceWith(html);
+      })
+      .catch(function () {});
+  });
 });
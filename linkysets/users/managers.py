@@ -2,7 +2,9 @@ from __future__ import annotations
 
 from typing import TYPE_CHECKING
 
-from django.db.models import Count, QuerySet
+from django.apps import apps
+from django.db.models import Count, F, OuterRef, QuerySet, Subquery
+from django.db.models.functions import Coalesce, Greatest
 
 if TYPE_CHECKING:
     from .models import User
@@ -13,8 +15,32 @@ else:
 
 
 class UserQuerySet(BaseUserQuerySet):
-    def num_entrysets(self) -> UserQuerySet:
-        return self.annotate(num_sets=Count("entryset", distinct=True))  # type: ignore
+    def recount_stats(self) -> int:
+        EntrySet = apps.get_model("entries", "EntrySet")
+        Reply = apps.get_model("replies", "Reply")
+        num_sets_qs = EntrySet.objects.filter(author=OuterRef("pk")).order_by()
+        num_sets_qs = num_sets_qs.values("author").annotate(count=Count("*"))
+        num_replies_qs = Reply.objects.filter(author=OuterRef("pk")).order_by()
+        num_replies_qs = num_replies_qs.values("author").annotate(count=Count("*"))
+        # Entries first posted in the user's sets, added to sets of other users
+        reposts_qs = EntrySet.entries.through.objects.filter(
+            entry__origin__author=OuterRef("pk")
+        ).exclude(entryset=F("entry__origin"))
+        reposts_qs = reposts_qs.exclude(entryset__author=OuterRef("pk"))
+        reposts_qs = reposts_qs.order_by().values("entry__origin__author")
+        reposts_qs = reposts_qs.annotate(count=Count("*"))
+        last_set_qs = EntrySet.objects.filter(author=OuterRef("pk")).order_by("-created")
+        last_reply_qs = Reply.objects.filter(author=OuterRef("pk")).order_by("-created")
+        return self.update(
+            num_sets=Coalesce(Subquery(num_sets_qs.values("count")), 0),
+            num_replies=Coalesce(Subquery(num_replies_qs.values("count")), 0),
+            num_reposts=Coalesce(Subquery(reposts_qs.values("count")), 0),
+            # Greatest skips nulls in Postgres
+            last_activity=Greatest(
+                Subquery(last_set_qs.values("created")[:1]),
+                Subquery(last_reply_qs.values("created")[:1]),
+            ),
+        )
 
-    def num_replies(self) -> UserQuerySet:
-        return self.annotate(num_replies=Count("reply", distinct=True))  # type: ignore
+    def top_authors(self) -> UserQuerySet:
+        return self.filter(num_sets__gt=0).order_by("-num_sets", "pk")
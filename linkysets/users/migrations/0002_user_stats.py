@@ -0,0 +1,63 @@
+# Generated by Django 3.1.14 on 2026-10-18 12:00
+
+from django.db import migrations, models
+from django.db.models import Count, F, OuterRef, Subquery
+from django.db.models.functions import Coalesce, Greatest
+
+
+def count_stats(apps, schema_editor):
+    User = apps.get_model('users', 'User')
+    EntrySet = apps.get_model('entries', 'EntrySet')
+    Reply = apps.get_model('replies', 'Reply')
+    sets_qs = EntrySet.objects.filter(author=OuterRef('pk')).order_by()
+    sets_qs = sets_qs.values('author').annotate(count=Count('*')).values('count')
+    replies_qs = Reply.objects.filter(author=OuterRef('pk')).order_by()
+    replies_qs = replies_qs.values('author').annotate(count=Count('*')).values('count')
+    reposts_qs = EntrySet.entries.through.objects.filter(
+        entry__origin__author=OuterRef('pk')
+    ).exclude(entryset=F('entry__origin')).exclude(entryset__author=OuterRef('pk'))
+    reposts_qs = reposts_qs.order_by().values('entry__origin__author').annotate(count=Count('*'))
+    last_set_qs = EntrySet.objects.filter(author=OuterRef('pk')).order_by('-created')
+    last_reply_qs = Reply.objects.filter(author=OuterRef('pk')).order_by('-created')
+    User.objects.update(
+        num_sets=Coalesce(Subquery(sets_qs), 0),
+        num_replies=Coalesce(Subquery(replies_qs), 0),
+        num_reposts=Coalesce(Subquery(reposts_qs.values('count')), 0),
+        last_activity=Greatest(
+            Subquery(last_set_qs.values('created')[:1]),
+            Subquery(last_reply_qs.values('created')[:1]),
+        ),
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('users', '0001_initial'),
+        ('entries', '0010_searchsuggestion'),
+        ('replies', '0002_reply_keyset_index'),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name='user',
+            name='num_sets',
+            field=models.PositiveIntegerField(db_index=True, default=0, editable=False, verbose_name='number of sets'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_replies',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of replies'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='num_reposts',
+            field=models.PositiveIntegerField(default=0, editable=False, verbose_name='number of reposts'),
+        ),
+        migrations.AddField(
+            model_name='user',
+            name='last_activity',
+            field=models.DateTimeField(blank=True, editable=False, null=True, verbose_name='last activity'),
+        ),
+        migrations.RunPython(count_stats, migrations.RunPython.noop),
+    ]
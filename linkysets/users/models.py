@@ -1,6 +1,8 @@
 from django.conf import settings
 from django.contrib.auth.models import AbstractUser, UserManager
+from django.db import models
 from django.shortcuts import reverse  # type: ignore
+from django.utils.translation import ugettext_lazy as _
 
 from linkysets.common.utils import Proxy
 
@@ -8,6 +10,20 @@ from .managers import UserQuerySet
 
 
 class User(AbstractUser):
+    # Activity stats are kept by the entries signals handlers for profiles and ratings
+    num_sets = models.PositiveIntegerField(
+        _("number of sets"), default=0, db_index=True, editable=False
+    )
+    num_replies = models.PositiveIntegerField(
+        _("number of replies"), default=0, editable=False
+    )
+    num_reposts = models.PositiveIntegerField(
+        _("number of reposts"), default=0, editable=False
+    )
+    last_activity = models.DateTimeField(
+        _("last activity"), null=True, blank=True, editable=False
+    )
+
     objects = UserManager.from_queryset(UserQuerySet)()
 
     def get_absolute_url(self):
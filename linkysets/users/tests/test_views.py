@@ -70,9 +70,11 @@ class UserDetailViewTests(TestCase):
     def setUpTestData(cls):
         cls.user = user_recipe.make()
         entryset_list = entryset_recipe.make(author=cls.user, _quantity=3)
-        cls.entryset_list = sorted(entryset_list, key=lambda es: es.created, reverse=True)
+        cls.entryset_list = sorted(
+            entryset_list, key=lambda es: (es.created, es.pk), reverse=True
+        )
         reply_list = reply_recipe.make(author=cls.user, _quantity=3)
-        cls.reply_list = sorted(reply_list, key=lambda r: r.created, reverse=True)
+        cls.reply_list = sorted(reply_list, key=lambda r: (r.created, r.pk), reverse=True)
 
     def test_correctly_resolves_view(self):
         response = self.client.get(
@@ -100,7 +102,7 @@ class UserDetailViewTests(TestCase):
         )
         page = response.context.get("entrysets_page")
         self.assertIsNotNone(page)
-        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
 
     def test_context_has_replies_page(self):
         response = self.client.get(
@@ -108,7 +110,7 @@ class UserDetailViewTests(TestCase):
         )
         page = response.context.get("replies_page")
         self.assertIsNotNone(page)
-        self.assertEqual(page.number, 1)
+        self.assertFalse(page.has_previous())
 
     @patch(
         "linkysets.users.views.UserDetailView.entrysets_per_page",
@@ -116,15 +118,27 @@ class UserDetailViewTests(TestCase):
         return_value=1,
     )
     def test_gets_right_entrysets_page(self, property_mock):
-        page_number = fake.random_int(min=1, max=len(self.entryset_list) - 1)
-        response = self.client.get(
-            reverse("users:detail", kwargs={"username": self.user.username}),
-            {"sets_page": page_number},
-        )
-        page = response.context["entrysets_page"]
-        self.assertEqual(page.number, page_number)
+        url = reverse("users:detail", kwargs={"username": self.user.username})
+        page_number = fake.random_int(min=2, max=len(self.entryset_list))
+        page = self.client.get(url).context["entrysets_page"]
+        for _ in range(page_number - 1):
+            response = self.client.get(url, {"sets_cursor": page.next_cursor()})
+            page = response.context["entrysets_page"]
         entryset_pk = self.entryset_list[page_number - 1].pk
-        self.assertIn(entryset_pk, [entryset.pk for entryset in page])
+        self.assertEqual([entryset.pk for entryset in page], [entryset_pk])
+
+    @patch(
+        "linkysets.users.views.UserDetailView.entrysets_per_page",
+        new_callable=PropertyMock,
+        return_value=1,
+    )
+    def test_entrysets_page_cursor_goes_back(self, property_mock):
+        url = reverse("users:detail", kwargs={"username": self.user.username})
+        first_page = self.client.get(url).context["entrysets_page"]
+        response = self.client.get(url, {"sets_cursor": first_page.next_cursor()})
+        second_page = response.context["entrysets_page"]
+        response = self.client.get(url, {"sets_cursor": second_page.previous_cursor()})
+        self.assertEqual(list(response.context["entrysets_page"]), list(first_page))
 
     @patch(
         "linkysets.users.views.UserDetailView.replies_per_page",
@@ -132,12 +146,39 @@ class UserDetailViewTests(TestCase):
         return_value=1,
     )
     def test_gets_right_replies_page(self, property_mock):
-        page_number = fake.random_int(min=1, max=len(self.reply_list) - 1)
+        url = reverse("users:detail", kwargs={"username": self.user.username})
+        page_number = fake.random_int(min=2, max=len(self.reply_list))
+        page = self.client.get(url).context["replies_page"]
+        for _ in range(page_number - 1):
+            response = self.client.get(url, {"replies_cursor": page.next_cursor()})
+            page = response.context["replies_page"]
+        reply_pk = self.reply_list[page_number - 1].pk
+        self.assertEqual([reply.pk for reply in page], [reply_pk])
+
+    @patch(
+        "linkysets.users.views.UserDetailView.replies_per_page",
+        new_callable=PropertyMock,
+        return_value=1,
+    )
+    def test_replies_page_cursor_goes_back(self, property_mock):
+        url = reverse("users:detail", kwargs={"username": self.user.username})
+        first_page = self.client.get(url).context["replies_page"]
+        response = self.client.get(url, {"replies_cursor": first_page.next_cursor()})
+        second_page = response.context["replies_page"]
+        response = self.client.get(url, {"replies_cursor": second_page.previous_cursor()})
+        self.assertEqual(list(response.context["replies_page"]), list(first_page))
+
+    def test_returns_not_found_for_invalid_cursor(self):
         response = self.client.get(
             reverse("users:detail", kwargs={"username": self.user.username}),
-            {"replies_page": page_number},
+            {"sets_cursor": "invalid"},
         )
-        page = response.context["replies_page"]
-        self.assertEqual(page.number, page_number)
-        reply_pk = self.reply_list[page_number - 1].pk
-        self.assertIn(reply_pk, [reply.pk for reply in page])
+        self.assertEqual(response.status_code, 404)
+
+    def test_reads_stored_stats(self):
+        response = self.client.get(
+            reverse("users:detail", kwargs={"username": self.user.username})
+        )
+        self.assertNotIn("COUNT(", str(views.UserDetailView.queryset.query))
+        self.assertEqual(response.context["user"].num_sets, 3)
+        self.assertEqual(response.context["user"].num_replies, 3)
@@ -3,12 +3,15 @@ from __future__ import annotations
 from typing import Any, Dict
 
 from django.contrib.auth.views import LoginView as DjangoLoginView
-from django.core.paginator import Paginator
+from django.db.models import QuerySet
 from django.urls import reverse_lazy
 from django.utils.translation import ugettext_lazy as _
 from django.views.generic import CreateView, DetailView
 
+from linkysets.common.pagination import CursorPage
+from linkysets.common.views import get_cursor_page
 from linkysets.entries.mixins import PageTitleMixin
+from linkysets.entries.rendering import prime_entrysets_render_cache
 
 from .forms import AuthenticationForm, UserCreationForm
 from .models import User
@@ -38,7 +41,7 @@ class RegisterView(PageTitleMixin, CreateView):
 
 class UserDetailView(PageTitleMixin, DetailView):
     template_name = "users/user_detail.html"
-    queryset = User.objects.num_entrysets().num_replies()
+    queryset = User.objects.all()
     slug_field = "username"
     slug_url_kwarg = "username"
     title_object_name = "object"
@@ -49,18 +52,21 @@ class UserDetailView(PageTitleMixin, DetailView):
     def get_context_data(self, **kwargs) -> Dict[str, Any]:
         context = super().get_context_data(**kwargs)
 
-        entrysets_page_num = self.request.GET.get("sets_page", 1)
-        entrysets_qs = self.object.entryset_set.order_by("-created")  # type: ignore
-        context["entrysets_page"] = Paginator(entrysets_qs, self.entrysets_per_page,).page(
-            entrysets_page_num
+        entrysets_qs = self.object.entryset_set.for_list()  # type: ignore
+        context["entrysets_page"] = self.get_page(
+            entrysets_qs, self.entrysets_per_page, "sets_cursor"
         )
+        prime_entrysets_render_cache(context["entrysets_page"])
 
-        replies_page_num = self.request.GET.get("replies_page", 1)
         replies_qs = self.object.reply_set.select_related(  # type: ignore
             "parent", "entryset"
-        ).order_by("-created")
-        context["replies_page"] = Paginator(replies_qs, self.replies_per_page,).page(
-            replies_page_num
+        )
+        context["replies_page"] = self.get_page(
+            replies_qs, self.replies_per_page, "replies_cursor"
         )
 
         return context
+
+    def get_page(self, queryset: QuerySet, per_page: int, cursor_param: str) -> CursorPage:
+        cursor = self.request.GET.get(cursor_param)
+        return get_cursor_page(queryset, per_page, cursor, ordering=("-created", "-pk"))